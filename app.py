@@ -2,15 +2,25 @@
 # PAINEL DE CATEGORIZAÇÃO DE VIAGENS — VERSÃO COM UPLOAD, ABAS, SISTEMA E RANKINGS
 # ====================================================================================
 
-import os
+import time
+import uuid
+from collections import OrderedDict
 import pandas as pd
-import numpy as np
 import streamlit as st
-import plotly.graph_objects as go
-import plotly.express as px
+
+from painel import (
+    acervo, alertas, analises, cache_disco, consulta, cubo, instrumentacao, ranking, referencia, registro, relatorios,
+    tabelas, tarefas,
+)
 
 # janela usada APENAS para ranking (últimos N dias)
-JANELA_RANK_DIAS = 7
+JANELA_RANK_DIAS = relatorios.JANELA_RANK_DIAS
+
+# limites padrão de adiantamento (min); outros podem ser escolhidos na barra lateral
+LIMITES_ADIANTAMENTO = cubo.LIMITES_ADIANTAMENTO
+
+# pandas (base na memória, padrão) ou duckdb (consultas sobre o Parquet do cache)
+BACKEND = consulta.BACKEND
 
 # ------------------------------------------------------------------------------------
 # BLOCO 1 — CONFIGURAÇÃO INICIAL DO STREAMLIT
@@ -24,37 +34,196 @@ st.set_page_config(
 
 st.title("Painel de Categorização de Viagens")
 
+# tempos, linhas e memória de cada bloco nesta execução (PAINEL_INSTRUMENTACAO=1);
+# desligada, rastro.etapa(...) não mede nada (ver BLOCO 18)
+rastro = instrumentacao.Rastro()
+
+if BACKEND not in consulta.BACKENDS:
+    st.error(f"PAINEL_BACKEND='{BACKEND}' desconhecido. Use: {', '.join(consulta.BACKENDS)}.")
+    st.stop()
+
 # ------------------------------------------------------------------------------------
 # BLOCO 2 — FUNÇÃO PARA CARREGAR DADOS VIA UPLOAD (.CSV ; E .XLSX)
 # ------------------------------------------------------------------------------------
 
+@st.cache_resource
+def registro_bases():
+    # um registro por processo (painel.registro): as sessões que enviam a mesma
+    # base (mesmo hash do conteúdo) usam a mesma base tratada, o mesmo cubo e o
+    # mesmo histograma, dentro do orçamento de memória (PAINEL_REGISTRO_MB)
+    return registro.Registro()
+
+
+@st.cache_resource
+def registro_resultados():
+    # resultados das etapas de cálculo (resumo por dia, tabelas das abas), por
+    # base e estado: voltar a um estado já visto, nesta ou em outra sessão, é imediato
+    return registro.Registro(tarefas.RESULTADOS_MB)
+
+
+@st.cache_resource
+def fila_tarefas():
+    # pool de threads do processo (painel.tarefas): as etapas pesadas rodam fora
+    # da execução do script, e um clique novo nos filtros cancela o estado anterior
+    return tarefas.Fila()
+
+
+# identifica a sessão na fila (uma tarefa por sessão e canal)
+id_sessao = st.session_state.setdefault("id_sessao", uuid.uuid4().hex)
+
+
+@st.fragment(run_every=0.3)
+def acompanhar(tarefa, etapas):
+    # só a barra é redesenhada enquanto a tarefa anda; com as etapas prontas,
+    # a página inteira roda de novo e mostra os resultados
+    if tarefa.resolvidas(etapas):
+        st.rerun()
+    texto = f"{tarefa.etapa_atual or 'Na fila'}..." + (f" {tarefa.texto}" if tarefa.texto else "")
+    st.progress(tarefa.fracao(), text=texto)
+
+
+def aguardar(tarefa, etapas):
+    # segue se as etapas já terminaram; senão mostra o andamento e para aqui
+    # (o que já foi desenhado, como a barra lateral, continua na tela)
+    if not tarefa.resolvidas(etapas):
+        acompanhar(tarefa, etapas)
+        st.stop()
+
+
+@st.cache_data(show_spinner=False)
+def chave_upload(arquivos):
+    # hash do conteúdo dos arquivos enviados (o mesmo do cache em disco)
+    return cache_disco.chave_arquivos(arquivos)
+
+
+def carregar_dados_upload(arquivos, chave, tarefa):
+    # mesmo conteúdo já carregado antes (mesmo em outra execução): lê o Parquet do cache;
+    # senão, leitura pelo esquema de viagens (só colunas usadas, em blocos e com
+    # categorias) + tratamento dos BLOCOS 5 a 7, que vai junto para o cache
+    # cada arquivo é lido em um processo; a barra avança a cada arquivo concluído
+    def ao_concluir(concluidos, total, nome):
+        tarefa.informar(concluidos / total, f"Arquivo {concluidos}/{total} lido: {nome}")
+
+    df, relatorio = relatorios.carregar_base(arquivos, ao_concluir=ao_concluir, chave=chave)
+
+    # limpar nomes de colunas (tira espaços e troca por _)
+    return df.rename(columns=lambda x: str(x).strip().replace(" ", "_")), relatorio
+
+
+# etapas de cada base, em segundo plano; a base tratada só é lida para o
+# relatório da carga, o cubo e o histograma: com os três no registro, ela fica
+# sem uso e é a primeira a sair quando falta memória
+ETAPA_CARGA = "Leitura e tratamento dos arquivos"
+ETAPA_CUBO = "Montando o cubo de viagens"
+ETAPA_HISTOGRAMA = "Montando o histograma de adiantamento"
+
+
+def etapas_upload(arquivos, chave):
+    bases = registro_bases()
+
+    def base(tarefa):
+        # arquivo inválido: o cubo e o histograma repetem o erro da carga, sem ler os arquivos de novo
+        if ETAPA_CARGA in tarefa.erros:
+            raise tarefa.erros[ETAPA_CARGA]
+        return bases.obter(chave, "base", lambda: carregar_dados_upload(arquivos, chave, tarefa))
+
+    return [
+        (ETAPA_CARGA, lambda t: bases.obter(chave, "relatório", lambda: base(t)[1])),
+        # uma vez por base (chave = hash do conteúdo); filtros e abas usam só o cubo,
+        # e as seleções por data (BLOCOS 9 e 10) passam pelo índice de dias
+        (ETAPA_CUBO, lambda t: bases.obter(chave, "cubo", lambda: relatorios.montar_cubo(base(t)[0]))),
+        # viagens por faixa de meio minuto de adiantamento: limites quaisquer e
+        # percentis sem voltar à base (painel.histograma)
+        (ETAPA_HISTOGRAMA, lambda t: bases.obter(chave, "histograma", lambda: relatorios.montar_histograma(base(t)[0]))),
+    ]
+
+
 @st.cache_data
-def carregar_dados_upload(arquivos):
-    dfs = []
-    for arquivo in arquivos:
-        nome = arquivo.name.lower()
-
-        if nome.endswith(".csv"):
-            df_arq = pd.read_csv(
-                arquivo,
-                sep=";",
-                encoding="utf-8-sig",
-                low_memory=False
-            )
-        elif nome.endswith(".xlsx"):
-            df_arq = pd.read_excel(arquivo)
-        else:
-            st.error("Formato não suportado. Envie arquivos .csv ou .xlsx.")
-            st.stop()
+def preparar_arquivo_upload(arquivos):
+    # backend duckdb: a base tratada fica só no Parquet do cache em disco,
+    # sem ser carregada inteira na memória do servidor
+    barra = st.progress(0.0, text="Carregando arquivos...")
+
+    def ao_concluir(concluidos, total, nome):
+        barra.progress(concluidos / total, text=f"Arquivo {concluidos}/{total} lido: {nome}")
+
+    try:
+        return relatorios.preparar_arquivo(arquivos, ao_concluir=ao_concluir)
+    except ValueError as erro:
+        st.error(str(erro))
+        st.stop()
+    finally:
+        barra.empty()
+
+
+@st.cache_resource
+def vigia_acervo():
+    # quando a pasta vigiada foi verificada pela última vez, por qualquer sessão
+    return {"ultima": 0.0}
+
+
+def atualizar_acervo(arquivos, verificar_agora=False):
+    # acervo local (PAINEL_ACERVO_DIR): as exportações enviadas e as novas da
+    # pasta vigiada são acrescentadas; só as viagens e os dias novos são tratados.
+    # Cada arquivo do uploader entra uma vez por sessão (pelo file_id), e a pasta
+    # é verificada a cada PAINEL_ACERVO_INTERVALO segundos ou pelo botão, não a
+    # cada clique nos filtros
+    incorporados = st.session_state.setdefault("acervo_incorporados", set())
+    novos = [arquivo for arquivo in arquivos if arquivo.file_id not in incorporados]
+    vigia = vigia_acervo()
+    verificar_pasta = bool(acervo.ENTRADA) and (
+        verificar_agora or time.time() - vigia["ultima"] >= acervo.INTERVALO
+    )
+    lotes = []
+    if not novos and not verificar_pasta:
+        return lotes, acervo.resumo()
+
+    barra = st.progress(0.0, text="Verificando o acervo...")
+
+    def ao_concluir(concluidos, total, nome):
+        barra.progress(concluidos / total, text=f"Arquivo {concluidos}/{total} lido: {nome}")
+
+    try:
+        if verificar_pasta:
+            vigia["ultima"] = time.time()
+            lote = acervo.vigiar()
+            if lote is not None:
+                lotes.append(lote)
+        if novos:
+            lotes.append(acervo.adicionar(novos, ao_concluir=ao_concluir))
+            incorporados.update(arquivo.file_id for arquivo in novos)
+        resumo = acervo.resumo()
+    except (OSError, ValueError) as erro:
+        st.error(str(erro))
+        st.stop()
+    finally:
+        barra.empty()
+    return lotes, resumo
 
-        dfs.append(df_arq)
 
-    if not dfs:
-        st.error("Nenhum arquivo válido enviado.")
+def etapas_acervo(chave_acervo):
+    # chave = revisão do acervo: só refaz quando entram viagens novas
+    bases = registro_bases()
+    return [
+        (ETAPA_CUBO, lambda t: bases.obter(chave_acervo, "cubo", relatorios.cubo_do_acervo)),
+        (ETAPA_HISTOGRAMA, lambda t: bases.obter(chave_acervo, "histograma", relatorios.histograma_do_acervo)),
+    ]
+
+
+@st.cache_data
+def carregar_feriados(caminho):
+    # calendário opcional (PAINEL_FERIADOS): feriados contam como domingo
+    try:
+        return referencia.ler_feriados(caminho)
+    except (OSError, ValueError) as erro:
+        st.error(str(erro))
         st.stop()
 
-    df_final = pd.concat(dfs, ignore_index=True)
-    return df_final
+
+@st.cache_resource
+def abrir_duckdb(caminho_parquet):
+    # uma conexão por arquivo, compartilhada entre as sessões
+    return consulta.abrir("duckdb", caminho_parquet=caminho_parquet)
 
 
 # ------------------------------------------------------------------------------------
@@ -68,32 +237,63 @@ with st.sidebar:
         type=["xlsx", "csv"],
         accept_multiple_files=True
     )
+    verificar_pasta = acervo.ATIVO and bool(acervo.ENTRADA) and st.button(
+        "Verificar a pasta do acervo agora", help=f"Pasta vigiada: {acervo.ENTRADA}"
+    )
+
+if acervo.ATIVO:
+    with rastro.etapa("BLOCO 2 — acervo", entrada=len(uploaded_files)) as etapa:
+        lotes_acervo, resumo_acervo = atualizar_acervo(uploaded_files, verificar_pasta)
+        etapa.saida = sum(lote["linhas_novas"] for lote in lotes_acervo)
 
-if not uploaded_files:
+    for lote in lotes_acervo:
+        if lote["linhas_lidas"]:
+            st.sidebar.success(
+                f"Acervo: {lote['linhas_novas']} viagens novas em {len(lote['dias_alterados'])} dias "
+                f"({lote['linhas_repetidas']} já estavam no acervo)."
+            )
+
+    if resumo_acervo["linhas"] == 0:
+        st.warning("Por favor, envie um arquivo para começar.")
+        st.stop()
+
+    relatorio_carga = {
+        "linhas": resumo_acervo["linhas"],
+        "chave": acervo.chave(),
+        "origem": "acervo local, {} a {}".format(
+            *(pd.Timestamp(resumo_acervo[d]).strftime("%d/%m/%Y") for d in ["primeiro_dia", "ultimo_dia"])
+        ),
+        "conversao_horarios": lotes_acervo[-1]["conversao_horarios"] if lotes_acervo else {},
+    }
+    caminho_base = acervo.arquivos_viagens()
+
+elif not uploaded_files:
     st.warning("Por favor, envie um arquivo para começar.")
     st.stop()
 
-df = carregar_dados_upload(uploaded_files)
-
-# limpar nomes de colunas (tira espaços e troca por _)
-df = df.rename(columns=lambda x: str(x).strip().replace(" ", "_"))
+else:
+    with rastro.etapa("BLOCO 2 — carga e tratamento", entrada=len(uploaded_files)) as etapa:
+        if BACKEND == "pandas":
+            # carga, cubo e histograma em segundo plano; a página segue assim que
+            # sai o relatório da carga, e o cubo e o histograma esperam no BLOCO 8
+            chave_arquivos = chave_upload(uploaded_files)
+            tarefa_base = fila_tarefas().submeter(
+                id_sessao, "base", chave_arquivos, etapas_upload(uploaded_files, chave_arquivos)
+            )
+            aguardar(tarefa_base, [ETAPA_CARGA])
+            try:
+                relatorio_carga = tarefa_base.resultado(ETAPA_CARGA)
+            except ValueError as erro:
+                st.error(str(erro))
+                st.stop()
+        else:
+            caminho_base, relatorio_carga = preparar_arquivo_upload(uploaded_files)
+        etapa.saida = relatorio_carga["linhas"]
 
 # ------------------------------------------------------------------------------------
 # BLOCO 4 — FUNÇÕES AUXILIARES
 # ------------------------------------------------------------------------------------
 
-def classificar_tipo_dia(ts):
-    if pd.isna(ts):
-        return "Desconhecido"
-    wd = ts.weekday()
-    if wd <= 4:
-        return "Dia útil"
-    elif wd == 5:
-        return "Sábado"
-    else:
-        return "Domingo"
-
-
 def formato_br_num(v, casas=0):
     """Formata número no padrão PT-BR."""
     if pd.isna(v):
@@ -109,8 +309,9 @@ def formato_br_num(v, casas=0):
 def tabela_semáforo(df_tab, colunas_pct, titulo=None):
     """
     Mostra DataFrame com gradiente em vermelho nas colunas de percentual
-    e formatação de números no padrão BR.
-    (Requer matplotlib instalado no ambiente por causa do background_gradient.)
+    e formatação de números no padrão BR. Formatação e cores saem de
+    painel.tabelas (NumPy, sem matplotlib); tabelas grandes vão em páginas
+    e só a página mostrada vira Styler.
     """
     if titulo:
         st.subheader(titulo)
@@ -118,244 +319,426 @@ def tabela_semáforo(df_tab, colunas_pct, titulo=None):
         st.info("Sem dados para exibir nesta tabela.")
         return
 
-    fmt_funcs = {}
-
-    # Percentuais com 2 casas
-    for c in colunas_pct:
-        def fmt_pct(v, col=c):
-            if pd.isna(v):
-                return ""
-            return formato_br_num(v, casas=2) + " %"
-        fmt_funcs[c] = fmt_pct
-
-    # Se existir coluna 'Total', formatar com milhar
-    if "Total" in df_tab.columns:
-        def fmt_total(v):
-            return formato_br_num(v, casas=0)
-        fmt_funcs["Total"] = fmt_total
-
-    styler = (
-        df_tab.style
-        .format(fmt_funcs)
-        .background_gradient(cmap="Reds", subset=colunas_pct)
-    )
-
-    st.dataframe(styler, use_container_width=True)
+    with rastro.etapa(f"Styler — {titulo or 'tabela'}", entrada=len(df_tab)):
+        texto, estilos = tabelas.tabela_semaforo(df_tab, colunas_pct)
 
+        n_paginas = tabelas.paginas(len(texto))
+        if n_paginas > 1:
+            pagina = st.number_input(
+                f"Página (de {n_paginas})", min_value=1, max_value=n_paginas, value=1,
+                key=f"pagina_{titulo or '-'.join(map(str, df_tab.columns))}",
+            )
+            inicio = (pagina - 1) * tabelas.LINHAS_POR_PAGINA
+            fim = min(inicio + tabelas.LINHAS_POR_PAGINA, len(texto))
+            st.caption(f"Linhas {formato_br_num(inicio + 1)} a {formato_br_num(fim)} de {formato_br_num(len(texto))}")
+            texto, estilos = texto.iloc[inicio:fim], estilos.iloc[inicio:fim]
 
-def calcula_adiantamento_equiv(df_base, df_dia, limite):
-    """
-    Cálculo do adiantamento para:
-    - df_dia  : último dia
-    - df_base : dias equivalentes anteriores
-    """
-    if len(df_dia) == 0 or len(df_base) == 0:
-        return 0, 0.0, 0.0
-
-    qtd_dia = (df_dia["Adiantamento_min"] > limite).sum()
-    pct_dia = qtd_dia / len(df_dia) * 100 if len(df_dia) > 0 else 0.0
-
-    qtd_base = (df_base["Adiantamento_min"] > limite).sum()
-    pct_base = qtd_base / len(df_base) * 100 if len(df_base) > 0 else 0.0
+        styler = texto.style.apply(lambda _: estilos, axis=None)
 
-    return qtd_dia, pct_dia, pct_base
+        st.dataframe(styler, width="stretch")
 
 
-# ------------------------------------------------------------------------------------
-# BLOCO 5 — TRATAMENTO DAS COLUNAS BÁSICAS
-# ------------------------------------------------------------------------------------
+# figuras de gráficos já montadas nesta sessão, da usada há mais tempo à mais recente
+MAX_FIGURAS = 64
 
-colunas_necessarias = [
-    "Horário_agendado",
-    "Horário_realizado",
-    "Situação_viagem",
-    "Situação_categoria",
-    "Empresa"
-]
 
-for c in colunas_necessarias:
-    if c not in df.columns:
-        st.error(f"A coluna obrigatória '{c}' não existe na base!")
-        st.stop()
+def figura(chave, montar):
+    """
+    Figura plotly por (estado dos filtros, visão, gráfico): montar() só roda
+    na primeira vez. Voltar a uma visão ou mexer num widget que não muda o
+    gráfico reaproveita a figura. O plotly é importado dentro de montar(),
+    então só entra na memória quando algum gráfico aparece na tela.
+    """
+    figuras = st.session_state.setdefault("figuras", OrderedDict())
+    if chave not in figuras:
+        figuras[chave] = montar()
+        while len(figuras) > MAX_FIGURAS:
+            figuras.popitem(last=False)
+    figuras.move_to_end(chave)
+    return figuras[chave]
 
-# Horário_agendado como datetime
-df["Horário_agendado"] = pd.to_datetime(df["Horário_agendado"], errors="coerce")
 
-# Data_Agendada como datetime normalizado (meia-noite)
-df["Data_Agendada"] = df["Horário_agendado"].dt.normalize()
+# escolhas da tela (visão, dia de referência, opções das abas) ficam em
+# st.session_state["opcoes"], fora das chaves dos widgets: o Streamlit apaga o
+# estado de um widget que não foi desenhado numa execução (aba fora da tela,
+# execução parada em aguardar() enquanto uma etapa recalcula), e a escolha
+# voltaria ao padrão
+opcoes = st.session_state.setdefault("opcoes", {})
 
-# Horário_realizado como datetime
-df["Horário_realizado"] = pd.to_datetime(df["Horário_realizado"], errors="coerce")
 
-# Tipo de dia
-df["Tipo_Dia"] = df["Data_Agendada"].apply(classificar_tipo_dia)
+def opcao_guardada(nome, valor):
+    """
+    Argumentos (key, on_change) do widget de uma escolha guardada: o widget
+    começa em `valor` (em geral o guardado em opcoes) e, quando o usuário
+    muda, o novo valor vai para opcoes[nome].
+    """
+    chave = f"widget_{nome}"
+    st.session_state[chave] = valor
 
-# CRIAÇÃO DO CAMPO SISTEMA (Transcol x Aquaviário)
-df["Sistema"] = np.where(
-    df["Empresa"].str.contains("VJB", case=False, na=False),
-    "Aquaviário",
-    "Transcol"
-)
+    def guardar():
+        st.session_state["opcoes"][nome] = st.session_state[chave]
 
-# ------------------------------------------------------------------------------------
-# BLOCO 6 — CRIAÇÃO DA FAIXA HORÁRIA
-# ------------------------------------------------------------------------------------
+    return {"key": chave, "on_change": guardar}
 
-df["Hora_Agendada"] = df["Horário_agendado"].dt.hour
-df["Faixa_Horaria"] = df["Hora_Agendada"].apply(
-    lambda h: f"{int(h):02d}:00–{int(h):02d}:59" if pd.notnull(h) else "Sem horário"
-)
 
 # ------------------------------------------------------------------------------------
-# BLOCO 7 — CÁLCULO DO ADIANTAMENTO
+# BLOCO 5 A 7 — TRATAMENTO DAS COLUNAS BÁSICAS, FAIXA HORÁRIA E ADIANTAMENTO
 # ------------------------------------------------------------------------------------
 
-df["Adiantamento_min"] = (
-    df["Horário_realizado"] - df["Horário_agendado"]
-).dt.total_seconds() / 60
+# resumo da carga: memória das colunas como texto bruto x com tipos compactos
+resumo_carga = f"{formato_br_num(relatorio_carga['linhas'])} viagens ({relatorio_carga['origem']})"
+if "memoria_final" in relatorio_carga:
+    resumo_carga += (
+        f" • memória {formato_br_num(relatorio_carga['memoria_bruta'] / 1024**2, casas=1)} MB (texto bruto) → "
+        f"{formato_br_num(relatorio_carga['memoria_final'] / 1024**2, casas=1)} MB (tipos compactos)"
+    )
+st.sidebar.caption(resumo_carga)
+
+# horários que não puderam ser convertidos (viraram NaT) ficam visíveis
+for coluna, conv in relatorio_carga["conversao_horarios"].items():
+    if conv["falhas"] > 0:
+        st.sidebar.warning(
+            f"{formato_br_num(conv['falhas'])} valores de {coluna} não puderam ser "
+            f"convertidos para data (formato {conv['formato'] or 'não identificado'})."
+        )
 
-df["Adianta_3"] = df["Adiantamento_min"] > 3
-df["Adianta_5"] = df["Adiantamento_min"] > 5
-df["Adianta_10"] = df["Adiantamento_min"] > 10
+# As colunas de datas, Tipo_Dia, Sistema, Faixa_Horaria (BLOCO 6) e
+# Adiantamento (BLOCO 7) já vêm prontas de carregar_dados_upload
+# (painel.tratamento), e ficam guardadas no cache em disco junto com a base
+# (ou, com o acervo local, nos dias gravados em painel.acervo).
 
 # ------------------------------------------------------------------------------------
 # BLOCO 8 — FILTROS GLOBAIS (SIDEBAR)
 # ------------------------------------------------------------------------------------
 
+# Daqui em diante as contas passam pelo backend de consulta (painel.consulta).
+# No pandas, tudo é calculado sobre o cubo (contagem de viagens por data,
+# sistema, empresa, linha, hora, situações e faixa de adiantamento), montado
+# uma vez por base; no duckdb, por consultas SQL sobre o Parquet da base.
+if BACKEND == "pandas":
+    if acervo.ATIVO:
+        tarefa_base = fila_tarefas().submeter(
+            id_sessao, "base", relatorio_carga["chave"], etapas_acervo(relatorio_carga["chave"])
+        )
+    aguardar(tarefa_base, [ETAPA_CUBO, ETAPA_HISTOGRAMA])
+    with rastro.etapa("Cubo de viagens", entrada=relatorio_carga["linhas"]) as etapa:
+        cubo_viagens, indice_datas = tarefa_base.resultado(ETAPA_CUBO)
+        etapa.saida = len(cubo_viagens)
+    with rastro.etapa("Histograma de adiantamento", entrada=relatorio_carga["linhas"]) as etapa:
+        hist_viagens, indice_hist = tarefa_base.resultado(ETAPA_HISTOGRAMA)
+        etapa.saida = len(hist_viagens)
+    consulta_viagens = consulta.ConsultaPandas(cubo_viagens, indice_datas, hist_viagens, indice_hist)
+else:
+    try:
+        consulta_viagens = abrir_duckdb(caminho_base)
+    except ValueError as erro:
+        st.error(str(erro))
+        st.stop()
+
 st.sidebar.header("Filtros")
 
+# No pandas os filtros não copiam o cubo: cada seleção vira uma máscara sobre
+# os códigos das categorias e o que segue adiante são as posições das linhas.
+
 # Sistema (Transcol x Aquaviário)
 sistema_sel = st.sidebar.radio("Sistema", ["Transcol", "Aquaviário"], index=0)
 
-df_sistema = df[df["Sistema"] == sistema_sel].copy()
+with rastro.etapa("BLOCO 8 — filtro de sistema"):
+    tem_sistema = consulta_viagens.tem_dados({"sistema": sistema_sel})
 
-if df_sistema.empty:
+if not tem_sistema:
     st.warning("Não há dados para o sistema selecionado.")
     st.stop()
 
 # Empresa
-if "Empresa" in df_sistema.columns:
-    empresas = sorted(df_sistema["Empresa"].dropna().unique())
+if consulta_viagens.tem_coluna("Empresa"):
+    empresas = consulta_viagens.opcoes(sistema_sel, "Empresa")
     empresas_sel = st.sidebar.multiselect("Empresa", empresas, default=empresas)
 else:
     empresas_sel = []
 
 # Linha (se existir)
-if "Linha" in df_sistema.columns:
-    linhas = sorted(df_sistema["Linha"].dropna().unique())
+if consulta_viagens.tem_coluna("Linha"):
+    linhas = consulta_viagens.opcoes(sistema_sel, "Linha")
     linhas_sel = st.sidebar.multiselect("Linha", linhas, default=linhas)
 else:
     linhas_sel = []
 
 # Faixa horária
-faixas = sorted(df_sistema["Faixa_Horaria"].dropna().unique())
+faixas = consulta_viagens.opcoes(sistema_sel, "Faixa_Horaria")
 faixas_sel = st.sidebar.multiselect(
     "Faixa Horária (Horário agendado)",
     faixas,
     default=faixas
 )
 
-mask = pd.Series(True, index=df_sistema.index)
-
-if empresas_sel and "Empresa" in df_sistema.columns:
-    mask &= df_sistema["Empresa"].isin(empresas_sel)
-
-if linhas_sel and "Linha" in df_sistema.columns:
-    mask &= df_sistema["Linha"].isin(linhas_sel)
-
-if faixas_sel:
-    mask &= df_sistema["Faixa_Horaria"].isin(faixas_sel)
-
-df_filtro = df_sistema[mask].copy()
-
-if df_filtro.empty:
+# Limites de adiantamento (aba 1 e Ranking 1), em múltiplos de meio minuto;
+# sem nenhum selecionado, volta aos limites padrão (3, 5 e 10 min)
+opcoes_limites = [v // 2 if v % 2 == 0 else v / 2 for v in range(0, 121)]
+limites_sel = sorted(st.sidebar.multiselect(
+    "Limites de adiantamento (min)",
+    opcoes_limites,
+    default=LIMITES_ADIANTAMENTO,
+    max_selections=6,
+    format_func=lambda v: f"{v:g}".replace(".", ","),
+)) or LIMITES_ADIANTAMENTO
+
+filtro = {
+    "sistema": sistema_sel,
+    "empresas": empresas_sel,
+    "linhas": linhas_sel,
+    "faixas": faixas_sel,
+}
+
+with rastro.etapa("BLOCO 8 — filtros"):
+    tem_dados = consulta_viagens.tem_dados(filtro)
+
+if not tem_dados:
     st.warning("Nenhum dado encontrado com os filtros selecionados.")
     st.stop()
 
 # ------------------------------------------------------------------------------------
-# BLOCO 9 — PREPARAÇÃO: ÚLTIMO DIA E DIAS EQUIVALENTES ANTERIORES
+# BLOCO 9 — PREPARAÇÃO: DIA DE REFERÊNCIA E DIAS EQUIVALENTES ANTERIORES
 # ------------------------------------------------------------------------------------
 
-df_filtro["Data_Agendada"] = pd.to_datetime(
-    df_filtro["Data_Agendada"], errors="coerce"
-).dt.normalize()
+# O resumo por dia (painel.referencia) traz, para todas as datas, as viagens
+# por faixa de adiantamento do dia e dos seus dias equivalentes: trocar o
+# dia de referência não refaz as contas da aba 1. Fica em cache por base,
+# filtros, quantidade de dias equivalentes e feriados.
+st.sidebar.header("Dia de referência")
 
-if df_filtro["Data_Agendada"].notna().sum() == 0:
-    st.error("Não foi possível identificar datas válidas em Data_Agendada.")
-    st.stop()
+feriados = carregar_feriados(referencia.FERIADOS) if referencia.FERIADOS else pd.DatetimeIndex([])
 
-ultimo_dia = df_filtro["Data_Agendada"].max()
-df_ultimo = df_filtro[df_filtro["Data_Agendada"] == ultimo_dia]
+dias_uteis = st.sidebar.number_input(
+    "Dias úteis equivalentes", min_value=1, max_value=30,
+    value=analises.DIAS_EQUIVALENTES["Dia útil"],
+)
+dias_fim_semana = st.sidebar.number_input(
+    "Sábados/domingos equivalentes", min_value=1, max_value=10,
+    value=analises.DIAS_EQUIVALENTES["Sábado"],
+)
+n_dias = {"Dia útil": dias_uteis, "Sábado": dias_fim_semana, "Domingo": dias_fim_semana}
 
-if df_ultimo.empty:
-    st.error("Não há registros para o último dia encontrado.")
-    st.stop()
+estado_filtro = (BACKEND, sistema_sel, tuple(empresas_sel), tuple(linhas_sel), tuple(faixas_sel))
+estado_resumo = estado_filtro + (tuple(sorted(n_dias.items())), tuple(feriados))
 
-tipo_dia_ult = df_ultimo["Tipo_Dia"].iloc[0]
 
-# Histórico (apenas datas ANTES do último dia)
-df_hist = df_filtro[df_filtro["Data_Agendada"] < ultimo_dia].copy()
+resultados_etapas = registro_resultados()
+ETAPA_RESUMO = "Resumo por dia e dias equivalentes"
 
-if df_hist.empty:
-    # caso limite: só há dados do último dia
-    df_base_equiv = df_hist.iloc[0:0].copy()  # vazio com mesmas colunas
-else:
-    if tipo_dia_ult == "Domingo":
-        n_dias = 1
-    elif tipo_dia_ult == "Sábado":
-        n_dias = 1
-    else:  # Dia útil
-        n_dias = 5
-
-    datas_equiv = (
-        df_hist.loc[df_hist["Tipo_Dia"] == tipo_dia_ult, "Data_Agendada"]
-        .drop_duplicates()
-        .sort_values(ascending=False)
-        .head(n_dias)
+
+def etapa_resumo(tarefa):
+    return resultados_etapas.obter(
+        (relatorio_carga["chave"], estado_resumo), "resumo_dias",
+        lambda: consulta_viagens.resumo_dias(filtro, n_dias, feriados),
     )
 
-    df_base_equiv = df_filtro[df_filtro["Data_Agendada"].isin(datas_equiv)].copy()
 
-# ------------------------------------------------------------------------------------
-# BLOCO 10 — PREPARAÇÃO ESPECÍFICA PARA RANKING (ÚLTIMOS 7 DIAS)
-# ------------------------------------------------------------------------------------
+tarefa_resumo = fila_tarefas().submeter(
+    id_sessao, "resumo", (relatorio_carga["chave"], estado_resumo), [(ETAPA_RESUMO, etapa_resumo)]
+)
+aguardar(tarefa_resumo, [ETAPA_RESUMO])
+try:
+    with rastro.etapa("BLOCO 9 — resumo por dia") as etapa:
+        resumo_dias = tarefa_resumo.resultado(ETAPA_RESUMO)
+        etapa.saida = len(resumo_dias["dias"])
+except ValueError as erro:
+    st.error(str(erro))
+    st.stop()
+
+if not len(resumo_dias["dias"]):
+    st.error("Não foi possível identificar datas válidas em Data_Agendada.")
+    st.stop()
 
-inicio_rank = ultimo_dia - pd.Timedelta(days=JANELA_RANK_DIAS - 1)
-df_rank_janela = df_filtro[
-    (df_filtro["Data_Agendada"] >= inicio_rank) & (df_filtro["Data_Agendada"] <= ultimo_dia)
-].copy()
+# mais recente primeiro: o padrão continua sendo o último dia com dados; o
+# dia escolhido vale enquanto existir nos filtros atuais
+tipo_do_dia = dict(zip(resumo_dias["dias"], resumo_dias["tipos"]))
+dia_guardado = opcoes.get("dia")
+dia_sel = st.sidebar.selectbox(
+    "Dia",
+    resumo_dias["dias"][::-1],
+    format_func=lambda dia: f"{dia:%d/%m/%Y} ({tipo_do_dia[dia].lower()})",
+    **opcao_guardada("dia", dia_guardado if dia_guardado in tipo_do_dia else resumo_dias["dias"][-1]),
+)
+k_dia = resumo_dias["dias"].get_loc(dia_sel)
+if len(feriados):
+    st.sidebar.caption(f"Feriados no calendário: {len(feriados)} (contam como domingo).")
+
+# BLOCO 10 — janela do ranking (últimos 7 dias até o dia de referência) — sai junto, em periodos,
+# como primeira etapa da tarefa das abas (BLOCO 11)
+ETAPA_PERIODOS = "Dia de referência, dias equivalentes e janela"
+
+
+def etapa_periodos(tarefa):
+    return consulta_viagens.periodos(
+        filtro, janela=JANELA_RANK_DIAS, dia=dia_sel, n_dias=n_dias, feriados=feriados
+    )
 
 # ====================================================================================
 # BLOCO 11 — ABAS
 # ====================================================================================
 
-aba1, aba2, aba3, aba4 = st.tabs(
-    [
-        "Adiantamento (Velocímetros)",
-        "Situação da Viagem",
-        "Situação Categoria",
-        "Ranking de Empresas",
-    ]
+# st.tabs monta todas as abas a cada interação; com o seletor abaixo só a
+# visão escolhida é desenhada. Os cálculos de todas as visões rodam numa
+# tarefa em segundo plano (painel.tarefas), a da visão escolhida primeiro:
+# cada visão aparece assim que a sua etapa termina, e as outras ficam prontas
+# enquanto esta é lida. Um clique novo nos filtros cancela a tarefa do estado
+# anterior. Os resultados ficam guardados por (hash da base, estado): voltar
+# a uma visão ou a um estado já vistos é imediato.
+
+ABAS = [
+    "Adiantamento (Velocímetros)",
+    "Situação da Viagem",
+    "Situação Categoria",
+    "Ranking de Empresas",
+    "Tendência",
+    "Alertas",
+]
+
+# os períodos são função da base, dos filtros e do dia de referência, por
+# isso não entram no estado
+estado_filtros = estado_resumo + (dia_sel,)
+
+# opções das abas 4 a 6, para calcular as abas antes de serem abertas (os
+# widgets só existem com a aba na tela; os valores ficam em opcoes, BLOCO 4)
+K_TOP_PADRAO = 20
+MINIMO_VIAGENS_PADRAO = 20
+granularidades = [
+    g for g, colunas in ranking.GRANULARIDADES.items()
+    if all(consulta_viagens.tem_coluna(c) for c in colunas)
+]
+granularidade = opcoes.get("granularidade", "Empresa")
+if granularidade not in granularidades:
+    granularidade = "Empresa"
+k_top, minimo_viagens = None, 0
+if granularidade != "Empresa":
+    k_top = int(opcoes.get("k_top", K_TOP_PADRAO))
+    minimo_viagens = int(opcoes.get("minimo_viagens", MINIMO_VIAGENS_PADRAO))
+agrupar_por = opcoes.get("agrupar_por", "Sistema")
+por_empresa = consulta_viagens.tem_coluna("Empresa") and agrupar_por == "Empresa"
+n_alertas = int(opcoes.get("n_alertas", alertas.N_ALERTAS))
+minimo_alertas = int(opcoes.get("minimo_alertas", alertas.MINIMO_VIAGENS))
+
+
+def guardado(estado, nome, calcular):
+    return resultados_etapas.obter((relatorio_carga["chave"],) + estado, nome, calcular)
+
+
+def etapa_comparativa(coluna):
+    def calcular(tarefa):
+        periodos_t = tarefa.resultado(ETAPA_PERIODOS)
+        return guardado(
+            estado_filtros, coluna, lambda: consulta_viagens.tabela_comparativa(periodos_t, coluna)
+        )
+
+    return calcular
+
+
+def etapa_rankings(tarefa):
+    periodos_t = tarefa.resultado(ETAPA_PERIODOS)
+    if not consulta_viagens.tem_coluna("Empresa") or not periodos_t["tem_janela"]:
+        return None
+    return guardado(
+        estado_filtros + (JANELA_RANK_DIAS, tuple(limites_sel), granularidade, k_top, minimo_viagens),
+        "rankings",
+        lambda: consulta_viagens.rankings(periodos_t, list(limites_sel), granularidade, k_top, minimo_viagens),
+    )
+
+
+def etapa_tendencia(tarefa):
+    # período inteiro: não depende do dia de referência nem dos dias equivalentes
+    return guardado(estado_filtro + (tuple(limites_sel), por_empresa), "tendência", lambda: (
+        consulta_viagens.tendencia_adiantamento(filtro, list(limites_sel), por_empresa),
+        consulta_viagens.tendencia_distribuicao(filtro, "Situação_viagem", por_empresa),
+        consulta_viagens.tendencia_distribuicao(filtro, "Situação_categoria", por_empresa),
+    ))
+
+
+def etapa_alertas(tarefa):
+    periodos_t = tarefa.resultado(ETAPA_PERIODOS)
+    return guardado(
+        estado_filtros + (tuple(limites_sel), n_alertas, minimo_alertas),
+        "alertas",
+        lambda: consulta_viagens.alertas(periodos_t, list(limites_sel), n_alertas, minimo_alertas),
+    )
+
+
+# etapa de cada aba (a aba 1 sai do resumo por dia e dos períodos)
+ETAPAS_ABAS = {
+    ABAS[1]: ("Tabela de Situação da Viagem", etapa_comparativa("Situação_viagem")),
+    ABAS[2]: ("Tabela de Situação Categoria", etapa_comparativa("Situação_categoria")),
+    ABAS[3]: ("Rankings", etapa_rankings),
+    ABAS[4]: ("Séries de tendência", etapa_tendencia),
+    ABAS[5]: ("Alertas", etapa_alertas),
+}
+
+aba_sel = st.radio(
+    "Visão", ABAS, horizontal=True, label_visibility="collapsed",
+    **opcao_guardada("visao", opcoes.get("visao", ABAS[0])),
+)
+
+etapas_abas = [(ETAPA_PERIODOS, etapa_periodos)] + sorted(
+    ETAPAS_ABAS.values(), key=lambda etapa: etapa[0] != ETAPAS_ABAS.get(aba_sel, ("",))[0]
 )
+tarefa_abas = fila_tarefas().submeter(
+    id_sessao, "abas",
+    (relatorio_carga["chave"], estado_filtros, tuple(limites_sel), granularidade, k_top, minimo_viagens,
+     por_empresa, n_alertas, minimo_alertas, aba_sel),
+    etapas_abas,
+)
+
+
+def resultado_aba(aba):
+    # espera (com a barra de progresso) só a etapa da visão na tela
+    nome = ETAPAS_ABAS[aba][0]
+    aguardar(tarefa_abas, [nome])
+    return tarefa_abas.resultado(nome)
+
+
+aguardar(tarefa_abas, [ETAPA_PERIODOS])
+try:
+    with rastro.etapa("BLOCOS 9 e 10 — dia de referência, dias equivalentes e janela"):
+        periodos = tarefa_abas.resultado(ETAPA_PERIODOS)
+except ValueError as erro:
+    st.error(str(erro))
+    st.stop()
+
+if periodos["dias_equiv"]:
+    st.sidebar.caption(
+        "Dias equivalentes: " + ", ".join(f"{d:%d/%m}" for d in periodos["dias_equiv"])
+    )
+else:
+    st.sidebar.caption("Sem dias equivalentes anteriores para este dia.")
+
+ultimo_dia, tipo_dia_ult = periodos["ultimo_dia"], periodos["tipo_dia"]
+
+# chave das figuras desta visão neste estado (ver figura(), BLOCO 4)
+estado_figuras = (relatorio_carga["chave"], estado_filtros, tuple(limites_sel), aba_sel)
 
 # ====================================================================================
 # BLOCO 12 — ABA 1: ADIANTAMENTO (VELOCÍMETROS)
 # ====================================================================================
 
-with aba1:
+if aba_sel == ABAS[0]:
     st.header("Adiantamento das Viagens — Último dia vs dias equivalentes anteriores")
     st.caption(f"Sistema selecionado: {sistema_sel}")
 
-    colunas = st.columns(3)
-    limites = [3, 5, 10]
+    # dia de referência e dias equivalentes já estão somados no resumo por dia
+    colunas = st.columns(len(limites_sel))
+    with rastro.etapa("BLOCO 12 — adiantamento") as etapa:
+        resultados = relatorios.tabela_limites(
+            resumo_dias["contagens"][k_dia], resumo_dias["base"][k_dia], limites_sel
+        )
+        etapa.saida = len(resultados)
 
     tipo_label = tipo_dia_ult.lower()
 
-    for idx, LIM in enumerate(limites):
-        qtd_dia, pct_dia, pct_base = calcula_adiantamento_equiv(df_base_equiv, df_ultimo, LIM)
-        desvio = pct_dia - pct_base
+    for idx, linha in enumerate(resultados.itertuples(index=False)):
+        LIM, qtd_dia, pct_dia, pct_base, desvio = linha
+
+        def montar_velocimetro():
+            import plotly.graph_objects as go
 
-        with colunas[idx]:
             fig_gauge = go.Figure(
                 go.Indicator(
                     mode="gauge+number+delta",
@@ -380,244 +763,364 @@ with aba1:
             )
 
             fig_gauge.update_layout(
-                title=f"Adiantadas > {LIM} min",
+                title=f"Adiantadas > {LIM:g} min".replace(".", ","),
                 height=320,
                 margin=dict(l=10, r=10, t=70, b=10)
             )
+            return fig_gauge
 
-            st.plotly_chart(fig_gauge, use_container_width=True)
+        with colunas[idx]:
+            st.plotly_chart(figura(estado_figuras + ("velocímetro", LIM), montar_velocimetro), width="stretch")
 
             st.markdown(
                 f"""
                 <div style="text-align:center; font-size:16px; margin-top:-12px;">
-                Último dia: <b>{qtd_dia}</b> viagens ({pct_dia:.2f}%) • 
-                Média de dias equivalentes ({tipo_label}): <b>{pct_base:.2f}%</b> 
+                Último dia: <b>{qtd_dia}</b> viagens ({pct_dia:.2f}%) •
+                Média de dias equivalentes ({tipo_label}): <b>{pct_base:.2f}%</b>
                 ({'+' if desvio>=0 else ''}{desvio:.2f} p.p.)
                 </div>
                 """,
                 unsafe_allow_html=True
             )
 
+    # Percentis do adiantamento (só das viagens adiantadas, > 0 min)
+    with rastro.etapa("BLOCO 12 — percentis de adiantamento"):
+        tabela_pct = relatorios.tabela_percentis(resumo_dias["contagens"][k_dia], resumo_dias["base"][k_dia])
+
+    st.markdown("#### Quanto as viagens adiantadas se adiantam (minutos)")
+    st.dataframe(
+        tabela_pct.style.format(
+            lambda v: formato_br_num(v, casas=1),
+            subset=["Último Dia (min)", "Dias Equivalentes (min)"],
+        ),
+        hide_index=True,
+        width="stretch",
+    )
+    st.caption(
+        "Percentis das viagens com adiantamento acima de 0 min, calculados em faixas de meio minuto "
+        "(erro de até 0,5 min; acima de 120 min aparece como 120)."
+    )
+
+    # Todos os dias, cada um com os seus dias equivalentes; a tabela (com o
+    # semáforo) só é montada com o expander aberto
+    with st.expander(
+        "Resumo por dia", **opcao_guardada("resumo_por_dia", opcoes.get("resumo_por_dia", False))
+    ) as resumo_por_dia:
+        if resumo_por_dia.open:
+            tabela_semáforo(
+                referencia.tabela_dias(resumo_dias, limites_sel),
+                colunas_pct=[
+                    c for lim in limites_sel
+                    for c in (analises.coluna_pct(lim), f"{analises.coluna_pct(lim)} (equiv.)")
+                ],
+                titulo="Adiantadas por dia x dias equivalentes de cada dia",
+            )
+
 # ====================================================================================
 # BLOCO 13 — ABA 2: SITUAÇÃO DA VIAGEM (GRÁFICO + TABELA)
 # ====================================================================================
 
-with aba2:
+if aba_sel == ABAS[1]:
     st.header("Situação da Viagem — Último dia vs dias equivalentes anteriores")
     st.caption(f"Sistema selecionado: {sistema_sel}")
 
-    # Tabelas base
-    tab_ult = df_ultimo.groupby("Situação_viagem").size().reset_index(name="Qtd Último Dia")
-
-    if df_base_equiv.empty:
-        tab_base = tab_ult.copy()
-        tab_base["Qtd Base Dias Equivalentes"] = 0
-        tab_base = tab_base[["Situação_viagem", "Qtd Base Dias Equivalentes"]]
-    else:
-        tab_base = (
-            df_base_equiv.groupby("Situação_viagem")
-            .size()
-            .reset_index(name="Qtd Base Dias Equivalentes")
-        )
-
-    tabela_vg = tab_ult.merge(tab_base, on="Situação_viagem", how="outer").fillna(0)
-
-    soma_ult = tabela_vg["Qtd Último Dia"].sum()
-    soma_base = tabela_vg["Qtd Base Dias Equivalentes"].sum()
-
-    tabela_vg["% Último Dia"] = (
-        tabela_vg["Qtd Último Dia"] / soma_ult * 100 if soma_ult > 0 else 0
-    )
-    tabela_vg["% Dias Equivalentes"] = (
-        tabela_vg["Qtd Base Dias Equivalentes"] / soma_base * 100 if soma_base > 0 else 0
-    )
-    tabela_vg["Desvio (p.p.)"] = tabela_vg["% Último Dia"] - tabela_vg["% Dias Equivalentes"]
+    with rastro.etapa("BLOCO 13 — tabela de Situação_viagem") as etapa:
+        tabela_vg = resultado_aba(ABAS[1])
+        etapa.saida = len(tabela_vg)
 
     # Gráfico SEM "Viagem concluída"
-    grafico_vg = tabela_vg.copy()
-    sv_norm = grafico_vg["Situação_viagem"].astype(str).str.strip().str.lower()
-    grafico_vg = grafico_vg[~sv_norm.isin(["viagem concluída", "viagem concluida"])]
-
-    fig_vg = px.bar(
-        grafico_vg,
-        x="Situação_viagem",
-        y=["% Dias Equivalentes", "% Último Dia"],
-        barmode="group",
-        labels={"value": "% das viagens", "Situação_viagem": "Situação"},
-        height=450
-    )
-    fig_vg.update_layout(title="Situação da Viagem — Comparação (sem 'Viagem concluída')")
+    def montar_grafico_vg():
+        import plotly.express as px
+
+        fig_vg = px.bar(
+            analises.sem_concluida(tabela_vg),
+            x="Situação_viagem",
+            y=["% Dias Equivalentes", "% Último Dia"],
+            barmode="group",
+            labels={"value": "% das viagens", "Situação_viagem": "Situação"},
+            height=450
+        )
+        fig_vg.update_layout(title="Situação da Viagem — Comparação (sem 'Viagem concluída')")
+        return fig_vg
 
-    st.plotly_chart(fig_vg, use_container_width=True)
+    st.plotly_chart(figura(estado_figuras + ("barras",), montar_grafico_vg), width="stretch")
 
     # Tabela completa
     st.subheader("Tabela — Situação da Viagem (inclui 'Viagem concluída')")
-    st.dataframe(tabela_vg, use_container_width=True)
+    st.dataframe(tabela_vg, width="stretch")
 
 # ====================================================================================
 # BLOCO 14 — ABA 3: SITUAÇÃO CATEGORIA (GRÁFICO + TABELA)
 # ====================================================================================
 
-with aba3:
+if aba_sel == ABAS[2]:
     st.header("Situação Categoria — Último dia vs dias equivalentes anteriores")
     st.caption(f"Sistema selecionado: {sistema_sel}")
 
-    tab_cat_ult = df_ultimo.groupby("Situação_categoria").size().reset_index(name="Qtd Último Dia")
+    with rastro.etapa("BLOCO 14 — tabela de Situação_categoria") as etapa:
+        tabela_cat = resultado_aba(ABAS[2])
+        etapa.saida = len(tabela_cat)
 
-    if df_base_equiv.empty:
-        tab_cat_base = tab_cat_ult.copy()
-        tab_cat_base["Qtd Base Dias Equivalentes"] = 0
-        tab_cat_base = tab_cat_base[["Situação_categoria", "Qtd Base Dias Equivalentes"]]
-    else:
-        tab_cat_base = (
-            df_base_equiv.groupby("Situação_categoria")
-            .size()
-            .reset_index(name="Qtd Base Dias Equivalentes")
+    # Gráfico primeiro
+    def montar_grafico_cat():
+        import plotly.express as px
+
+        fig_cat = px.bar(
+            tabela_cat,
+            x="Situação_categoria",
+            y=["% Dias Equivalentes", "% Último Dia"],
+            barmode="group",
+            labels={"value": "% das viagens", "Situação_categoria": "Categoria"},
+            height=450
         )
+        fig_cat.update_layout(title="Situação Categoria — Comparação")
+        return fig_cat
 
-    tabela_cat = tab_cat_ult.merge(tab_cat_base, on="Situação_categoria", how="outer").fillna(0)
-
-    soma_cat_ult = tabela_cat["Qtd Último Dia"].sum()
-    soma_cat_base = tabela_cat["Qtd Base Dias Equivalentes"].sum()
-
-    tabela_cat["% Último Dia"] = (
-        tabela_cat["Qtd Último Dia"] / soma_cat_ult * 100 if soma_cat_ult > 0 else 0
-    )
-    tabela_cat["% Dias Equivalentes"] = (
-        tabela_cat["Qtd Base Dias Equivalentes"] / soma_cat_base * 100 if soma_cat_base > 0 else 0
-    )
-    tabela_cat["Desvio (p.p.)"] = tabela_cat["% Último Dia"] - tabela_cat["% Dias Equivalentes"]
-
-    # Gráfico primeiro
-    fig_cat = px.bar(
-        tabela_cat,
-        x="Situação_categoria",
-        y=["% Dias Equivalentes", "% Último Dia"],
-        barmode="group",
-        labels={"value": "% das viagens", "Situação_categoria": "Categoria"},
-        height=450
-    )
-    fig_cat.update_layout(title="Situação Categoria — Comparação")
-    st.plotly_chart(fig_cat, use_container_width=True)
+    st.plotly_chart(figura(estado_figuras + ("barras",), montar_grafico_cat), width="stretch")
 
     # Tabela abaixo
     st.subheader("Tabela — Situação Categoria")
-    st.dataframe(tabela_cat, use_container_width=True)
+    st.dataframe(tabela_cat, width="stretch")
 
 # ====================================================================================
 # BLOCO 15 — ABA 4: RANKING DE EMPRESAS (ÚLTIMOS 7 DIAS)
 # ====================================================================================
 
-with aba4:
+if aba_sel == ABAS[3]:
     st.header(f"Ranking de Empresas — Últimos {JANELA_RANK_DIAS} dias (filtros aplicados)")
     st.caption(f"Sistema selecionado: {sistema_sel}")
 
-    if "Empresa" not in df_rank_janela.columns:
+    # por empresa (todas), por linha ou por empresa x linha (só os K maiores %);
+    # os valores já foram lidos no BLOCO 11, para a tarefa das abas
+    if granularidades:
+        st.radio("Granularidade", granularidades, horizontal=True, **opcao_guardada("granularidade", granularidade))
+    colunas_grupo = ranking.GRANULARIDADES[granularidade]
+    rotulo_grupo = {"Empresa": "empresa", "Linha": "linha", "Empresa × Linha": "empresa e linha"}[granularidade]
+    if granularidade != "Empresa":
+        col_k, col_min = st.columns(2)
+        col_k.number_input(
+            "Mostrar as K maiores (% adiantadas)", min_value=1, max_value=1000, **opcao_guardada("k_top", k_top)
+        )
+        col_min.number_input(
+            "Mínimo de viagens na janela", min_value=0, step=10, **opcao_guardada("minimo_viagens", minimo_viagens)
+        )
+
+    if not consulta_viagens.tem_coluna("Empresa"):
         st.info("A coluna 'Empresa' não existe na base. Ranking não pode ser gerado.")
+    elif not periodos["tem_janela"]:
+        st.info("Não há dados na janela de dias selecionada para os filtros atuais.")
     else:
-        df_rank = df_rank_janela.copy()
-        if df_rank.empty:
-            st.info("Não há dados na janela de dias selecionada para os filtros atuais.")
-        else:
-            # ------------------- RANKING 1 — ADIANTAMENTO -------------------
-            st.markdown("### Ranking 1 — Adiantamento (>3, >5, >10 minutos)")
+        with rastro.etapa(f"BLOCO 15 — rankings por {rotulo_grupo}") as etapa:
+            resumo1, tabela_sv_emp, tabela_cat_emp = resultado_aba(ABAS[3])
+            etapa.saida = len(resumo1)
+        if k_top is not None:
+            st.caption(
+                f"{formato_br_num(len(resumo1))} maiores percentuais (>{max(limites_sel):g} min) entre os "
+                f"grupos com pelo menos {formato_br_num(minimo_viagens)} viagens; os rankings 2 e 3 "
+                "mostram os mesmos grupos, na mesma ordem."
+            )
+
+        # ------------------- RANKING 1 — ADIANTAMENTO -------------------
+        rotulos_limites = ", ".join(f">{lim:g}".replace(".", ",") for lim in limites_sel)
+        st.markdown(f"### Ranking 1 — Adiantamento ({rotulos_limites} minutos)")
 
-            grp = df_rank.groupby("Empresa")
-            resumo1 = grp.agg(
-                Total=("Empresa", "size"),
-                Adianta3=("Adianta_3", "sum"),
-                Adianta5=("Adianta_5", "sum"),
-                Adianta10=("Adianta_10", "sum"),
-            ).reset_index()
+        colunas_pct1 = [analises.coluna_pct(lim) for lim in limites_sel]
 
-            resumo1["% >3 min"] = resumo1["Adianta3"] / resumo1["Total"] * 100
-            resumo1["% >5 min"] = resumo1["Adianta5"] / resumo1["Total"] * 100
-            resumo1["% >10 min"] = resumo1["Adianta10"] / resumo1["Total"] * 100
+        tabela_semáforo(
+            resumo1,
+            colunas_pct=colunas_pct1,
+            titulo=f"Maiores percentuais de viagens adiantadas por {rotulo_grupo}",
+        )
 
-            resumo1 = resumo1.sort_values("% >10 min", ascending=False)
+        # ------------------- RANKING 2 — SITUAÇÃO DA VIAGEM (TODAS, EXCETO CONCLUÍDA) -------------------
+        st.markdown(f"### Ranking 2 — Situação da Viagem (distribuição por {rotulo_grupo}, exceto 'Viagem concluída')")
 
-            colunas_pct1 = ["% >3 min", "% >5 min", "% >10 min"]
+        if tabela_sv_emp.empty:
+            st.info("Não há dados de Situação da Viagem (exceto 'Viagem concluída') para esta janela.")
+        else:
+            colunas_pct2 = [c for c in tabela_sv_emp.columns if c not in colunas_grupo]
 
             tabela_semáforo(
-                resumo1[["Empresa", "Total"] + colunas_pct1],
-                colunas_pct=colunas_pct1,
-                titulo="Empresas com maiores percentuais de viagens adiantadas",
+                tabela_sv_emp,
+                colunas_pct=colunas_pct2,
+                titulo=f"Distribuição de Situação da Viagem por {rotulo_grupo} (% dentro do grupo)",
             )
 
-            # ------------------- RANKING 2 — SITUAÇÃO DA VIAGEM (TODAS, EXCETO CONCLUÍDA) -------------------
-            st.markdown("### Ranking 2 — Situação da Viagem (distribuição por empresa, exceto 'Viagem concluída')")
+        # ------------------- RANKING 3 — SITUAÇÃO CATEGORIA -------------------
+        st.markdown(f"### Ranking 3 — Situação Categoria (distribuição por {rotulo_grupo})")
 
-            df_sv = df_rank.copy()
-            df_sv["Situação_viagem"] = df_sv["Situação_viagem"].fillna("")
+        tabela_semáforo(
+            tabela_cat_emp,
+            colunas_pct=analises.CATEGORIAS,
+            titulo=f"Distribuição de Situação Categoria por {rotulo_grupo} (% dentro do grupo)",
+        )
 
-            sv_norm = df_sv["Situação_viagem"].str.strip().str.lower()
-            mask_concl = sv_norm.isin(["viagem concluída", "viagem concluida"])
-            df_sv = df_sv[~mask_concl]
+# ====================================================================================
+# BLOCO 16 — ABA 5: TENDÊNCIA (PERÍODO INTEIRO)
+# ====================================================================================
 
-            if df_sv.empty:
-                st.info("Não há dados de Situação da Viagem (exceto 'Viagem concluída') para esta janela.")
-            else:
-                total_emp_sv = df_sv.groupby("Empresa")["Situação_viagem"].size().rename("TotalEmp")
-                dist_sv = (
-                    df_sv.groupby(["Empresa", "Situação_viagem"])
-                    .size()
-                    .rename("Qtd")
-                    .reset_index()
-                )
+if aba_sel == ABAS[4]:
+    st.header("Tendência — todos os dias carregados")
+    st.caption(f"Sistema selecionado: {sistema_sel} • linha pontilhada: dia de referência")
 
-                dist_sv = dist_sv.merge(total_emp_sv, on="Empresa", how="left")
-                dist_sv["%"] = dist_sv["Qtd"] / dist_sv["TotalEmp"] * 100
+    if consulta_viagens.tem_coluna("Empresa"):
+        st.radio("Agrupar por", ["Sistema", "Empresa"], horizontal=True, **opcao_guardada("agrupar_por", agrupar_por))
 
-                tabela_sv_emp = dist_sv.pivot_table(
-                    index="Empresa",
-                    columns="Situação_viagem",
-                    values="%",
-                    fill_value=0,
-                ).reset_index()
+    with rastro.etapa("BLOCO 16 — séries de tendência") as etapa:
+        serie_adi, serie_sv, serie_cat = resultado_aba(ABAS[4])
+        etapa.saida = len(serie_adi)
 
-                colunas_pct2 = [c for c in tabela_sv_emp.columns if c != "Empresa"]
+    def grafico_tendencia(serie, coluna, titulo):
+        # por sistema, uma linha por indicador/situação; por empresa, uma
+        # linha por empresa e um gráfico por indicador/situação
+        def montar():
+            import plotly.express as px
 
-                tabela_semáforo(
-                    tabela_sv_emp,
-                    colunas_pct=colunas_pct2,
-                    titulo="Distribuição de Situação da Viagem por Empresa (% dentro da empresa)",
+            if por_empresa:
+                n_graficos = serie[coluna].nunique()
+                fig = px.line(
+                    serie, x="Data", y="%", color="Grupo", facet_row=coluna,
+                    labels={"%": "% das viagens", "Grupo": "Empresa"}, height=max(300, 220 * n_graficos),
                 )
+                fig.for_each_annotation(lambda a: a.update(text=a.text.split("=", 1)[-1]))
+                fig.update_yaxes(matches=None)
+            else:
+                fig = px.line(serie, x="Data", y="%", color=coluna, labels={"%": "% das viagens"}, height=420)
+            fig.add_vline(x=dia_sel.to_pydatetime(), line_dash="dot", line_color="gray")
+            fig.update_layout(title=titulo)
+            return fig
 
-            # ------------------- RANKING 3 — SITUAÇÃO CATEGORIA -------------------
-            st.markdown("### Ranking 3 — Situação Categoria (distribuição por empresa)")
+        # a situação escolhida (por empresa) também entra na chave
+        chave = estado_figuras + (por_empresa, coluna, tuple(serie[coluna].unique()))
+        st.plotly_chart(figura(chave, montar), width="stretch")
 
-            categorias = ["ACI", "AVL", "CII", "EXT", "IAC", "IEP", "MRI", "OK", "QUE", "SIS", "TRI", "VNR"]
+    if serie_adi.empty:
+        st.info("Não há viagens com data para os filtros atuais.")
+    else:
+        grafico_tendencia(serie_adi, "Indicador", "% de viagens adiantadas por dia")
+
+        # Situação da viagem SEM "Viagem concluída" (como na aba 2); % sobre todas as viagens
+        serie_sv = analises.sem_concluida(serie_sv)
+        if not serie_sv.empty:
+            if por_empresa:
+                situacao = st.selectbox("Situação da viagem", sorted(serie_sv["Situação_viagem"].unique()))
+                serie_sv = serie_sv[serie_sv["Situação_viagem"] == situacao]
+            grafico_tendencia(serie_sv, "Situação_viagem", "Situação da Viagem por dia (sem 'Viagem concluída')")
+
+        if not serie_cat.empty:
+            if por_empresa:
+                categoria = st.selectbox("Situação categoria", sorted(serie_cat["Situação_categoria"].unique()))
+                serie_cat = serie_cat[serie_cat["Situação_categoria"] == categoria]
+            grafico_tendencia(serie_cat, "Situação_categoria", "Situação Categoria por dia")
 
-            df_cat = df_rank.copy()
-            df_cat["Situação_categoria"] = df_cat["Situação_categoria"].fillna("")
+# ====================================================================================
+# BLOCO 17 — ABA 6: ALERTAS (TODAS AS EMPRESAS X LINHAS X FAIXAS)
+# ====================================================================================
 
-            total_emp = df_cat.groupby("Empresa")["Situação_categoria"].size().rename("TotalEmp")
-            dist = (
-                df_cat.groupby(["Empresa", "Situação_categoria"])
-                .size()
-                .rename("Qtd")
-                .reset_index()
-            )
+if aba_sel == ABAS[5]:
+    st.header("Alertas — Maiores desvios do último dia por empresa, linha e faixa horária")
+    st.caption(
+        f"Sistema selecionado: {sistema_sel} • cada combinação de empresa, linha e faixa horária "
+        "dos filtros comparada com ela mesma nos dias equivalentes"
+    )
 
-            dist = dist.merge(total_emp, on="Empresa", how="left")
-            dist["% Categoria"] = dist["Qtd"] / dist["TotalEmp"] * 100
+    # os valores já foram lidos no BLOCO 11, para a tarefa das abas
+    col_n, col_min = st.columns(2)
+    col_n.number_input("Quantos alertas", min_value=1, max_value=1000, **opcao_guardada("n_alertas", n_alertas))
+    col_min.number_input(
+        "Mínimo de viagens (último dia e dias equivalentes)", min_value=1,
+        **opcao_guardada("minimo_alertas", minimo_alertas),
+    )
 
-            tabela_cat_emp = dist.pivot_table(
-                index="Empresa",
-                columns="Situação_categoria",
-                values="% Categoria",
-                fill_value=0,
-            )
+    with rastro.etapa("BLOCO 17 — alertas") as etapa:
+        tabela_alertas = resultado_aba(ABAS[5])
+        etapa.saida = len(tabela_alertas)
 
-            # garantir todas as categorias em colunas (mesmo que 0)
-            for c in categorias:
-                if c not in tabela_cat_emp.columns:
-                    tabela_cat_emp[c] = 0
+    if not periodos["dias_equiv"]:
+        st.info("Sem dias equivalentes anteriores para este dia: não há com o que comparar.")
+    elif tabela_alertas.empty:
+        st.info("Nenhum desvio entre as combinações com o mínimo de viagens.")
+    else:
+        st.dataframe(
+            tabela_alertas.style.format(
+                lambda v: formato_br_num(v, casas=1),
+                subset=["% Último Dia", "% Dias Equivalentes", "Desvio (p.p.)", "Escore z"],
+            ).format(formato_br_num, subset=["Viagens Último Dia", "Viagens Dias Equivalentes"]),
+            hide_index=True,
+            width="stretch",
+        )
+        st.caption(
+            "Indicadores: % de viagens adiantadas acima de cada limite e % de cada Situação da Viagem. "
+            "Ordem: maior escore z (teste de duas proporções) em valor absoluto, que pesa o desvio em p.p. "
+            "pelo número de viagens; |z| acima de 2 dificilmente é variação normal. Clique no cabeçalho "
+            "de uma coluna para reordenar."
+        )
 
-            tabela_cat_emp = tabela_cat_emp[categorias].reset_index()
+# ====================================================================================
+# BLOCO 18 — INSTRUMENTAÇÃO (PAINEL_INSTRUMENTACAO=1)
+# ====================================================================================
 
-            tabela_semáforo(
-                tabela_cat_emp,
-                colunas_pct=categorias,
-                titulo="Distribuição de Situação Categoria por Empresa (% dentro da empresa)",
+if rastro.ativa:
+    # guarda as últimas execuções da sessão para o rastro exportado
+    historico = st.session_state.setdefault("rastros_instrumentacao", [])
+    historico.append(rastro.resumo())
+    del historico[:-50]
+
+    with st.sidebar.expander("Instrumentação (esta execução)"):
+        registros = pd.DataFrame(rastro.registros)
+        if registros.empty:
+            st.caption("Nenhum bloco medido.")
+        else:
+            st.dataframe(
+                registros.drop(columns="erro").round(4),
+                hide_index=True,
+                width="stretch",
+            )
+            st.caption(f"Total: {registros['segundos'].sum():.3f} s")
+        st.download_button(
+            "Exportar rastro (JSON)",
+            data=instrumentacao.exportar_json(historico),
+            file_name="rastro_painel.json",
+            mime="application/json",
+        )
+
+# ====================================================================================
+# BLOCO 19 — BASES EM MEMÓRIA (REGISTRO COMPARTILHADO ENTRE AS SESSÕES)
+# ====================================================================================
+
+def rotulo_base(chave):
+    # hash do upload encurtado; o acervo aparece como pasta e revisão
+    return chave if chave.startswith("acervo:") else chave[:12]
+
+
+if BACKEND == "pandas":
+    bases_em_memoria = registro_bases()
+    # a tabela só é montada com o expander aberto
+    with st.sidebar.expander(
+        "Bases em memória (servidor)", **opcao_guardada("bases_em_memoria", opcoes.get("bases_em_memoria", False))
+    ) as painel_bases:
+        if painel_bases.open:
+            residentes = bases_em_memoria.resumo()
+            st.caption(
+                f"{formato_br_num(bases_em_memoria.ocupado() / 1024**2, casas=1)} MB de "
+                f"{formato_br_num(bases_em_memoria.orcamento / 1024**2)} MB • "
+                f"{formato_br_num(residentes['Base'].nunique())} bases • "
+                f"{formato_br_num(bases_em_memoria.removidos)} itens já removidos pelo limite"
             )
+            if residentes.empty:
+                st.caption("Nenhuma base em memória.")
+            else:
+                residentes.insert(1, "Esta sessão", residentes["Base"] == relatorio_carga["chave"])
+                st.dataframe(
+                    residentes.assign(Base=residentes["Base"].map(rotulo_base)).round({"MB": 1}),
+                    hide_index=True,
+                    width="stretch",
+                )
+
+                # tirar outra base da memória (quem a estiver usando monta de novo, do cache em disco)
+                outras = sorted(set(residentes.loc[~residentes["Esta sessão"], "Base"]))
+                if outras:
+                    base_remover = st.selectbox("Base", outras, format_func=rotulo_base, key="base_remover")
+                    if st.button("Tirar da memória"):
+                        bases_em_memoria.remover(base_remover)
+                        st.rerun()
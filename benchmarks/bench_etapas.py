@@ -0,0 +1,187 @@
+"""
+Tempo e pico de memória de cada etapa do painel, em bases sintéticas de
+vários tamanhos (painel.sintetico).
+
+Etapas: carga do CSV, conversão dos horários, enriquecimento (Tipo_Dia,
+Sistema, faixas, adiantamento), cubo + índice, filtros, último dia / dias
+equivalentes, cada aba, os rankings (por empresa e por empresa x linha),
+os alertas (empresa x linha x faixa horária), histograma de adiantamento e séries da aba de tendência (período inteiro,
+por empresa). Cada etapa roda uma vez só para o tempo e outra com
+tracemalloc para o pico de memória (--sem-memoria pula a segunda). Os resultados vão para um JSON, para comparar versões.
+
+Uso:
+    python benchmarks/bench_etapas.py --linhas 100000 1000000 10000000 --json etapas.json
+"""
+
+import argparse
+import datetime
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+RAIZ = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, RAIZ)
+
+from painel import analises, carga, consulta, relatorios, sintetico, tratamento  # noqa: E402
+
+
+def arquivo_sintetico(pasta, n_linhas, dias):
+    """CSV sintético com n_linhas viagens (reaproveitado se já existir)."""
+    caminho = os.path.join(pasta, f"viagens_{n_linhas}_{dias}d.csv")
+    if not os.path.exists(caminho):
+        print(f"Gerando {caminho}...")
+        sintetico.gravar(sintetico.gerar_viagens(n_linhas, dias=dias), caminho)
+    return caminho
+
+
+def medir(func, memoria=True):
+    """Roda func() para o tempo e, se pedido, de novo sob tracemalloc. Retorna (resultado, medidas)."""
+    inicio = time.perf_counter()
+    resultado = func()
+    medidas = {"segundos": time.perf_counter() - inicio}
+    if memoria:
+        tracemalloc.start()
+        func()
+        medidas["pico_mb"] = tracemalloc.get_traced_memory()[1] / 1024**2
+        tracemalloc.stop()
+    return resultado, medidas
+
+
+def _tamanho(resultado):
+    if isinstance(resultado, (pd.DataFrame, pd.Series, np.ndarray)):
+        return len(resultado)
+    if isinstance(resultado, tuple) and resultado and hasattr(resultado[0], "__len__"):
+        return len(resultado[0])
+    return None
+
+
+def etapas(caminho, janela):
+    """Gera (nome, função) das etapas, em ordem; cada uma usa o que as anteriores deixaram."""
+    estado = {}
+
+    def carregar():
+        df, _ = carga.carregar_arquivos([carga.abrir_arquivo(caminho)], processos=1)
+        estado["df"] = df
+        # texto original dos horários, para a conversão poder rodar duas vezes
+        estado["textos"] = {c: df[c] for c in tratamento.COLUNAS_HORARIO}
+        return df
+
+    def horarios():
+        df = estado["df"]
+        for c, serie in estado["textos"].items():
+            df[c] = tratamento.converter_horarios(serie)[0]
+        df["Data_Agendada"] = df["Horário_agendado"].dt.normalize()
+        return df
+
+    def enriquecer():
+        return tratamento.enriquecer(estado["df"])
+
+    def cubo():
+        estado["cubo"], estado["indice"] = relatorios.montar_cubo(estado["df"])
+        return estado["cubo"]
+
+    def filtros():
+        estado["posicoes"] = relatorios.posicoes_filtro(estado["cubo"], "Transcol")
+        return estado["posicoes"]
+
+    def periodos():
+        estado["periodos"] = relatorios.separar_periodos(
+            estado["cubo"], estado["indice"], estado["posicoes"], janela=janela
+        )
+        return estado["periodos"]["pos_base_equiv"]
+
+    def histograma():
+        estado["hist"], estado["indice_hist"] = relatorios.montar_histograma(estado["df"])
+        return estado["hist"]
+
+    def tendencia():
+        consulta_viagens = consulta.ConsultaPandas(
+            estado["cubo"], estado["indice"], estado["hist"], estado["indice_hist"]
+        )
+        filtro = {"sistema": "Transcol"}
+        return (
+            consulta_viagens.tendencia_adiantamento(filtro, analises.LIMITES_ADIANTAMENTO, por_empresa=True),
+            consulta_viagens.tendencia_distribuicao(filtro, "Situação_viagem", por_empresa=True),
+            consulta_viagens.tendencia_distribuicao(filtro, "Situação_categoria", por_empresa=True),
+        )
+
+    def aba(func, *posicoes, **extras):
+        return lambda: func(estado["cubo"], *[estado["periodos"][p] for p in posicoes], **extras)
+
+    yield "carga (csv)", carregar
+    yield "conversão de horários", horarios
+    yield "enriquecimento", enriquecer
+    yield "cubo + índice", cubo
+    yield "filtros", filtros
+    yield "último dia e dias equivalentes", periodos
+    yield "aba adiantamento", aba(relatorios.tabela_adiantamento, "pos_base_equiv", "pos_ultimo")
+    yield "aba situação da viagem", aba(
+        analises.tabela_comparativa, "pos_ultimo", "pos_base_equiv", coluna="Situação_viagem"
+    )
+    yield "aba situação categoria", aba(
+        analises.tabela_comparativa, "pos_ultimo", "pos_base_equiv", coluna="Situação_categoria"
+    )
+    yield "rankings (empresa)", aba(relatorios.rankings, "pos_rank")
+    yield "rankings (empresa x linha, top 20)", aba(
+        relatorios.rankings, "pos_rank", granularidade="Empresa × Linha", k=20
+    )
+    yield "alertas (empresa x linha x faixa)", aba(relatorios.tabela_alertas, "pos_ultimo", "pos_base_equiv")
+    yield "histograma de adiantamento", histograma
+    yield "tendência (por empresa)", tendencia
+
+
+def _commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=RAIZ, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--linhas", type=int, nargs="+", default=[100_000, 1_000_000, 10_000_000])
+    parser.add_argument("--dias", type=int, default=60, help="dias de histórico da base sintética")
+    parser.add_argument("--janela", type=int, default=relatorios.JANELA_RANK_DIAS)
+    parser.add_argument("--pasta", default=os.path.join(tempfile.gettempdir(), "painel_bench"),
+                        help="onde ficam os CSVs sintéticos (reaproveitados entre execuções)")
+    parser.add_argument("--sem-memoria", action="store_true", help="só tempos (sem tracemalloc)")
+    parser.add_argument("--json", help="grava os resultados neste arquivo")
+    args = parser.parse_args()
+    os.makedirs(args.pasta, exist_ok=True)
+
+    resultados = []
+    for n_linhas in args.linhas:
+        caminho = arquivo_sintetico(args.pasta, n_linhas, args.dias)
+        print(f"\n{n_linhas} viagens ({os.path.getsize(caminho) / 1024**2:.0f} MB)")
+        print(f"{'etapa':<34}{'segundos':>10}{'pico (MB)':>12}{'linhas':>12}")
+        for nome, func in etapas(caminho, args.janela):
+            resultado, medidas = medir(func, memoria=not args.sem_memoria)
+            medidas.update({"linhas": n_linhas, "etapa": nome, "linhas_saida": _tamanho(resultado)})
+            resultados.append(medidas)
+            pico = f"{medidas['pico_mb']:.1f}" if "pico_mb" in medidas else "-"
+            print(f"{nome:<34}{medidas['segundos']:>10.3f}{pico:>12}{medidas['linhas_saida'] or '':>12}")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({
+                "data": datetime.datetime.now().isoformat(timespec="seconds"),
+                "commit": _commit(),
+                "python": platform.python_version(),
+                "pandas": pd.__version__,
+                "numpy": np.__version__,
+                "resultados": resultados,
+            }, f, indent=2, ensure_ascii=False)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,143 @@
+"""
+Pico de memória e tempo de um clique nos filtros: fluxo antigo (cópias da
+base linha a linha + isin em texto) x filtros por códigos sobre o cubo.
+
+O fluxo antigo reproduz os BLOCOS 8 a 10 e as cópias do Ranking
+(df_sistema, df_filtro, df_hist, df_base_equiv, df_rank_janela, df_rank,
+df_sv, df_cat). O novo usa painel.filtros, painel.indice e painel.analises.
+A montagem do cubo e do índice (feita uma vez por base) é medida à parte.
+
+Uso:
+    python benchmarks/bench_filtros.py --linhas 5000000 --json resultado.json
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from painel import analises, cubo, filtros, indice, ranking, tratamento  # noqa: E402
+
+
+def base_tratada(n_linhas, semente=0):
+    """Base linha a linha já tratada (BLOCOS 5 a 7), com dados aleatórios."""
+    rng = np.random.default_rng(semente)
+    empresas = [f"Viação {i:02d}" for i in range(20)] + ["VJB Aquaviário"]
+    linhas = np.arange(500, 900)
+    situacoes = ["Viagem concluída", "Viagem adiantada", "Viagem atrasada", "Viagem não realizada"]
+    categorias = analises.CATEGORIAS
+
+    agendado = pd.Timestamp("2024-01-01") + pd.to_timedelta(
+        rng.integers(0, 60 * 24 * 60, n_linhas), unit="min"
+    )
+    realizado = agendado + pd.to_timedelta(rng.normal(0, 360, n_linhas).round(), unit="s")
+    df = pd.DataFrame({
+        "Horário_agendado": agendado,
+        "Horário_realizado": realizado,
+        "Situação_viagem": pd.Categorical.from_codes(rng.integers(0, len(situacoes), n_linhas), situacoes),
+        "Situação_categoria": pd.Categorical.from_codes(rng.integers(0, len(categorias), n_linhas), categorias),
+        "Empresa": pd.Categorical.from_codes(rng.integers(0, len(empresas), n_linhas), empresas),
+        "Linha": pd.Categorical.from_codes(rng.integers(0, len(linhas), n_linhas), linhas),
+    })
+    df, _ = tratamento.tratar_base(df)
+    return df
+
+
+def fluxo_antigo(df, sistema_sel, empresas_sel, linhas_sel, faixas_sel, janela=7):
+    """BLOCOS 8 a 10 e as cópias dos rankings como no painel original."""
+    df_sistema = df[df["Sistema"] == sistema_sel].copy()
+
+    mask = pd.Series(True, index=df_sistema.index)
+    mask &= df_sistema["Empresa"].astype(object).isin(empresas_sel)
+    mask &= df_sistema["Linha"].astype(object).isin(linhas_sel)
+    mask &= df_sistema["Faixa_Horaria"].astype(object).isin(faixas_sel)
+    df_filtro = df_sistema[mask].copy()
+
+    ultimo_dia = df_filtro["Data_Agendada"].max()
+    df_ultimo = df_filtro[df_filtro["Data_Agendada"] == ultimo_dia]
+    tipo_dia_ult = df_ultimo["Tipo_Dia"].iloc[0]
+    df_hist = df_filtro[df_filtro["Data_Agendada"] < ultimo_dia].copy()
+    n_dias = 5 if tipo_dia_ult == "Dia útil" else 1
+    datas_equiv = (
+        df_hist.loc[df_hist["Tipo_Dia"] == tipo_dia_ult, "Data_Agendada"]
+        .drop_duplicates().sort_values(ascending=False).head(n_dias)
+    )
+    df_base_equiv = df_filtro[df_filtro["Data_Agendada"].isin(datas_equiv)].copy()
+
+    inicio_rank = ultimo_dia - pd.Timedelta(days=janela - 1)
+    df_rank_janela = df_filtro[
+        (df_filtro["Data_Agendada"] >= inicio_rank) & (df_filtro["Data_Agendada"] <= ultimo_dia)
+    ].copy()
+    df_rank = df_rank_janela.copy()
+    df_sv = df_rank.copy()
+    df_cat = df_rank.copy()
+    return len(df_ultimo), len(df_base_equiv), len(df_rank) + len(df_sv) + len(df_cat)
+
+
+def fluxo_novo(cubo_viagens, indice_datas, sistema_sel, empresas_sel, linhas_sel, faixas_sel, janela=7):
+    """Os mesmos recortes por posições sobre o cubo (painel.filtros)."""
+    pos_filtro = filtros.filtrar(
+        cubo_viagens, sistema=sistema_sel, empresas=empresas_sel,
+        linhas=linhas_sel, faixas=faixas_sel,
+    )
+    ultimo_dia, _, pos_ultimo, pos_base = analises.separar_ultimo_dia(cubo_viagens, indice_datas, pos_filtro)
+    pos_rank = analises.janela_ranking(indice_datas, pos_filtro, ultimo_dia, janela)
+    ranking.rankings(ranking.contar(cubo_viagens, pos_rank))
+    return len(pos_ultimo), len(pos_base), len(pos_rank)
+
+
+def medir(func, *args):
+    tracemalloc.start()
+    inicio = time.perf_counter()
+    func(*args)
+    tempo = time.perf_counter() - inicio
+    _, pico = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {"segundos": tempo, "pico_mb": pico / 1024**2}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--linhas", type=int, default=1_000_000)
+    parser.add_argument("--json", help="grava os resultados neste arquivo")
+    args = parser.parse_args()
+
+    print(f"Gerando base com {args.linhas} viagens...")
+    df = base_tratada(args.linhas)
+
+    # seleção típica: metade das empresas e das linhas, todas as faixas
+    empresas = sorted(df.loc[df["Sistema"] == "Transcol", "Empresa"].dropna().unique())
+    linhas = sorted(df["Linha"].dropna().unique())
+    faixas = sorted(df["Faixa_Horaria"].dropna().unique())
+    selecao = ("Transcol", empresas[::2], linhas[::2], faixas)
+
+    resultados = {"linhas": args.linhas}
+    resultados["antigo"] = medir(fluxo_antigo, df, *selecao)
+
+    inicio = time.perf_counter()
+    cubo_viagens = cubo.montar_cubo(df)
+    indice_datas = indice.IndiceDatas(cubo_viagens)
+    resultados["montar_cubo_segundos"] = time.perf_counter() - inicio
+    resultados["linhas_cubo"] = len(cubo_viagens)
+    resultados["novo"] = medir(fluxo_novo, cubo_viagens, indice_datas, *selecao)
+
+    print(f"\nlinhas do cubo: {len(cubo_viagens)} (montagem {resultados['montar_cubo_segundos']:.2f} s, uma vez por base)")
+    print(f"{'fluxo':<8}{'segundos':>10}{'pico (MB)':>12}")
+    for nome in ("antigo", "novo"):
+        r = resultados[nome]
+        print(f"{nome:<8}{r['segundos']:>10.3f}{r['pico_mb']:>12.1f}")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(resultados, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,170 @@
+"""
+Partida a frio do app: tempo até a primeira tela e até cada visão aparecer
+pela primeira vez, cada medida num processo Python novo (nenhum módulo
+importado, nenhum cache do Streamlit).
+
+O app.py roda pelo streamlit.testing (AppTest), que executa o script como o
+servidor, sem navegador. Medidas:
+- processo: do início do processo filho até a tela inicial (o pedido de
+  upload, sem base)
+- tela inicial: só a execução do script, sem base
+- primeira tela com dados: base num acervo local (painel.acervo) montado de
+  uma base sintética, até sumir a barra de progresso
+- cada visão: primeira abertura e volta a ela (figuras já montadas)
+Em cada ponto, também se plotly.express e matplotlib já tinham sido
+importados (o plotly.graph_objects entra com o próprio streamlit, com os
+submódulos carregados só quando usados). Os resultados
+vão para um JSON, para comparar versões (--app aponta outro app.py).
+
+Uso:
+    python benchmarks/bench_partida.py --linhas 200000 --repeticoes 5 --json partida.json
+"""
+
+import time
+
+INICIO = time.perf_counter()
+
+import argparse  # noqa: E402
+import datetime  # noqa: E402
+import json  # noqa: E402
+import os  # noqa: E402
+import platform  # noqa: E402
+import statistics  # noqa: E402
+import subprocess  # noqa: E402
+import sys  # noqa: E402
+import tempfile  # noqa: E402
+
+RAIZ = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+
+# módulos que o app só deveria importar quando um gráfico aparece
+PESADOS = ["plotly.express", "matplotlib"]
+
+
+def _carregados():
+    return [m for m in PESADOS if m in sys.modules]
+
+
+def _ate_terminar(at):
+    """Roda o script de novo até sair a barra de progresso (etapas em segundo plano)."""
+    at.run()
+    while len(at.get("progress")):
+        time.sleep(0.05)
+        at.run()
+    if len(at.exception):
+        raise RuntimeError(at.exception[0].message)
+
+
+def medir_filho(app, com_dados):
+    """Medidas dentro do processo novo (modo --filho); imprime um JSON."""
+    from streamlit.testing.v1 import AppTest
+
+    medidas = {"importacao_s": time.perf_counter() - INICIO}
+    at = AppTest.from_file(app, default_timeout=600)
+    inicio = time.perf_counter()
+    _ate_terminar(at)
+    medidas["primeira_tela_s"] = time.perf_counter() - inicio
+    medidas["processo_s"] = time.perf_counter() - INICIO
+    medidas["modulos_primeira_tela"] = _carregados()
+
+    if com_dados:
+        visoes = [r for r in at.radio if r.label == "Visão"][0].options
+        for rodada in ["primeira", "volta"]:
+            for visao in visoes[1:] + visoes[:1]:
+                inicio = time.perf_counter()
+                [r for r in at.radio if r.label == "Visão"][0].set_value(visao)
+                _ate_terminar(at)
+                medidas[f"{visao} ({rodada})_s"] = time.perf_counter() - inicio
+        medidas["modulos_final"] = _carregados()
+    print(json.dumps(medidas))
+
+
+def preparar_acervo(pasta, n_linhas, dias):
+    """Acervo local com uma base sintética de n_linhas viagens (reaproveitado se já existir)."""
+    sys.path.insert(0, RAIZ)
+    from painel import acervo, carga, sintetico
+
+    diretorio = os.path.join(pasta, f"acervo_{n_linhas}_{dias}d")
+    if not os.path.isdir(diretorio):
+        caminho = os.path.join(pasta, f"viagens_{n_linhas}_{dias}d.csv")
+        if not os.path.exists(caminho):
+            print(f"Gerando {caminho}...")
+            sintetico.gravar(sintetico.gerar_viagens(n_linhas, dias=dias), caminho)
+        print(f"Montando o acervo em {diretorio}...")
+        acervo.adicionar([carga.abrir_arquivo(caminho)], diretorio)
+    return diretorio
+
+
+def rodar_filho(app, acervo_dir=None):
+    """Um processo novo medindo a partida; retorna (segundos do processo, medidas do filho)."""
+    ambiente = {k: v for k, v in os.environ.items() if not k.startswith("PAINEL_ACERVO")}
+    if acervo_dir:
+        ambiente["PAINEL_ACERVO_DIR"] = acervo_dir
+    comando = [sys.executable, os.path.abspath(__file__), "--filho", app] + (["--com-dados"] if acervo_dir else [])
+    inicio = time.perf_counter()
+    saida = subprocess.run(
+        comando, cwd=os.path.dirname(app), env=ambiente, capture_output=True, text=True, check=True
+    ).stdout
+    return time.perf_counter() - inicio, json.loads(saida.strip().splitlines()[-1])
+
+
+def _commit(pasta):
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=pasta, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--app", default=os.path.join(RAIZ, "app.py"), help="app.py medido (outra versão, por exemplo)")
+    parser.add_argument("--linhas", type=int, default=200_000, help="viagens da base sintética do acervo")
+    parser.add_argument("--dias", type=int, default=60, help="dias de histórico da base sintética")
+    parser.add_argument("--repeticoes", type=int, default=5, help="processos por cenário (vale a mediana)")
+    parser.add_argument("--pasta", default=os.path.join(tempfile.gettempdir(), "painel_bench"),
+                        help="onde ficam a base sintética e o acervo (reaproveitados entre execuções)")
+    parser.add_argument("--json", help="grava os resultados neste arquivo")
+    parser.add_argument("--filho", help=argparse.SUPPRESS)
+    parser.add_argument("--com-dados", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.filho:
+        medir_filho(args.filho, args.com_dados)
+        return
+
+    app = os.path.abspath(args.app)
+    os.makedirs(args.pasta, exist_ok=True)
+    acervo_dir = preparar_acervo(args.pasta, args.linhas, args.dias)
+
+    resultados = {}
+    for cenario, diretorio in [("sem base", None), ("com acervo", acervo_dir)]:
+        rodadas = []
+        for _ in range(args.repeticoes):
+            total, medidas = rodar_filho(app, diretorio)
+            medidas["total_com_interpretador_s"] = total
+            rodadas.append(medidas)
+        resultados[cenario] = rodadas
+
+        print(f"\n{cenario} ({args.repeticoes} processos, mediana)")
+        for nome in rodadas[0]:
+            if nome.endswith("_s"):
+                print(f"  {nome[:-2]:<44}{statistics.median(r[nome] for r in rodadas):>8.3f} s")
+        for nome in ["modulos_primeira_tela", "modulos_final"]:
+            if nome in rodadas[0]:
+                print(f"  {nome:<44}{', '.join(rodadas[0][nome]) or '-'}")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({
+                "data": datetime.datetime.now().isoformat(timespec="seconds"),
+                "app": app,
+                "commit": _commit(os.path.dirname(app)),
+                "python": platform.python_version(),
+                "linhas": args.linhas,
+                "resultados": resultados,
+            }, f, indent=2, ensure_ascii=False)
+
+
+if __name__ == "__main__":
+    main()
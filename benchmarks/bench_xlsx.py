@@ -0,0 +1,134 @@
+"""
+Benchmark da leitura de .xlsx: caminho antigo (pd.read_excel/openpyxl,
+todas as colunas) x leitura por linhas do painel (painel.carga.ler_xlsx).
+
+Cada medição roda em um processo novo, para o pico de memória (RSS) de
+uma não contaminar a outra.
+
+Uso:
+    python benchmarks/bench_xlsx.py --linhas 200000
+    python benchmarks/bench_xlsx.py --arquivo exportacao.xlsx --json resultado.json
+"""
+
+import argparse
+import io
+import json
+import multiprocessing
+import os
+import resource
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from painel import carga  # noqa: E402
+
+
+def gerar_planilha(caminho, n_linhas, semente=0):
+    """Gera um .xlsx no formato da exportação de viagens (com uma coluna extra)."""
+    import random
+
+    import openpyxl
+
+    rnd = random.Random(semente)
+    empresas = ["Viação Alfa", "Viação Beta", "Viação Gama", "VJB Aquaviário"]
+    situacoes = ["Viagem concluída", "Viagem adiantada", "Viagem atrasada", "Viagem não realizada"]
+    categorias = ["ACI", "AVL", "CII", "EXT", "IAC", "IEP", "MRI", "OK", "QUE", "SIS", "TRI", "VNR"]
+    inicio = datetime(2024, 3, 1)
+
+    pasta = openpyxl.Workbook(write_only=True)
+    planilha = pasta.create_sheet()
+    planilha.append([
+        "Horário agendado", "Horário realizado", "Situação viagem",
+        "Situação categoria", "Empresa", "Linha", "Observação",
+    ])
+    for _ in range(n_linhas):
+        agendado = inicio + timedelta(minutes=rnd.randrange(30 * 24 * 60))
+        realizado = agendado + timedelta(seconds=rnd.gauss(0, 360))
+        planilha.append([
+            agendado.strftime("%d/%m/%Y %H:%M:%S"),
+            realizado.strftime("%d/%m/%Y %H:%M:%S"),
+            rnd.choice(situacoes),
+            rnd.choice(categorias),
+            rnd.choice(empresas),
+            rnd.randrange(500, 700),
+            "",
+        ])
+    pasta.save(caminho)
+
+
+def _ler_antigo(caminho):
+    import pandas as pd
+
+    return len(pd.read_excel(caminho, engine="openpyxl"))
+
+
+def _ler_painel(caminho, motor):
+    with open(caminho, "rb") as f:
+        arquivo = io.BytesIO(f.read())
+    arquivo.name = os.path.basename(caminho)
+    df, _ = carga.ler_xlsx(arquivo, motor=motor)
+    return len(df)
+
+
+def _medir(fila, caso, caminho):
+    inicio = time.perf_counter()
+    if caso == "read_excel (openpyxl)":
+        linhas = _ler_antigo(caminho)
+    else:
+        linhas = _ler_painel(caminho, caso.split()[-1].strip("()"))
+    tempo = time.perf_counter() - inicio
+    pico_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    fila.put({"caso": caso, "linhas": linhas, "segundos": tempo, "pico_rss_mb": pico_mb})
+
+
+def medir(caso, caminho):
+    contexto = multiprocessing.get_context("spawn")
+    fila = contexto.Queue()
+    processo = contexto.Process(target=_medir, args=(fila, caso, caminho))
+    processo.start()
+    resultado = fila.get()
+    processo.join()
+    return resultado
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--linhas", type=int, default=200_000, help="linhas da planilha gerada")
+    parser.add_argument("--arquivo", help="usar um .xlsx existente em vez de gerar um")
+    parser.add_argument("--json", help="grava os resultados neste arquivo")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        caminho = args.arquivo
+        if caminho is None:
+            caminho = os.path.join(tmp, "viagens.xlsx")
+            print(f"Gerando planilha com {args.linhas} linhas...")
+            gerar_planilha(caminho, args.linhas)
+
+        casos = ["read_excel (openpyxl)", "painel (openpyxl)"]
+        try:
+            import python_calamine  # noqa: F401
+            casos.append("painel (calamine)")
+        except ImportError:
+            print("python-calamine não instalado: caso 'painel (calamine)' ignorado.")
+
+        resultados = [medir(caso, caminho) for caso in casos]
+
+    referencia = resultados[0]["segundos"]
+    print(f"\n{'caso':<24}{'linhas':>10}{'segundos':>11}{'pico RSS (MB)':>15}{'x antigo':>10}")
+    for r in resultados:
+        print(
+            f"{r['caso']:<24}{r['linhas']:>10}{r['segundos']:>11.2f}"
+            f"{r['pico_rss_mb']:>15.0f}{referencia / r['segundos']:>10.1f}"
+        )
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(resultados, f, indent=2, ensure_ascii=False)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,7 @@
+"""
+Funções de apoio do Painel de Categorização de Viagens.
+
+O app.py (Streamlit) cuida da tela; aqui ficam as rotinas de carga,
+tratamento e cálculo que não dependem do Streamlit. painel.relatorios
+reúne as contas das abas, e `python -m painel` gera os relatórios em lote.
+"""
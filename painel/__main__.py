@@ -0,0 +1,83 @@
+"""
+Relatórios do painel em lote, sem abrir o navegador.
+
+Calcula as tabelas das abas (adiantamento, situações e rankings de
+empresas) para cada Sistema x dia de referência, com as mesmas funções do
+app (painel.relatorios), e grava em Parquet, CSV ou HTML.
+
+Uso:
+    python -m painel viagens_jan.csv viagens_fev.xlsx --saida relatorios --formato parquet
+    python -m painel viagens.csv --saida relatorios --formato html --sistema Transcol --desde 2024-03-01
+    python -m painel --acervo /dados/acervo --saida relatorios --desde 2024-03-01
+    python -m painel viagens.csv --saida relatorios --feriados feriados.txt --dias-uteis 10
+"""
+
+import argparse
+import sys
+import time
+
+from painel import acervo, analises, carga, referencia, relatorios, tratamento
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m painel",
+        description="Gera os relatórios do painel para cada Sistema x dia de referência.",
+    )
+    parser.add_argument("arquivos", nargs="*", help="arquivos .csv ou .xlsx de viagens")
+    parser.add_argument("--acervo", help="usa o acervo local (painel.acervo); os arquivos, se houver, "
+                                         "são acrescentados a ele antes")
+    parser.add_argument("--saida", required=True, help="pasta onde os relatórios são gravados")
+    parser.add_argument("--formato", choices=relatorios.FORMATOS, default="parquet")
+    parser.add_argument("--sistema", action="append", choices=tratamento.SISTEMAS,
+                        help="só este sistema (pode repetir; padrão: todos)")
+    parser.add_argument("--desde", help="primeiro dia de referência (AAAA-MM-DD)")
+    parser.add_argument("--ate", help="último dia de referência (AAAA-MM-DD)")
+    parser.add_argument("--janela", type=int, default=relatorios.JANELA_RANK_DIAS,
+                        help="dias da janela do ranking (padrão: %(default)s)")
+    parser.add_argument("--dias-uteis", type=int, default=analises.DIAS_EQUIVALENTES["Dia útil"],
+                        help="dias úteis equivalentes na comparação (padrão: %(default)s)")
+    parser.add_argument("--dias-fim-de-semana", type=int, default=analises.DIAS_EQUIVALENTES["Sábado"],
+                        help="sábados/domingos (e feriados) equivalentes na comparação (padrão: %(default)s)")
+    parser.add_argument("--feriados", default=referencia.FERIADOS,
+                        help="calendário de feriados, uma data por linha (contam como domingo; "
+                             "padrão: PAINEL_FERIADOS)")
+    parser.add_argument("--processos", type=int, help="processos para ler os arquivos")
+    args = parser.parse_args(argv)
+    if not args.arquivos and not args.acervo:
+        parser.error("informe os arquivos de viagens ou --acervo")
+
+    n_dias = {"Dia útil": args.dias_uteis, "Sábado": args.dias_fim_de_semana, "Domingo": args.dias_fim_de_semana}
+    if min(n_dias.values()) < 1:
+        parser.error("os dias equivalentes precisam ser pelo menos 1")
+
+    inicio = time.perf_counter()
+    try:
+        feriados = referencia.ler_feriados(args.feriados)
+        arquivos = [carga.abrir_arquivo(caminho) for caminho in args.arquivos]
+        if args.acervo:
+            if arquivos:
+                acervo.adicionar(arquivos, args.acervo, processos=args.processos)
+            cubo_base, indice_datas = relatorios.cubo_do_acervo(args.acervo)
+            print(f"{acervo.resumo(args.acervo)['linhas']} viagens (acervo local)", file=sys.stderr)
+        else:
+            df, relatorio = relatorios.carregar_base(arquivos, processos=args.processos)
+            print(f"{relatorio['linhas']} viagens ({relatorio['origem']})", file=sys.stderr)
+            cubo_base, indice_datas = relatorios.montar_cubo(df)
+            del df
+    except (OSError, ValueError) as erro:
+        parser.exit(1, f"erro: {erro}\n")
+
+    lote = relatorios.gerar_lote(
+        cubo_base, indice_datas,
+        sistemas=args.sistema, inicio=args.desde, fim=args.ate, janela=args.janela,
+        n_dias=n_dias, feriados=feriados,
+    )
+    gravados = relatorios.gravar_lote(lote, args.saida, args.formato)
+
+    print(f"{len(gravados)} arquivos gravados em {args.saida} "
+          f"({time.perf_counter() - inicio:.1f} s)", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,388 @@
+"""
+Acervo local de viagens: a base tratada fica gravada em disco, particionada
+por Data_Agendada, e cada exportação nova só acrescenta o que ainda não está
+lá.
+
+Cada dia é uma pasta com as viagens tratadas (viagens.parquet), o cubo do
+dia (cubo.parquet) e o histograma de adiantamento do dia (histograma.parquet,
+painel.histograma). Ao acrescentar arquivos, só as viagens do lote passam
+pela leitura e pelo tratamento (BLOCOS 2 a 7); viagens repetidas são
+descartadas pela chave de cada uma (hash das colunas da exportação), e só os
+dias que ganharam viagens têm o cubo e o histograma refeitos. O cubo da
+base inteira é a concatenação dos cubos dos dias (e o histograma, a dos
+histogramas), sem reler nenhuma exportação, então a
+atualização diária custa o tamanho do lote, não o do histórico. O manifesto
+(acervo.json) é gravado a cada dia concluído: um lote interrompido pode ser
+enviado de novo, e os dias que ficaram pela metade são refeitos.
+
+Configuração por variáveis de ambiente:
+- PAINEL_ACERVO_DIR     : diretório do acervo (sem ela, o app usa só os
+                          arquivos enviados, como antes)
+- PAINEL_ACERVO_ENTRADA : pasta vigiada; exportações novas que aparecerem
+                          nela são acrescentadas ao acervo
+- PAINEL_ACERVO_INTERVALO : segundos entre verificações da pasta vigiada
+                          pelo app (padrão 300)
+
+Uso:
+    python -m painel.acervo adicionar viagens_0105.csv
+    python -m painel.acervo vigiar /dados/exportacoes --intervalo 300
+    python -m painel.acervo resumo
+"""
+
+import argparse
+import datetime
+import glob
+import json
+import os
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+from pandas.api.types import union_categoricals
+
+from painel import cache_disco, carga, cubo, histograma, tratamento
+
+DIRETORIO = os.environ.get("PAINEL_ACERVO_DIR", "")
+ENTRADA = os.environ.get("PAINEL_ACERVO_ENTRADA", "")
+INTERVALO = float(os.environ.get("PAINEL_ACERVO_INTERVALO", "300"))
+ATIVO = bool(DIRETORIO)
+
+# mudar quando o conteúdo gravado por dia mudar (força refazer o acervo)
+VERSAO = 3
+
+SEM_DATA = "sem_data"
+
+_MANIFESTO = "acervo.json"
+
+# um servidor do Streamlit atende várias sessões: uma gravação por vez
+_TRAVA = threading.Lock()
+
+
+def _manifesto_vazio():
+    return {"versao": VERSAO, "revisao": 0, "dias": {}, "arquivos": {}, "vistos": {}}
+
+
+def ler_manifesto(diretorio=DIRETORIO):
+    """Dias gravados (com nº de viagens), arquivos já incorporados e revisão."""
+    try:
+        with open(os.path.join(diretorio, _MANIFESTO), encoding="utf-8") as f:
+            manifesto = json.load(f)
+    except (OSError, ValueError):
+        return _manifesto_vazio()
+    if manifesto.get("versao") != VERSAO:
+        raise ValueError(
+            f"O acervo em {diretorio} foi gravado por outra versão do painel; "
+            "gere-o de novo a partir das exportações."
+        )
+    return manifesto
+
+
+def _gravar_manifesto(manifesto, diretorio):
+    arq = os.path.join(diretorio, _MANIFESTO)
+    tmp = f"{arq}.{os.getpid()}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(manifesto, f, ensure_ascii=False, indent=1)
+    os.replace(tmp, arq)
+
+
+def chave(diretorio=DIRETORIO):
+    """Identifica o conteúdo atual do acervo (muda a cada gravação)."""
+    return f"acervo:{os.path.abspath(diretorio)}:{ler_manifesto(diretorio)['revisao']}"
+
+
+def _pasta_dia(diretorio, dia):
+    return os.path.join(diretorio, f"dia={dia}")
+
+
+def _nome_dia(data):
+    return SEM_DATA if pd.isna(data) else pd.Timestamp(data).strftime("%Y-%m-%d")
+
+
+def chaves_viagens(df, arquivo):
+    """
+    Chave (uint64) de cada viagem: hash das colunas da exportação, combinado
+    com quantas vezes a mesma viagem já apareceu no mesmo arquivo. Duas
+    linhas idênticas num arquivo continuam sendo duas viagens; a mesma linha
+    em outra exportação (ou reenviada) dá a mesma chave e é descartada.
+    """
+    colunas = {}
+    for c in carga.COLUNAS_USADAS:
+        if c not in df.columns:
+            continue
+        serie = df[c]
+        if c in tratamento.COLUNAS_HORARIO:
+            serie = serie.astype("datetime64[ns]")
+        else:
+            # mesmo valor, mesmo hash, venha como número ou como texto
+            serie = _como_categoria_texto(serie)
+        colunas[c] = serie
+    hashes = pd.util.hash_pandas_object(pd.DataFrame(colunas), index=False).to_numpy()
+    repeticao = (
+        pd.DataFrame({"arquivo": arquivo, "hash": hashes})
+        .groupby(["arquivo", "hash"], sort=False)
+        .cumcount()
+        .to_numpy(dtype=np.uint64)
+    )
+    return hashes ^ (repeticao * np.uint64(0x9E3779B97F4A7C15))
+
+
+def _como_categoria_texto(serie):
+    if not isinstance(serie.dtype, pd.CategoricalDtype):
+        serie = serie.astype("category")
+    return serie.cat.rename_categories(serie.cat.categories.astype(str))
+
+
+def _concatenar(partes):
+    """
+    Junta pedaços da base ou do cubo. As colunas da exportação viram uma
+    categoria só (como em carga.combinar_partes); as demais já têm o mesmo
+    tipo em todos os pedaços.
+    """
+    if len(partes) == 1:
+        return partes[0].reset_index(drop=True)
+    dados = {}
+    for c in partes[0].columns:
+        if c in carga.COLUNAS_CATEGORICAS:
+            serie = pd.Series(union_categoricals(
+                [_como_categoria_texto(p[c]) for p in partes], sort_categories=True
+            ))
+            dados[c] = carga._tipar_categorias(serie)
+        else:
+            dados[c] = pd.concat([p[c] for p in partes], ignore_index=True)
+    return pd.DataFrame(dados)
+
+
+def _sem_categorias_sobrando(df):
+    for c in carga.COLUNAS_CATEGORICAS:
+        if c in df.columns and isinstance(df[c].dtype, pd.CategoricalDtype):
+            df[c] = df[c].cat.remove_unused_categories()
+    return df
+
+
+def _gravar_parquet(df, caminho):
+    tmp = f"{caminho}.{os.getpid()}.tmp"
+    df.to_parquet(tmp, index=False)
+    os.replace(tmp, caminho)
+
+
+def _gravar_dia(diretorio, dia, novas):
+    """Acrescenta as viagens novas ao dia e refaz o cubo e o histograma do dia. Retorna o total do dia."""
+    pasta = _pasta_dia(diretorio, dia)
+    arq_viagens = os.path.join(pasta, "viagens.parquet")
+    if os.path.exists(arq_viagens):
+        novas = _concatenar([pd.read_parquet(arq_viagens), novas])
+    else:
+        os.makedirs(pasta, exist_ok=True)
+        novas = novas.reset_index(drop=True)
+    novas = _sem_categorias_sobrando(novas)
+
+    _gravar_parquet(novas, arq_viagens)
+    _gravar_parquet(_sem_categorias_sobrando(cubo.montar_cubo(novas)), os.path.join(pasta, "cubo.parquet"))
+    _gravar_parquet(
+        _sem_categorias_sobrando(histograma.montar_histograma(novas)), os.path.join(pasta, "histograma.parquet")
+    )
+    return len(novas)
+
+
+def _chaves_gravadas(diretorio, dia):
+    arq = os.path.join(_pasta_dia(diretorio, dia), "viagens.parquet")
+    if not os.path.exists(arq):
+        return np.array([], dtype=np.uint64)
+    return pd.read_parquet(arq, columns=["_chave"])["_chave"].to_numpy()
+
+
+def adicionar(arquivos, diretorio=DIRETORIO, processos=None, ao_concluir=None):
+    """
+    Acrescenta exportações (objetos com .name, .size e .getbuffer(), como os
+    do uploader ou de carga.abrir_arquivo) ao acervo.
+
+    Arquivos já incorporados (mesmo conteúdo) nem são lidos. Retorna um
+    relatório com as viagens lidas, novas e repetidas, os dias alterados e a
+    conversão dos horários do lote. Arquivo inválido gera ValueError.
+    """
+    relatorio = {
+        "arquivos_repetidos": [],
+        "linhas_lidas": 0,
+        "linhas_novas": 0,
+        "linhas_repetidas": 0,
+        "dias_alterados": [],
+        "conversao_horarios": {},
+    }
+    with _TRAVA:
+        os.makedirs(diretorio, exist_ok=True)
+        manifesto = ler_manifesto(diretorio)
+
+        novos = []
+        for arquivo in arquivos:
+            chave_arquivo = cache_disco.chave_arquivos([arquivo])
+            if chave_arquivo in manifesto["arquivos"]:
+                relatorio["arquivos_repetidos"].append(arquivo.name)
+            elif all(chave_arquivo != c for _, c in novos):
+                novos.append((arquivo, chave_arquivo))
+        if not novos:
+            return relatorio
+
+        # leitura e tratamento só do lote
+        lidos = carga.ler_partes([a for a, _ in novos], processos=processos, ao_concluir=ao_concluir)
+        tamanhos = [len(df_arq) for df_arq, _ in lidos]
+        df = carga.combinar_partes([df_arq for df_arq, _ in lidos])
+        del lidos
+        df, relatorio["conversao_horarios"] = tratamento.tratar_base(df)
+        df["_chave"] = chaves_viagens(df, np.repeat(np.arange(len(tamanhos)), tamanhos))
+        relatorio["linhas_lidas"] = len(df)
+
+        # só os dias que aparecem no lote são relidos e regravados; o
+        # manifesto é gravado a cada dia, então um lote interrompido deixa
+        # registrados os dias que terminou
+        for data, pedaco in df.groupby("Data_Agendada", dropna=False, sort=True):
+            dia = _nome_dia(data)
+            chaves_pedaco = pedaco["_chave"].to_numpy()
+            gravadas = _chaves_gravadas(diretorio, dia)
+            novas = ~np.isin(chaves_pedaco, gravadas)
+            novas &= ~pd.Series(chaves_pedaco).duplicated().to_numpy()
+            relatorio["linhas_repetidas"] += int((~novas).sum())
+            # sem viagens novas, o dia só é refeito se um lote interrompido
+            # gravou as viagens sem chegar ao manifesto (cubo pode estar velho)
+            if not novas.any() and manifesto["dias"].get(dia) == len(gravadas):
+                continue
+            relatorio["linhas_novas"] += int(novas.sum())
+            manifesto["dias"][dia] = _gravar_dia(diretorio, dia, pedaco[novas])
+            manifesto["revisao"] += 1
+            _gravar_manifesto(manifesto, diretorio)
+            relatorio["dias_alterados"].append(dia)
+
+        agora = datetime.datetime.now().isoformat(timespec="seconds")
+        for arquivo, chave_arquivo in novos:
+            manifesto["arquivos"][chave_arquivo] = {"nome": arquivo.name, "incorporado": agora}
+        _gravar_manifesto(manifesto, diretorio)
+    return relatorio
+
+
+def vigiar(entrada=ENTRADA, diretorio=DIRETORIO, processos=None):
+    """
+    Acrescenta ao acervo as exportações (.csv, .xlsx) novas ou alteradas da
+    pasta `entrada`. Arquivos já vistos (mesmo tamanho e data de modificação)
+    são pulados sem abrir. Retorna o relatório de adicionar ou None se não
+    havia nada novo.
+    """
+    manifesto = ler_manifesto(diretorio)
+    caminhos, assinaturas = [], {}
+    for caminho in sorted(glob.glob(os.path.join(entrada, "*"))):
+        if not caminho.lower().endswith((".csv", ".xlsx")):
+            continue
+        info = os.stat(caminho)
+        assinatura = [info.st_size, info.st_mtime_ns]
+        if manifesto["vistos"].get(caminho) != assinatura:
+            caminhos.append(caminho)
+            assinaturas[caminho] = assinatura
+    if not caminhos:
+        return None
+
+    relatorio = adicionar([carga.abrir_arquivo(c) for c in caminhos], diretorio, processos=processos)
+    with _TRAVA:
+        manifesto = ler_manifesto(diretorio)
+        manifesto["vistos"].update(assinaturas)
+        _gravar_manifesto(manifesto, diretorio)
+    return relatorio
+
+
+def dias(diretorio=DIRETORIO):
+    """Nomes das pastas de dia gravadas (sem_data primeiro, depois por data)."""
+    nomes = sorted(ler_manifesto(diretorio)["dias"])
+    return ([SEM_DATA] if SEM_DATA in nomes else []) + [d for d in nomes if d != SEM_DATA]
+
+
+def _juntar_dias(diretorio, arquivo):
+    partes = [pd.read_parquet(os.path.join(_pasta_dia(diretorio, d), arquivo)) for d in dias(diretorio)]
+    if not partes:
+        raise ValueError("O acervo ainda não tem viagens.")
+    return _concatenar(partes)
+
+
+def carregar_cubo(diretorio=DIRETORIO):
+    """
+    Cubo de viagens do acervo inteiro (mesmo formato de cubo.montar_cubo),
+    juntando os cubos já gravados de cada dia, em ordem de data.
+    """
+    return _juntar_dias(diretorio, "cubo.parquet")
+
+
+def carregar_histograma(diretorio=DIRETORIO):
+    """Histograma de adiantamento do acervo inteiro (como histograma.montar_histograma)."""
+    return _juntar_dias(diretorio, "histograma.parquet")
+
+
+def arquivos_viagens(diretorio=DIRETORIO):
+    """Padrão (glob) dos Parquets de viagens, para consultas direto nos arquivos."""
+    return os.path.join(diretorio, "dia=*", "viagens.parquet")
+
+
+def resumo(diretorio=DIRETORIO):
+    """Viagens, dias e arquivos incorporados, para mostrar ao usuário."""
+    manifesto = ler_manifesto(diretorio)
+    datas = [d for d in manifesto["dias"] if d != SEM_DATA]
+    return {
+        "linhas": sum(manifesto["dias"].values()),
+        "dias": len(datas),
+        "primeiro_dia": min(datas) if datas else None,
+        "ultimo_dia": max(datas) if datas else None,
+        "arquivos": len(manifesto["arquivos"]),
+        "revisao": manifesto["revisao"],
+    }
+
+
+def _imprimir_relatorio(relatorio):
+    if relatorio is None:
+        print("Nenhuma exportação nova.")
+        return
+    for nome in relatorio["arquivos_repetidos"]:
+        print(f"{nome}: já estava no acervo")
+    print(
+        f"{relatorio['linhas_lidas']} viagens lidas, {relatorio['linhas_novas']} novas, "
+        f"{relatorio['linhas_repetidas']} repetidas; {len(relatorio['dias_alterados'])} dias atualizados"
+    )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m painel.acervo",
+        description="Mantém o acervo local de viagens (particionado por dia).",
+    )
+    parser.add_argument("--acervo", default=DIRETORIO or None, required=not DIRETORIO,
+                        help="diretório do acervo (padrão: PAINEL_ACERVO_DIR)")
+    parser.add_argument("--processos", type=int, help="processos para ler os arquivos")
+    comandos = parser.add_subparsers(dest="comando", required=True)
+
+    p_adicionar = comandos.add_parser("adicionar", help="acrescenta exportações ao acervo")
+    p_adicionar.add_argument("arquivos", nargs="+", help="arquivos .csv ou .xlsx de viagens")
+
+    p_vigiar = comandos.add_parser("vigiar", help="acrescenta as exportações novas de uma pasta")
+    p_vigiar.add_argument("entrada", nargs="?", default=ENTRADA or None,
+                          help="pasta vigiada (padrão: PAINEL_ACERVO_ENTRADA)")
+    p_vigiar.add_argument("--intervalo", type=float,
+                          help="segundos entre verificações (sem ele, verifica uma vez e sai)")
+
+    comandos.add_parser("resumo", help="viagens, dias e arquivos do acervo")
+    args = parser.parse_args(argv)
+
+    try:
+        if args.comando == "adicionar":
+            arquivos = [carga.abrir_arquivo(caminho) for caminho in args.arquivos]
+            _imprimir_relatorio(adicionar(arquivos, args.acervo, processos=args.processos))
+        elif args.comando == "vigiar":
+            if not args.entrada:
+                parser.error("informe a pasta vigiada ou defina PAINEL_ACERVO_ENTRADA")
+            while True:
+                _imprimir_relatorio(vigiar(args.entrada, args.acervo, processos=args.processos))
+                if not args.intervalo:
+                    break
+                time.sleep(args.intervalo)
+        else:
+            print(json.dumps(resumo(args.acervo), ensure_ascii=False, indent=2))
+    except (OSError, ValueError) as erro:
+        parser.exit(1, f"erro: {erro}\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""
+Alertas: os maiores desvios do último dia contra os dias equivalentes em
+todas as combinações Empresa x Linha x Faixa_Horaria de uma vez, sem passar
+pelos filtros um a um.
+
+Para cada combinação e cada indicador (% de adiantadas acima de cada limite
+e % de cada Situação_viagem), o desvio é a diferença em p.p. entre o último
+dia e os dias equivalentes, como nas abas 1 e 2. O escore z do teste de
+duas proporções (proporção combinada) pesa o desvio pelo número de viagens:
+1 p.p. numa linha com 500 viagens conta mais do que 20 p.p. numa com 5. Os
+alertas são os de maior |z|.
+
+As contagens dos dois períodos saem de ranking.contar_recortes (os mesmos
+grupos nos dois, numa passada pelo cubo); o backend duckdb (painel.consulta)
+monta as mesmas contagens em SQL e usa maiores_desvios.
+"""
+
+import numpy as np
+
+from painel import analises, ranking
+
+# combinações avaliadas (as que existirem na base)
+COLUNAS = ["Empresa", "Linha", "Faixa_Horaria"]
+
+# quantos alertas mostrar
+N_ALERTAS = 50
+
+# viagens mínimas da combinação no último dia e nos dias equivalentes
+MINIMO_VIAGENS = 5
+
+
+def contar(cubo_base, pos_ultimo, pos_base_equiv, colunas=COLUNAS, limites=None, hist=None, hist_ultimo=None,
+           hist_base_equiv=None):
+    """Contagens (ranking.contar) do último dia e dos dias equivalentes, nos mesmos grupos."""
+    recortes_hist = None if hist is None else [hist_ultimo, hist_base_equiv]
+    return ranking.contar_recortes(cubo_base, [pos_ultimo, pos_base_equiv], colunas, limites, hist, recortes_hist)
+
+
+def indicadores(contagens, limites):
+    """Nomes dos indicadores e viagens de cada um por grupo (grupos x indicadores)."""
+    valores, matriz = contagens["Situação_viagem"]
+    com_valor = valores != ranking.SEM_SITUACAO
+    nomes = [analises.coluna_pct(limite) for limite in limites] + [f"% {v}" for v in valores[com_valor]]
+    return np.array(nomes, dtype=object), np.hstack([contagens["adiantadas"], matriz[:, com_valor]])
+
+
+def escore_z(qtd_dia, total_dia, qtd_base, total_base):
+    """Escore z da diferença entre as proporções (proporção combinada); 0 se não houver variação."""
+    p = (qtd_dia + qtd_base) / (total_dia + total_base)
+    erro = np.sqrt(p * (1 - p) * (1 / total_dia + 1 / total_base))
+    diferenca = qtd_dia / total_dia - qtd_base / total_base
+    return np.divide(diferenca, erro, out=np.zeros(np.shape(diferenca)), where=erro > 0)
+
+
+def maiores_desvios(contagens_dia, contagens_base, limites=None, n=N_ALERTAS, minimo=MINIMO_VIAGENS):
+    """
+    Tabela dos n maiores |escore z| entre grupos e indicadores (n=None:
+    todos os desvios). Só entram grupos com pelo menos `minimo` viagens nos
+    dois períodos; sem dias equivalentes, a tabela sai vazia.
+    """
+    limites = analises.LIMITES_ADIANTAMENTO if limites is None else list(limites)
+    nomes, qtd_dia = indicadores(contagens_dia, limites)
+    _, qtd_base = indicadores(contagens_base, limites)
+    minimo = max(minimo, 1)
+    linhas = np.flatnonzero((contagens_dia["total"] >= minimo) & (contagens_base["total"] >= minimo))
+    qtd_dia, qtd_base = qtd_dia[linhas], qtd_base[linhas]
+    total_dia = contagens_dia["total"][linhas, None]
+    total_base = contagens_base["total"][linhas, None]
+
+    z = escore_z(qtd_dia, total_dia, qtd_base, total_base).ravel()
+    candidatos = np.flatnonzero(z != 0)
+    escolhidos = candidatos[ranking.selecionar_top(np.abs(z[candidatos]), n)]
+    g, i = np.divmod(escolhidos, len(nomes))
+
+    tabela = contagens_dia["grupos"].iloc[linhas[g]].reset_index(drop=True)
+    tabela["Indicador"] = nomes[i]
+    tabela["Viagens Último Dia"] = total_dia[g, 0]
+    tabela["% Último Dia"] = qtd_dia[g, i] / total_dia[g, 0] * 100
+    tabela["Viagens Dias Equivalentes"] = total_base[g, 0]
+    tabela["% Dias Equivalentes"] = qtd_base[g, i] / total_base[g, 0] * 100
+    tabela["Desvio (p.p.)"] = tabela["% Último Dia"] - tabela["% Dias Equivalentes"]
+    tabela["Escore z"] = z[escolhidos]
+    return tabela
@@ -0,0 +1,191 @@
+"""
+Cálculos das abas do painel a partir do cubo de viagens (painel.cubo).
+
+As funções recebem o cubo e as posições das linhas selecionadas (ver
+painel.filtros) e devolvem as mesmas tabelas que o painel montava sobre a
+base linha a linha: onde antes havia contagem de linhas (size), agora há
+soma de Qtd. Só as colunas usadas em cada tabela são recortadas.
+"""
+
+import numpy as np
+import pandas as pd
+
+from painel.cubo import LIMITES_ADIANTAMENTO
+from painel.filtros import recorte
+
+# categorias sempre mostradas no Ranking 3 (mesmo que zeradas)
+CATEGORIAS = ["ACI", "AVL", "CII", "EXT", "IAC", "IEP", "MRI", "OK", "QUE", "SIS", "TRI", "VNR"]
+
+# Situação_viagem tratada como "Viagem concluída" (comparação sem caixa e espaços)
+SITUACOES_CONCLUIDA = ["viagem concluída", "viagem concluida"]
+
+# quantos dias equivalentes anteriores entram na comparação, por Tipo_Dia
+DIAS_EQUIVALENTES = {"Dia útil": 5, "Sábado": 1, "Domingo": 1}
+
+
+def _qtd(cubo, posicoes):
+    return cubo["Qtd"].to_numpy()[posicoes]
+
+
+def _qtd_adiantadas(cubo, posicoes, limite):
+    """Viagens com Adiantamento_min > limite (limite deve estar em LIMITES_ADIANTAMENTO)."""
+    faixa_min = LIMITES_ADIANTAMENTO.index(limite) + 1
+    faixa = cubo["Faixa_Adiantamento"].to_numpy()[posicoes]
+    return _qtd(cubo, posicoes)[faixa >= faixa_min].sum()
+
+
+def quantos_dias_equivalentes(tipo_dia_ult, n_dias=None):
+    """
+    Dia útil compara com 5 dias úteis anteriores; sábado e domingo com 1.
+    n_dias (Tipo_Dia -> quantidade) troca esse padrão.
+    """
+    n_dias = n_dias or DIAS_EQUIVALENTES
+    return n_dias.get(tipo_dia_ult, n_dias["Dia útil"])
+
+
+def dias_equivalentes(tipos, tem_dados, k, n_dias=None):
+    """
+    Índices (crescentes) dos dias equivalentes ao dia k: os últimos dias
+    antes dele, do mesmo tipo, que têm dados.
+    """
+    candidatos = np.flatnonzero((tipos[:k] == tipos[k]) & tem_dados[:k])
+    return candidatos[max(0, len(candidatos) - quantos_dias_equivalentes(tipos[k], n_dias)):]
+
+
+def separar_ultimo_dia(cubo, indice, posicoes, n_dias=None, tipos=None):
+    """
+    Último dia com dados e dias equivalentes anteriores (BLOCO 9).
+
+    Dia útil compara com os 5 dias úteis anteriores; sábado e domingo com o
+    sábado/domingo anterior (ou n_dias por tipo). As datas saem do índice do
+    cubo (painel.indice); `tipos` troca o Tipo_Dia de cada dia do índice
+    (feriados, painel.referencia). Retorna (ultimo_dia, tipo_dia_ult,
+    pos_ultimo, pos_base_equiv). Gera ValueError se não houver datas válidas.
+    """
+    # posições crescentes e cubo ordenado por data: a última é do último dia
+    k_ult = indice.dia_da_posicao(posicoes[-1]) if len(posicoes) else -1
+    if k_ult < 0:
+        raise ValueError("Não foi possível identificar datas válidas em Data_Agendada.")
+
+    ultimo_dia = indice.dias[k_ult]
+    pos_ultimo = indice.recortar(posicoes, k_ult, k_ult + 1)
+
+    if len(pos_ultimo) == 0:
+        raise ValueError("Não há registros para o último dia encontrado.")
+
+    tipos = indice.tipos if tipos is None else tipos
+    tipo_dia_ult = tipos[k_ult]
+
+    # Histórico (apenas datas ANTES do último dia), do mais recente para trás,
+    # só dias do mesmo tipo que tenham viagens nos filtros
+    tem_dados = np.zeros(len(indice.dias), dtype=bool)
+    tem_dados[indice.dias_com_dados(posicoes)] = True
+    pos_base_equiv = indice.nos_dias(
+        posicoes, indice.dias[dias_equivalentes(tipos, tem_dados, k_ult, n_dias)]
+    )
+
+    return ultimo_dia, tipo_dia_ult, pos_ultimo, pos_base_equiv
+
+
+def janela_ranking(indice, posicoes, ultimo_dia, dias):
+    """Posições dos últimos `dias` dias até o último dia (BLOCO 10)."""
+    inicio_rank = ultimo_dia - pd.Timedelta(days=dias - 1)
+    k_ini, k_fim = indice.faixa_dias(inicio_rank, ultimo_dia)
+    return indice.recortar(posicoes, k_ini, k_fim)
+
+
+def adiantamento_equiv(cubo, pos_base, pos_dia, limite):
+    """
+    Cálculo do adiantamento para:
+    - pos_dia  : último dia
+    - pos_base : dias equivalentes anteriores
+    """
+    return percentuais_adiantamento(
+        _qtd_adiantadas(cubo, pos_dia, limite), _qtd(cubo, pos_dia).sum(),
+        _qtd_adiantadas(cubo, pos_base, limite), _qtd(cubo, pos_base).sum(),
+    )
+
+
+def percentuais_adiantamento(qtd_dia, total_dia, qtd_base, total_base):
+    """(qtd_dia, % no dia, % na base) a partir das contagens; zeros se faltar dia ou base."""
+    if total_dia == 0 or total_base == 0:
+        return 0, 0.0, 0.0
+    return qtd_dia, qtd_dia / total_dia * 100, qtd_base / total_base * 100
+
+
+def tabela_comparativa(cubo, pos_ultimo, pos_base_equiv, coluna):
+    """
+    Tabela de Situação_viagem ou Situação_categoria (abas 2 e 3): quantidade
+    e % no último dia e nos dias equivalentes, e o desvio em p.p.
+    """
+    cubo_ultimo = recorte(cubo, pos_ultimo, [coluna, "Qtd"])
+    cubo_base_equiv = recorte(cubo, pos_base_equiv, [coluna, "Qtd"])
+
+    tab_ult = (
+        cubo_ultimo.groupby(coluna, observed=True)["Qtd"]
+        .sum()
+        .reset_index(name="Qtd Último Dia")
+    )
+
+    if cubo_base_equiv.empty:
+        tab_base = None
+    else:
+        tab_base = (
+            cubo_base_equiv.groupby(coluna, observed=True)["Qtd"]
+            .sum()
+            .reset_index(name="Qtd Base Dias Equivalentes")
+        )
+    return comparar_contagens(tab_ult, tab_base, coluna)
+
+
+def comparar_contagens(tab_ult, tab_base, coluna):
+    """
+    Junta as contagens por `coluna` do último dia (coluna, "Qtd Último Dia")
+    e dos dias equivalentes (coluna, "Qtd Base Dias Equivalentes"; None se
+    não houver base) e calcula os % e o desvio.
+    """
+    if tab_base is None:
+        tab_base = tab_ult.copy()
+        tab_base["Qtd Base Dias Equivalentes"] = 0
+        tab_base = tab_base[[coluna, "Qtd Base Dias Equivalentes"]]
+
+    tabela = tab_ult.merge(tab_base, on=coluna, how="outer").fillna(0)
+
+    soma_ult = tabela["Qtd Último Dia"].sum()
+    soma_base = tabela["Qtd Base Dias Equivalentes"].sum()
+
+    tabela["% Último Dia"] = (
+        tabela["Qtd Último Dia"] / soma_ult * 100 if soma_ult > 0 else 0
+    )
+    tabela["% Dias Equivalentes"] = (
+        tabela["Qtd Base Dias Equivalentes"] / soma_base * 100 if soma_base > 0 else 0
+    )
+    tabela["Desvio (p.p.)"] = tabela["% Último Dia"] - tabela["% Dias Equivalentes"]
+    return tabela
+
+
+def concluida(valores):
+    """Máscara dos valores de Situação_viagem que são 'Viagem concluída'."""
+    return pd.Index(valores).astype(str).str.strip().str.lower().isin(SITUACOES_CONCLUIDA)
+
+
+def sem_concluida(tabela, coluna="Situação_viagem"):
+    """Tira as linhas de 'Viagem concluída' (usado no gráfico da aba 2)."""
+    return tabela[~concluida(tabela[coluna])]
+
+
+def coluna_pct(limite):
+    """Nome da coluna de % do Ranking 1 para um limite ("% >3 min", "% >2,5 min")."""
+    return f"% >{limite:g} min".replace(".", ",")
+
+
+def resumo_adiantamento(resumo1, limites=LIMITES_ADIANTAMENTO):
+    """
+    % do Ranking 1 a partir de Total e Adianta<limite> (uma linha por grupo:
+    empresa, linha ou empresa x linha), ordenado pelo maior limite. Empates
+    ficam na ordem dos grupos.
+    """
+    for limite in limites:
+        resumo1[coluna_pct(limite)] = resumo1[f"Adianta{limite:g}"] / resumo1["Total"] * 100
+
+    return resumo1.sort_values(coluna_pct(max(limites)), ascending=False, kind="stable")
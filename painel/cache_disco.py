@@ -0,0 +1,142 @@
+"""
+Cache em disco (Parquet) da base já carregada e tratada.
+
+A chave é o hash do conteúdo dos arquivos enviados, então reenviar o mesmo
+arquivo — ou reiniciar o servidor — lê o Parquet em vez de refazer a
+leitura do CSV/XLSX e os BLOCOS 5 a 7. O diretório tem um limite de tamanho
+e os itens menos usados recentemente saem primeiro (o mtime do arquivo
+marca o último acesso).
+
+Configuração por variáveis de ambiente:
+- PAINEL_CACHE_DIR : diretório do cache (padrão ~/.cache/situacaoviagem)
+- PAINEL_CACHE_MB  : tamanho máximo em MB (padrão 2048; 0 desliga o cache)
+"""
+
+import contextlib
+import hashlib
+import json
+import os
+
+import pandas as pd
+
+# mudar sempre que a carga ou o tratamento mudarem o conteúdo da base
+VERSAO = 5
+
+DIRETORIO = os.environ.get(
+    "PAINEL_CACHE_DIR",
+    os.path.join(os.path.expanduser("~"), ".cache", "situacaoviagem"),
+)
+LIMITE_MB = int(os.environ.get("PAINEL_CACHE_MB", "2048"))
+
+_BYTES_HASH = 16 * 1024 * 1024
+
+
+def chave_arquivos(arquivos):
+    """Hash (blake2b) do conteúdo dos arquivos, na ordem em que foram enviados."""
+    h = hashlib.blake2b(digest_size=20)
+    h.update(f"v{VERSAO}".encode())
+    for arquivo in arquivos:
+        h_arq = hashlib.blake2b(digest_size=20)
+        buffer = arquivo.getbuffer()
+        for inicio in range(0, len(buffer), _BYTES_HASH):
+            h_arq.update(buffer[inicio:inicio + _BYTES_HASH])
+        del buffer
+        h.update(h_arq.digest())
+    return h.hexdigest()
+
+
+def _caminhos(chave, diretorio):
+    base = os.path.join(diretorio, chave)
+    return base + ".parquet", base + ".json"
+
+
+def ler(chave, diretorio=DIRETORIO):
+    """Retorna (df, relatório) do cache ou None se a chave não estiver lá."""
+    if LIMITE_MB <= 0:
+        return None
+    arq_parquet, arq_json = _caminhos(chave, diretorio)
+    if not os.path.exists(arq_parquet):
+        return None
+    try:
+        df = pd.read_parquet(arq_parquet)
+        with open(arq_json, encoding="utf-8") as f:
+            relatorio = json.load(f)
+    except (OSError, ValueError):
+        # arquivo corrompido ou incompleto: descarta e recarrega
+        _remover(arq_parquet, arq_json)
+        return None
+
+    # marca o acesso para o LRU; outra sessão pode ter removido o item depois da leitura
+    with contextlib.suppress(OSError):
+        os.utime(arq_parquet)
+    return df, relatorio
+
+
+def localizar(chave, diretorio=DIRETORIO):
+    """
+    Retorna (caminho do Parquet, relatório) sem ler a base, ou None se a
+    chave não estiver no cache. Usado pelos backends que consultam o
+    arquivo direto (painel.consulta).
+    """
+    if LIMITE_MB <= 0:
+        return None
+    arq_parquet, arq_json = _caminhos(chave, diretorio)
+    try:
+        with open(arq_json, encoding="utf-8") as f:
+            relatorio = json.load(f)
+        os.utime(arq_parquet)
+    except (OSError, ValueError):
+        return None
+    return arq_parquet, relatorio
+
+
+def gravar(chave, df, relatorio, diretorio=DIRETORIO, limite_mb=None):
+    """Grava a base tratada e remove os itens mais antigos se passar do limite."""
+    limite_mb = LIMITE_MB if limite_mb is None else limite_mb
+    if limite_mb <= 0:
+        return
+    os.makedirs(diretorio, exist_ok=True)
+    arq_parquet, arq_json = _caminhos(chave, diretorio)
+
+    # grava em arquivos temporários e renomeia, para outra sessão nunca ler um
+    # Parquet ou um relatório pela metade (e descartar o item por isso)
+    tmp_parquet = f"{arq_parquet}.{os.getpid()}.tmp"
+    tmp_json = f"{arq_json}.{os.getpid()}.tmp"
+    df.to_parquet(tmp_parquet, index=False)
+    with open(tmp_json, "w", encoding="utf-8") as f:
+        json.dump(relatorio, f)
+    os.replace(tmp_json, arq_json)
+    os.replace(tmp_parquet, arq_parquet)
+
+    limpar(diretorio, limite_mb * 1024**2, manter=arq_parquet)
+
+
+def limpar(diretorio, limite_bytes, manter=None):
+    """Remove os Parquets menos usados até o diretório caber no limite."""
+    itens = []
+    for nome in os.listdir(diretorio):
+        if not nome.endswith(".parquet"):
+            continue
+        caminho = os.path.join(diretorio, nome)
+        try:
+            st_arq = os.stat(caminho)
+        except OSError:
+            continue
+        itens.append((st_arq.st_mtime, st_arq.st_size, caminho))
+
+    total = sum(tamanho for _, tamanho, _ in itens)
+    for _, tamanho, caminho in sorted(itens):
+        if total <= limite_bytes:
+            break
+        if caminho == manter:
+            continue
+        _remover(caminho, caminho[:-len(".parquet")] + ".json")
+        total -= tamanho
+
+
+def _remover(*caminhos):
+    for caminho in caminhos:
+        try:
+            os.remove(caminho)
+        except OSError:
+            pass
@@ -0,0 +1,427 @@
+"""
+Carga dos arquivos de viagens (.csv ; e .xlsx) com o esquema conhecido.
+
+Só as colunas usadas pelo painel são lidas. O CSV é lido em blocos e cada
+bloco é gravado direto em colunas pré-alocadas, com as colunas de texto
+repetitivo (Empresa, Linha, Situação_viagem, Situação_categoria) guardadas
+como códigos de categoria. Assim a base nunca existe duas vezes em memória
+(lista de DataFrames + concat) nem em dtype object.
+"""
+
+import io
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+import pandas as pd
+from pandas.api.types import union_categoricals
+
+# colunas que o painel efetivamente usa (nomes já normalizados)
+COLUNAS_USADAS = [
+    "Horário_agendado",
+    "Horário_realizado",
+    "Situação_viagem",
+    "Situação_categoria",
+    "Empresa",
+    "Linha",
+]
+
+# colunas de texto com poucos valores distintos -> dtype category
+COLUNAS_CATEGORICAS = ["Empresa", "Linha", "Situação_viagem", "Situação_categoria"]
+
+# linhas lidas por vez no CSV
+TAMANHO_BLOCO = 200_000
+
+# processos usados para ler vários arquivos ao mesmo tempo (PAINEL_PROCESSOS)
+PROCESSOS = int(os.environ.get("PAINEL_PROCESSOS", "0")) or (os.cpu_count() or 1)
+
+# pedaço do arquivo usado para contar linhas sem copiar o arquivo inteiro
+_BYTES_CONTAGEM = 16 * 1024 * 1024
+
+
+def normalizar_nome_coluna(nome):
+    """Tira espaços das pontas e troca os internos por _ (mesma regra do app)."""
+    return str(nome).strip().replace(" ", "_")
+
+
+def coluna_usada(nome):
+    """Usado como `usecols`: aceita a coluna se ela está no esquema."""
+    return normalizar_nome_coluna(nome) in COLUNAS_USADAS
+
+
+def contar_linhas(arquivo):
+    """
+    Conta as quebras de linha do arquivo (sem o cabeçalho) para
+    pré-alocar as colunas. É só uma estimativa: se vier a mais, sobra
+    capacidade; se vier a menos, as colunas crescem.
+    """
+    buffer = arquivo.getbuffer()
+    total = 0
+    for inicio in range(0, len(buffer), _BYTES_CONTAGEM):
+        total += bytes(buffer[inicio:inicio + _BYTES_CONTAGEM]).count(b"\n")
+    del buffer
+    return max(total - 1, 0)
+
+
+def _texto(v):
+    """
+    Valor de uma coluna categórica como texto. Números inteiros saem sem
+    casa decimal: a planilha devolve a Linha 500 como 500.0, e o mesmo
+    valor precisa virar a mesma categoria do "500" lido no CSV.
+    """
+    if isinstance(v, str):
+        return v
+    if isinstance(v, float) and v.is_integer():
+        return str(int(v))
+    return str(v)
+
+
+class _ColunasPrealocadas:
+    """
+    Acumula blocos de linhas em arrays pré-alocados.
+
+    Colunas categóricas viram códigos int32 com um dicionário de valores
+    comum a todos os blocos; as demais ficam em arrays object.
+    """
+
+    def __init__(self, capacidade):
+        self.capacidade = max(int(capacidade), 1)
+        self.n = 0
+        self.colunas = []
+        self.arrays = {}
+        self.dicionarios = {}
+
+    def _iniciar(self, colunas):
+        self.colunas = list(colunas)
+        for c in self.colunas:
+            if c in COLUNAS_CATEGORICAS:
+                self.arrays[c] = np.full(self.capacidade, -1, dtype=np.int32)
+                self.dicionarios[c] = {}
+            else:
+                self.arrays[c] = np.full(self.capacidade, None, dtype=object)
+
+    def _garantir_capacidade(self, extra):
+        if self.n + extra <= self.capacidade:
+            return
+        nova = max(self.capacidade * 2, self.n + extra)
+        for c, arr in self.arrays.items():
+            maior = np.full(nova, -1 if arr.dtype == np.int32 else None, dtype=arr.dtype)
+            maior[:self.n] = arr[:self.n]
+            self.arrays[c] = maior
+        self.capacidade = nova
+
+    def anexar(self, bloco):
+        """Copia o bloco (colunas já normalizadas) para o fim das colunas."""
+        if not self.colunas:
+            self._iniciar(bloco.columns)
+        n = len(bloco)
+        self._garantir_capacidade(n)
+        fim = self.n + n
+
+        for c in self.colunas:
+            if c in COLUNAS_CATEGORICAS:
+                codigos, valores = pd.factorize(bloco[c])
+                dic = self.dicionarios[c]
+                # -1 (nulo) cai no último elemento do mapa, que é -1
+                mapa = np.fromiter(
+                    (dic.setdefault(_texto(v), len(dic)) for v in valores),
+                    dtype=np.int32,
+                    count=len(valores),
+                )
+                mapa = np.append(mapa, np.int32(-1))
+                self.arrays[c][self.n:fim] = mapa[codigos]
+            else:
+                self.arrays[c][self.n:fim] = bloco[c].to_numpy(dtype=object)
+
+        self.n = fim
+
+    def finalizar(self):
+        """Monta o DataFrame com as categorias em ordem alfabética."""
+        dados = {}
+        for c in self.colunas:
+            arr = self.arrays[c][:self.n]
+            if c in COLUNAS_CATEGORICAS:
+                valores = np.array(list(self.dicionarios[c]), dtype=object)
+                ordem = np.argsort(valores, kind="stable")
+                nova_posicao = np.empty(len(ordem) + 1, dtype=np.int32)
+                nova_posicao[ordem] = np.arange(len(ordem), dtype=np.int32)
+                nova_posicao[-1] = -1
+                dados[c] = pd.Categorical.from_codes(
+                    nova_posicao[arr], categories=pd.Index(valores[ordem], dtype=object)
+                )
+            else:
+                dados[c] = arr
+        self.arrays = {}
+        return pd.DataFrame(dados)
+
+
+def _memoria(df):
+    return int(df.memory_usage(deep=True, index=False).sum())
+
+
+def ler_csv(arquivo, tamanho_bloco=TAMANHO_BLOCO):
+    """
+    Lê um CSV (; e utf-8-sig) em blocos, só com as colunas do esquema.
+
+    Retorna (DataFrame, memória dos blocos como texto bruto em bytes).
+    """
+    colunas = _ColunasPrealocadas(contar_linhas(arquivo))
+    memoria_bruta = 0
+
+    arquivo.seek(0)
+    leitor = pd.read_csv(
+        arquivo,
+        sep=";",
+        encoding="utf-8-sig",
+        usecols=coluna_usada,
+        dtype=str,
+        chunksize=tamanho_bloco,
+    )
+    with leitor:
+        for bloco in leitor:
+            bloco = bloco.rename(columns=normalizar_nome_coluna)
+            memoria_bruta += _memoria(bloco)
+            colunas.anexar(bloco)
+
+    return colunas.finalizar(), memoria_bruta
+
+
+def _linhas_planilha(arquivo, motor=None):
+    """
+    Itera as linhas da primeira planilha sem montar a pasta inteira em memória.
+
+    Usa o python-calamine (leitor em Rust) se estiver instalado; senão o
+    openpyxl em modo somente leitura, que percorre o XML linha a linha.
+    `motor` ("calamine" ou "openpyxl") força um dos dois.
+    Retorna (iterador de linhas, número de linhas informado pela planilha).
+    """
+    CalamineWorkbook = None
+    if motor != "openpyxl":
+        try:
+            from python_calamine import CalamineWorkbook
+        except ImportError:
+            if motor == "calamine":
+                raise
+
+    arquivo.seek(0)
+    if CalamineWorkbook is not None:
+        planilha = CalamineWorkbook.from_filelike(arquivo).get_sheet_by_index(0)
+        return planilha.iter_rows(), planilha.height
+
+    import openpyxl
+
+    pasta = openpyxl.load_workbook(arquivo, read_only=True, data_only=True)
+    planilha = pasta.worksheets[0]
+    return planilha.iter_rows(values_only=True), planilha.max_row or 0
+
+
+def _vazio(v):
+    return v is None or v == ""
+
+
+def ler_xlsx(arquivo, tamanho_bloco=TAMANHO_BLOCO, motor=None):
+    """
+    Lê um .xlsx linha a linha, só com as colunas do esquema, e grava nas
+    mesmas colunas pré-alocadas (e tipos) do CSV.
+
+    Retorna (DataFrame, memória dos blocos como texto bruto em bytes).
+    """
+    linhas, n_linhas = _linhas_planilha(arquivo, motor=motor)
+    cabecalho = next(linhas, None)
+    if cabecalho is None:
+        return pd.DataFrame(), 0
+
+    indices = [i for i, nome in enumerate(cabecalho) if not _vazio(nome) and coluna_usada(nome)]
+    nomes = [normalizar_nome_coluna(cabecalho[i]) for i in indices]
+
+    colunas = _ColunasPrealocadas(max(n_linhas - 1, 1))
+    memoria_bruta = 0
+
+    def gravar_bloco(bloco):
+        nonlocal memoria_bruta
+        valores = list(zip(*bloco)) if bloco else [()] * len(nomes)
+        df_bloco = pd.DataFrame({
+            nome: np.array([None if _vazio(v) else v for v in col], dtype=object)
+            for nome, col in zip(nomes, valores)
+        })
+        memoria_bruta += _memoria(df_bloco)
+        colunas.anexar(df_bloco)
+
+    bloco = []
+    for linha in linhas:
+        # linhas totalmente vazias no fim da planilha são ignoradas (como no read_excel)
+        if all(_vazio(v) for v in linha):
+            continue
+        bloco.append(tuple(linha[i] if i < len(linha) else None for i in indices))
+        if len(bloco) >= tamanho_bloco:
+            gravar_bloco(bloco)
+            bloco = []
+    if bloco or colunas.n == 0:
+        gravar_bloco(bloco)
+
+    return colunas.finalizar(), memoria_bruta
+
+
+def verificar_formato(nome):
+    """Gera ValueError se o arquivo não for .csv nem .xlsx."""
+    if not nome.lower().endswith((".csv", ".xlsx")):
+        raise ValueError("Formato não suportado. Envie arquivos .csv ou .xlsx.")
+
+
+def ler_arquivo(arquivo):
+    """
+    Lê um arquivo enviado pelo uploader (.csv ou .xlsx).
+
+    Retorna (DataFrame, memória bruta em bytes). Formato não suportado
+    gera ValueError.
+    """
+    verificar_formato(arquivo.name)
+    if arquivo.name.lower().endswith(".csv"):
+        return ler_csv(arquivo)
+    return ler_xlsx(arquivo)
+
+
+def abrir_arquivo(caminho):
+    """Arquivo local no formato do uploader (name, size, getvalue), para uso fora do app."""
+    with open(caminho, "rb") as f:
+        arquivo = io.BytesIO(f.read())
+    arquivo.name = os.path.basename(caminho)
+    arquivo.size = arquivo.getbuffer().nbytes
+    return arquivo
+
+
+def _ler_conteudo(nome, conteudo):
+    """Executado nos processos filhos: lê um arquivo a partir dos bytes."""
+    arquivo = io.BytesIO(conteudo)
+    arquivo.name = nome
+    return ler_arquivo(arquivo)
+
+
+def _contexto_processos():
+    # fork dentro do servidor do Streamlit (com threads) pode travar
+    metodos = multiprocessing.get_all_start_methods()
+    return multiprocessing.get_context("forkserver" if "forkserver" in metodos else "spawn")
+
+
+def ler_partes(arquivos, processos=None, ao_concluir=None):
+    """
+    Lê cada arquivo em um processo separado (até `processos` ao mesmo tempo).
+
+    Retorna a lista de (DataFrame, memória bruta) na mesma ordem dos
+    arquivos, seja qual for a ordem em que terminaram. `ao_concluir` é
+    chamada como ao_concluir(concluidos, total, nome) a cada arquivo lido.
+    """
+    processos = min(processos or PROCESSOS, len(arquivos))
+    for arquivo in arquivos:
+        verificar_formato(arquivo.name)
+
+    resultados = [None] * len(arquivos)
+
+    if processos <= 1:
+        for i, arquivo in enumerate(arquivos):
+            resultados[i] = ler_arquivo(arquivo)
+            if ao_concluir:
+                ao_concluir(i + 1, len(arquivos), arquivo.name)
+        return resultados
+
+    with ProcessPoolExecutor(max_workers=processos, mp_context=_contexto_processos()) as pool:
+        futuros = {
+            pool.submit(_ler_conteudo, arquivo.name, arquivo.getvalue()): (i, arquivo.name)
+            for i, arquivo in enumerate(arquivos)
+        }
+        for concluidos, futuro in enumerate(as_completed(futuros), start=1):
+            i, nome = futuros[futuro]
+            resultados[i] = futuro.result()
+            if ao_concluir:
+                ao_concluir(concluidos, len(arquivos), nome)
+
+    return resultados
+
+
+def _tipar_categorias(serie):
+    """
+    Categorias que são todas números (ex.: Linha 500, 507) viram números,
+    como o read_csv faria, para ordenar e comparar numericamente.
+    """
+    categorias = serie.cat.categories
+    if len(categorias) == 0:
+        return serie
+    numeros = pd.to_numeric(pd.Series(categorias), errors="coerce").to_numpy(dtype=float)
+    if np.isnan(numeros).any():
+        return serie
+    if (numeros == np.round(numeros)).all():
+        numeros = numeros.astype(np.int64)
+    if pd.Index(numeros).has_duplicates:
+        return serie
+    serie = serie.cat.rename_categories(numeros)
+    return serie.cat.reorder_categories(np.sort(numeros))
+
+
+def combinar_partes(partes):
+    """
+    Junta os DataFrames de cada arquivo mantendo as colunas categóricas
+    (um pd.concat com categorias diferentes cairia para object).
+
+    As partes são consumidas: cada coluna sai delas assim que é juntada,
+    para a base não existir duas vezes em memória. Com uma parte só, ela
+    mesma é devolvida, sem cópia.
+    """
+    if len(partes) == 1:
+        df = partes[0]
+        for c in COLUNAS_CATEGORICAS:
+            if c in df.columns:
+                df[c] = _tipar_categorias(df[c])
+        return df
+
+    colunas = list(dict.fromkeys(c for p in partes for c in p.columns))
+    dados = {}
+    for c in colunas:
+        pedacos = []
+        for p in partes:
+            if c in p.columns:
+                pedacos.append(p.pop(c))
+            elif c in COLUNAS_CATEGORICAS:
+                pedacos.append(pd.Series(pd.Categorical.from_codes(
+                    np.full(len(p), -1, dtype=np.int32), categories=pd.Index([], dtype=object)
+                )))
+            else:
+                pedacos.append(pd.Series(np.full(len(p), None, dtype=object)))
+
+        if c in COLUNAS_CATEGORICAS:
+            serie = pd.Series(union_categoricals(pedacos, sort_categories=True))
+            dados[c] = _tipar_categorias(serie)
+        else:
+            dados[c] = pd.concat(pedacos, ignore_index=True)
+        del pedacos
+
+    return pd.DataFrame(dados)
+
+
+def carregar_arquivos(arquivos, processos=None, ao_concluir=None):
+    """
+    Lê e junta todos os arquivos enviados (em paralelo, ver ler_partes).
+
+    Retorna (DataFrame, relatório de memória). O relatório traz o tamanho
+    dos arquivos, a memória das colunas usadas como texto bruto (como
+    ficariam sem o esquema) e a memória final com os tipos compactos.
+    """
+    if not arquivos:
+        raise ValueError("Nenhum arquivo válido enviado.")
+
+    lidos = ler_partes(arquivos, processos=processos, ao_concluir=ao_concluir)
+    partes = [df_arq for df_arq, _ in lidos]
+    memoria_bruta = sum(bruta for _, bruta in lidos)
+    bytes_arquivos = sum(arquivo.size for arquivo in arquivos)
+    del lidos
+
+    df_final = combinar_partes(partes)
+    del partes
+
+    relatorio = {
+        "linhas": len(df_final),
+        "bytes_arquivos": bytes_arquivos,
+        "memoria_bruta": memoria_bruta,
+        "memoria_final": _memoria(df_final),
+    }
+    return df_final, relatorio
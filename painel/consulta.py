@@ -0,0 +1,450 @@
+"""
+Backends de consulta do painel: de onde saem as opções dos filtros, o
+último dia / dias equivalentes e as tabelas das abas.
+
+- pandas (padrão): base inteira na memória, resumida no cubo de viagens
+  (painel.cubo) e filtrada por posições (painel.filtros, painel.indice).
+- duckdb: a base fica só no Parquet do cache em disco (ou nos dias do
+  acervo local, painel.acervo); filtros, seleção dos
+  dias e agregações rodam como consultas SQL sobre o arquivo, e só as
+  tabelas pequenas de resultado voltam para o pandas. Serve para históricos
+  que não cabem na memória do servidor. Requer o pacote duckdb.
+
+Os dois backends têm a mesma interface e terminam as tabelas com as mesmas
+funções (painel.analises, painel.relatorios), então devolvem os mesmos
+números. Escolha com PAINEL_BACKEND=pandas|duckdb.
+
+Um filtro é um dicionário com sistema, empresas, linhas e faixas (lista
+vazia = sem filtro, como na tela). O dia de referência, os dias
+equivalentes por tipo (n_dias) e os feriados vão em periodos; resumo_dias
+dá o resumo de todos os dias para trocar o dia de referência sem refazer as
+contas (painel.referencia). As séries da aba de tendência (painel.tendencia)
+cobrem o período inteiro, sem dia de referência. Limites de adiantamento fora dos do cubo
+(3, 5 e 10 min) e os percentis usam o histograma de meio minuto
+(painel.histograma): no pandas ele vem pronto junto com o cubo; no duckdb
+as faixas são calculadas na consulta.
+"""
+
+import os
+
+import numpy as np
+import pandas as pd
+
+from painel import alertas, analises, cubo, filtros, histograma, ranking, referencia, relatorios, tendencia
+
+BACKENDS = ["pandas", "duckdb"]
+
+BACKEND = os.environ.get("PAINEL_BACKEND", "pandas").strip().lower()
+
+
+class ConsultaPandas:
+    """Consultas sobre o cubo de viagens em memória."""
+
+    nome = "pandas"
+
+    def __init__(self, cubo_base, indice_datas, hist=None, indice_hist=None):
+        self.cubo = cubo_base
+        self.indice = indice_datas
+        self.hist = hist
+        self.indice_hist = indice_hist
+        self._pos_sistema = {}
+
+    def tem_coluna(self, coluna):
+        return coluna in self.cubo.columns
+
+    def _posicoes_sistema(self, sistema):
+        # o sistema muda pouco e é usado pelas opções e por todos os filtros
+        if sistema not in self._pos_sistema:
+            self._pos_sistema[sistema] = filtros.filtrar(self.cubo, sistema=sistema)
+        return self._pos_sistema[sistema]
+
+    def _posicoes(self, filtro):
+        return filtros.filtrar(
+            self.cubo,
+            empresas=filtro.get("empresas"),
+            linhas=filtro.get("linhas"),
+            faixas=filtro.get("faixas"),
+            posicoes=self._posicoes_sistema(filtro["sistema"]),
+        )
+
+    def tem_dados(self, filtro):
+        return len(self._posicoes(filtro)) > 0
+
+    def opcoes(self, sistema, coluna):
+        return filtros.opcoes(self.cubo, self._posicoes_sistema(sistema), coluna)
+
+    def _posicoes_hist(self, filtro):
+        return filtros.filtrar(
+            self.hist,
+            sistema=filtro["sistema"],
+            empresas=filtro.get("empresas"),
+            linhas=filtro.get("linhas"),
+            faixas=filtro.get("faixas"),
+        )
+
+    def periodos(self, filtro, janela=relatorios.JANELA_RANK_DIAS, dia=None, n_dias=None, feriados=()):
+        periodos = relatorios.separar_periodos(
+            self.cubo, self.indice, self._posicoes(filtro), dia, janela, n_dias, feriados
+        )
+        periodos["filtro"] = filtro
+        periodos["tem_janela"] = len(periodos["pos_rank"]) > 0
+        if self.hist is not None:
+            # os mesmos dias, em posições do histograma
+            pos_hist = self._posicoes_hist(filtro)
+            periodos["hist_ultimo"] = self.indice_hist.nos_dias(pos_hist, [periodos["ultimo_dia"]])
+            periodos["hist_base_equiv"] = self.indice_hist.nos_dias(pos_hist, periodos["dias_equiv"])
+            periodos["hist_rank"] = analises.janela_ranking(self.indice_hist, pos_hist, periodos["ultimo_dia"], janela)
+        return periodos
+
+    def resumo_dias(self, filtro, n_dias=None, feriados=()):
+        self._exigir_histograma()
+        contagens_dias = histograma.contagens_por_dia(self.hist, self.indice_hist, self._posicoes_hist(filtro))
+        return referencia.montar_resumo(self.indice_hist.dias, contagens_dias, feriados, n_dias)
+
+    def tendencia_adiantamento(self, filtro, limites, por_empresa=False):
+        self._exigir_histograma()
+        dias, grupos, _, contagens = tendencia.contar_por_dia(
+            self.hist, self.indice_hist, self._posicoes_hist(filtro), "Empresa" if por_empresa else None, "Faixa_Minuto"
+        )
+        return tendencia.serie_adiantamento(dias, grupos, contagens, limites)
+
+    def tendencia_distribuicao(self, filtro, coluna, por_empresa=False):
+        dias, grupos, valores, contagens = tendencia.contar_por_dia(
+            self.cubo, self.indice, self._posicoes(filtro), "Empresa" if por_empresa else None, coluna
+        )
+        return tendencia.serie_distribuicao(dias, grupos, valores, contagens, coluna)
+
+    def _exigir_histograma(self):
+        if self.hist is None:
+            raise ValueError("Limites fora de 3, 5 e 10 min e percentis precisam do histograma de adiantamento.")
+
+    def tabela_adiantamento(self, periodos, limites=cubo.LIMITES_ADIANTAMENTO):
+        if list(limites) == cubo.LIMITES_ADIANTAMENTO:
+            return relatorios.tabela_adiantamento(self.cubo, periodos["pos_base_equiv"], periodos["pos_ultimo"])
+        self._exigir_histograma()
+        return relatorios.tabela_limites(
+            histograma.contagens(self.hist, periodos["hist_ultimo"]),
+            histograma.contagens(self.hist, periodos["hist_base_equiv"]),
+            limites,
+        )
+
+    def percentis_adiantamento(self, periodos, percentis=histograma.PERCENTIS):
+        self._exigir_histograma()
+        return relatorios.tabela_percentis(
+            histograma.contagens(self.hist, periodos["hist_ultimo"]),
+            histograma.contagens(self.hist, periodos["hist_base_equiv"]),
+            percentis,
+        )
+
+    def tabela_comparativa(self, periodos, coluna):
+        return analises.tabela_comparativa(self.cubo, periodos["pos_ultimo"], periodos["pos_base_equiv"], coluna)
+
+    def rankings(self, periodos, limites=cubo.LIMITES_ADIANTAMENTO, granularidade="Empresa", k=None, minimo=0):
+        hist = pos_hist = None
+        if list(limites) != cubo.LIMITES_ADIANTAMENTO:
+            self._exigir_histograma()
+            hist, pos_hist = self.hist, periodos["hist_rank"]
+        return relatorios.rankings(
+            self.cubo, periodos["pos_rank"], granularidade, list(limites), k, minimo, hist, pos_hist
+        )
+
+    def alertas(self, periodos, limites=cubo.LIMITES_ADIANTAMENTO, n=alertas.N_ALERTAS, minimo=alertas.MINIMO_VIAGENS):
+        hist = hist_ultimo = hist_base_equiv = None
+        if list(limites) != cubo.LIMITES_ADIANTAMENTO:
+            self._exigir_histograma()
+            hist, hist_ultimo, hist_base_equiv = self.hist, periodos["hist_ultimo"], periodos["hist_base_equiv"]
+        return relatorios.tabela_alertas(
+            self.cubo, periodos["pos_ultimo"], periodos["pos_base_equiv"], list(limites), n, minimo,
+            hist, hist_ultimo, hist_base_equiv,
+        )
+
+
+def _faixa_minuto_sql(coluna="Adiantamento_min"):
+    """Expressão SQL da faixa de meio minuto (mesmos códigos de histograma.faixa_minuto)."""
+    return (
+        f"CASE WHEN {coluna} IS NULL OR isnan({coluna}) THEN {histograma.SEM_REALIZADO} "
+        f"WHEN {coluna} <= {histograma.MINIMO} THEN {histograma.ABAIXO} "
+        f"WHEN {coluna} > {histograma.MAXIMO} THEN {histograma.ACIMA} "
+        f"ELSE {histograma.ABAIXO} + CAST(ceil(({coluna} - ({histograma.MINIMO})) / {histograma.LARGURA_FAIXA}) AS INTEGER) END"
+    )
+
+
+def _nativo(valores):
+    """Lista de valores Python (sem tipos numpy), para parâmetros SQL."""
+    return [v.item() if hasattr(v, "item") else v for v in valores]
+
+
+class ConsultaDuckDB:
+    """Consultas SQL (DuckDB) direto sobre o Parquet da base tratada."""
+
+    nome = "duckdb"
+
+    def __init__(self, caminho_parquet):
+        try:
+            import duckdb
+        except ImportError as erro:
+            raise ValueError("O backend duckdb precisa do pacote duckdb (pip install duckdb).") from erro
+
+        self._conexao = duckdb.connect()
+        caminho = caminho_parquet.replace("'", "''")
+        # o caminho pode ser um padrão (glob), como os dias do acervo local
+        self._conexao.execute(
+            f"CREATE VIEW viagens AS SELECT * FROM read_parquet('{caminho}', union_by_name = true)"
+        )
+        self._colunas = {linha[0] for linha in self._conexao.execute("DESCRIBE viagens").fetchall()}
+
+    def _sql(self, sql, parametros=()):
+        # um cursor por consulta: a conexão pode ser usada por várias sessões
+        return self._conexao.cursor().execute(sql, list(parametros)).df()
+
+    def tem_coluna(self, coluna):
+        return coluna in self._colunas
+
+    def _onde(self, filtro):
+        """Cláusula WHERE e parâmetros do filtro."""
+        condicoes, parametros = ["Sistema = ?"], [filtro["sistema"]]
+        for chave, coluna in [("empresas", "Empresa"), ("linhas", "Linha"), ("faixas", "Faixa_Horaria")]:
+            valores = filtro.get(chave)
+            if valores and coluna in self._colunas:
+                condicoes.append(f'list_contains(?, "{coluna}")')
+                parametros.append(_nativo(valores))
+        return " AND ".join(condicoes), parametros
+
+    @staticmethod
+    def _nos_dias(dias):
+        """Condição "Data_Agendada em um destes dias" (FALSE se a lista for vazia)."""
+        if not dias:
+            return "FALSE", []
+        return "list_contains(?::TIMESTAMP[], Data_Agendada)", [[d.to_pydatetime() for d in dias]]
+
+    def tem_dados(self, filtro):
+        onde, parametros = self._onde(filtro)
+        return not self._sql(f"SELECT 1 FROM viagens WHERE {onde} LIMIT 1", parametros).empty
+
+    def opcoes(self, sistema, coluna):
+        tabela = self._sql(
+            f'SELECT DISTINCT "{coluna}" AS v FROM viagens WHERE Sistema = ? AND "{coluna}" IS NOT NULL',
+            [sistema],
+        )
+        return sorted(_nativo(tabela["v"]))
+
+    def periodos(self, filtro, janela=relatorios.JANELA_RANK_DIAS, dia=None, n_dias=None, feriados=()):
+        onde, parametros = self._onde(filtro)
+        if dia is not None:
+            onde += " AND Data_Agendada <= ?"
+            parametros = parametros + [pd.Timestamp(dia).to_pydatetime()]
+
+        # dias com viagens nos filtros (até o dia de referência); os
+        # equivalentes saem deles, como no pandas
+        dias = pd.DatetimeIndex(self._sql(
+            f"SELECT DISTINCT Data_Agendada AS d FROM viagens "
+            f"WHERE {onde} AND Data_Agendada IS NOT NULL ORDER BY d",
+            parametros,
+        )["d"])
+        if not len(dias):
+            raise ValueError("Não foi possível identificar datas válidas em Data_Agendada.")
+        ultimo_dia = dias[-1]
+        tipos = referencia.tipos_dos_dias(dias, feriados)
+        equiv = analises.dias_equivalentes(tipos, np.ones(len(dias), dtype=bool), len(dias) - 1, n_dias)
+
+        inicio_rank = ultimo_dia - pd.Timedelta(days=janela - 1)
+        return {
+            "filtro": filtro,
+            "ultimo_dia": ultimo_dia,
+            "tipo_dia": tipos[-1],
+            "dias_equiv": list(dias[equiv]),
+            "inicio_rank": inicio_rank,
+            "tem_janela": bool((dias >= inicio_rank).any()),
+        }
+
+    def resumo_dias(self, filtro, n_dias=None, feriados=()):
+        onde, parametros = self._onde(filtro)
+        por_faixa = self._sql(
+            f"SELECT Data_Agendada AS d, {_faixa_minuto_sql()} AS Faixa_Minuto, count(*) AS Qtd "
+            f"FROM viagens WHERE {onde} AND Data_Agendada IS NOT NULL GROUP BY 1, 2",
+            parametros,
+        )
+        dias = pd.DatetimeIndex(np.sort(por_faixa["d"].unique()))
+        contagens_dias = np.zeros((len(dias), histograma.N_FAIXAS), dtype=np.int64)
+        contagens_dias[dias.get_indexer(por_faixa["d"]), por_faixa["Faixa_Minuto"].to_numpy(dtype=np.int64)] = (
+            por_faixa["Qtd"].to_numpy()
+        )
+        return referencia.montar_resumo(dias, contagens_dias, feriados, n_dias)
+
+    def _contagens_periodos(self, periodos, colunas_grupo=(), extras="", condicao_extra="TRUE"):
+        """
+        Viagens do último dia (Qtd_Dia) e dos dias equivalentes (Qtd_Base),
+        agrupadas por `colunas_grupo`. As expressões `extras` do SELECT podem
+        usar as marcações no_dia e na_base; Faixa_Minuto também pode agrupar.
+        """
+        onde, parametros = self._onde(periodos["filtro"])
+        nos_dias, parametros_dias = self._nos_dias(periodos["dias_equiv"])
+        grupo = ", ".join(f'"{c}"' for c in colunas_grupo)
+        return self._sql(
+            f"WITH sel AS ("
+            f"SELECT *, Data_Agendada = ? AS no_dia, {nos_dias} AS na_base, "
+            f"{_faixa_minuto_sql()} AS Faixa_Minuto "
+            f"FROM viagens WHERE {onde} AND {condicao_extra}) "
+            f"SELECT {grupo + ', ' if grupo else ''}"
+            f"count(*) FILTER (WHERE no_dia) AS Qtd_Dia, "
+            f"count(*) FILTER (WHERE na_base) AS Qtd_Base{extras} "
+            f"FROM sel WHERE no_dia OR na_base"
+            + (f" GROUP BY {grupo} ORDER BY {grupo}" if grupo else ""),
+            [periodos["ultimo_dia"].to_pydatetime()] + parametros_dias + parametros,
+        )
+
+    @staticmethod
+    def _adiantadas(limite, condicao="TRUE"):
+        # sem horário realizado não conta como adiantada, como no cubo
+        return (
+            f"count(*) FILTER (WHERE {condicao} AND Adiantamento_min > {float(limite)} "
+            f"AND NOT isnan(Adiantamento_min))"
+        )
+
+    def tabela_adiantamento(self, periodos, limites=cubo.LIMITES_ADIANTAMENTO):
+        histograma.validar_limites(limites)
+        extras = "".join(
+            f", {self._adiantadas(lim, 'no_dia')} AS dia_{i}, {self._adiantadas(lim, 'na_base')} AS base_{i}"
+            for i, lim in enumerate(limites)
+        )
+        contagens = self._contagens_periodos(periodos, extras=extras).iloc[0]
+
+        linhas = []
+        for i, limite in enumerate(limites):
+            qtd_dia, pct_dia, pct_base = analises.percentuais_adiantamento(
+                int(contagens[f"dia_{i}"]), int(contagens["Qtd_Dia"]),
+                int(contagens[f"base_{i}"]), int(contagens["Qtd_Base"]),
+            )
+            linhas.append(relatorios.linha_adiantamento(limite, qtd_dia, pct_dia, pct_base))
+        return pd.DataFrame(linhas)
+
+    def percentis_adiantamento(self, periodos, percentis=histograma.PERCENTIS):
+        por_faixa = self._contagens_periodos(periodos, ["Faixa_Minuto"])
+        faixas = por_faixa["Faixa_Minuto"].to_numpy(dtype=np.int64)
+        contagens_dia = np.zeros(histograma.N_FAIXAS, dtype=np.int64)
+        contagens_base = np.zeros(histograma.N_FAIXAS, dtype=np.int64)
+        contagens_dia[faixas] = por_faixa["Qtd_Dia"].to_numpy()
+        contagens_base[faixas] = por_faixa["Qtd_Base"].to_numpy()
+        return relatorios.tabela_percentis(contagens_dia, contagens_base, percentis)
+
+    def _contar_por_dia(self, filtro, coluna_grupo, valor):
+        """Contagens dias x grupos x valores, como tendencia.contar_por_dia, numa consulta."""
+        onde, parametros = self._onde(filtro)
+        grupo = f'"{coluna_grupo}"' if coluna_grupo else "NULL"
+        if coluna_grupo:
+            onde += f" AND {grupo} IS NOT NULL"
+        expressao = _faixa_minuto_sql() if valor == "Faixa_Minuto" else f'"{valor}"'
+        tabela = self._sql(
+            f"SELECT Data_Agendada AS d, {grupo} AS g, {expressao} AS v, count(*) AS Qtd FROM viagens "
+            f"WHERE {onde} AND Data_Agendada IS NOT NULL AND ({expressao}) IS NOT NULL GROUP BY 1, 2, 3",
+            parametros,
+        )
+        dias = pd.DatetimeIndex(np.sort(tabela["d"].unique()))
+        grupos = pd.Index(sorted(_nativo(tabela["g"].unique()))) if coluna_grupo else pd.Index([tendencia.TODAS])
+        if valor == "Faixa_Minuto":
+            valores = pd.RangeIndex(histograma.N_FAIXAS)
+        else:
+            valores = pd.Index(sorted(_nativo(tabela["v"].unique())))
+        contagens = np.zeros((len(dias), len(grupos), len(valores)), dtype=np.int64)
+        g = grupos.get_indexer(_nativo(tabela["g"])) if coluna_grupo else np.zeros(len(tabela), dtype=np.int64)
+        contagens[dias.get_indexer(tabela["d"]), g, valores.get_indexer(_nativo(tabela["v"]))] = tabela["Qtd"].to_numpy()
+        return dias, grupos, valores, contagens
+
+    def tendencia_adiantamento(self, filtro, limites, por_empresa=False):
+        histograma.validar_limites(limites)
+        dias, grupos, _, contagens = self._contar_por_dia(filtro, "Empresa" if por_empresa else None, "Faixa_Minuto")
+        return tendencia.serie_adiantamento(dias, grupos, contagens, limites)
+
+    def tendencia_distribuicao(self, filtro, coluna, por_empresa=False):
+        dias, grupos, valores, contagens = self._contar_por_dia(filtro, "Empresa" if por_empresa else None, coluna)
+        return tendencia.serie_distribuicao(dias, grupos, valores, contagens, coluna)
+
+    def tabela_comparativa(self, periodos, coluna):
+        contagens = self._contagens_periodos(periodos, [coluna], condicao_extra=f'"{coluna}" IS NOT NULL')
+        tab_ult = (
+            contagens.loc[contagens["Qtd_Dia"] > 0, [coluna, "Qtd_Dia"]]
+            .rename(columns={"Qtd_Dia": "Qtd Último Dia"})
+            .reset_index(drop=True)
+        )
+        tab_base = None
+        if periodos["dias_equiv"]:
+            tab_base = (
+                contagens.loc[contagens["Qtd_Base"] > 0, [coluna, "Qtd_Base"]]
+                .rename(columns={"Qtd_Base": "Qtd Base Dias Equivalentes"})
+                .reset_index(drop=True)
+            )
+        return analises.comparar_contagens(tab_ult, tab_base, coluna)
+
+    def rankings(self, periodos, limites=cubo.LIMITES_ADIANTAMENTO, granularidade="Empresa", k=None, minimo=0):
+        histograma.validar_limites(limites)
+        colunas = ranking.GRANULARIDADES[granularidade]
+        onde, parametros = self._onde(periodos["filtro"])
+        onde += " AND Data_Agendada BETWEEN ? AND ? AND " + " AND ".join(f'"{c}" IS NOT NULL' for c in colunas)
+        parametros = parametros + [periodos["inicio_rank"].to_pydatetime(), periodos["ultimo_dia"].to_pydatetime()]
+        grupo = ", ".join(f'"{c}"' for c in colunas)
+
+        extras = "".join(f", {self._adiantadas(lim)} AS a_{i}" for i, lim in enumerate(limites))
+        totais = self._sql(
+            f"SELECT {grupo}, count(*) AS Total{extras} FROM viagens "
+            f"WHERE {onde} GROUP BY {grupo} ORDER BY {grupo}",
+            parametros,
+        )
+        # mesmas contagens do ranking.contar (grupos na ordem das chaves), e as mesmas tabelas
+        contagens = {
+            "grupos": totais[colunas],
+            "total": totais["Total"].to_numpy(dtype=np.int64),
+            "adiantadas": totais[[f"a_{i}" for i in range(len(limites))]].to_numpy(dtype=np.int64),
+        }
+        chaves = pd.MultiIndex.from_frame(totais[colunas])
+        for coluna in ranking.COLUNAS_SITUACAO:
+            tabela = self._sql(
+                f'SELECT {grupo}, coalesce(CAST("{coluna}" AS VARCHAR), \'{ranking.SEM_SITUACAO}\') AS v, '
+                f"count(*) AS Qtd FROM viagens WHERE {onde} GROUP BY ALL",
+                parametros,
+            )
+            valores = pd.Index(sorted(tabela["v"].unique()), dtype=object)
+            matriz = np.zeros((len(chaves), len(valores)), dtype=np.int64)
+            matriz[chaves.get_indexer(pd.MultiIndex.from_frame(tabela[colunas])), valores.get_indexer(tabela["v"])] = (
+                tabela["Qtd"].to_numpy()
+            )
+            contagens[coluna] = (valores.to_numpy(), matriz)
+        return ranking.rankings(contagens, list(limites), k, minimo)
+
+    def alertas(self, periodos, limites=cubo.LIMITES_ADIANTAMENTO, n=alertas.N_ALERTAS, minimo=alertas.MINIMO_VIAGENS):
+        histograma.validar_limites(limites)
+        colunas = [c for c in alertas.COLUNAS if c in self._colunas]
+        nao_nulas = " AND ".join(f'"{c}" IS NOT NULL' for c in colunas)
+        extras = "".join(
+            f", {self._adiantadas(lim, 'no_dia')} AS dia_{i}, {self._adiantadas(lim, 'na_base')} AS base_{i}"
+            for i, lim in enumerate(limites)
+        )
+        totais = self._contagens_periodos(periodos, colunas, extras, nao_nulas)
+        por_situacao = self._contagens_periodos(
+            periodos, colunas + ["Situação_viagem"], condicao_extra=f'{nao_nulas} AND "Situação_viagem" IS NOT NULL'
+        )
+
+        # mesmas contagens de alertas.contar: os grupos dos dois períodos e as mesmas situações nos dois
+        chaves = pd.MultiIndex.from_frame(totais[colunas])
+        valores = pd.Index(sorted(_nativo(por_situacao["Situação_viagem"].unique())), dtype=object)
+        linhas = chaves.get_indexer(pd.MultiIndex.from_frame(por_situacao[colunas]))
+        colunas_valor = valores.get_indexer(_nativo(por_situacao["Situação_viagem"]))
+        contagens = []
+        for qtd, prefixo in [("Qtd_Dia", "dia"), ("Qtd_Base", "base")]:
+            matriz = np.zeros((len(chaves), len(valores)), dtype=np.int64)
+            matriz[linhas, colunas_valor] = por_situacao[qtd].to_numpy()
+            contagens.append({
+                "grupos": totais[colunas],
+                "total": totais[qtd].to_numpy(dtype=np.int64),
+                "adiantadas": totais[[f"{prefixo}_{i}" for i in range(len(limites))]].to_numpy(dtype=np.int64),
+                "Situação_viagem": (valores.to_numpy(), matriz),
+            })
+        return alertas.maiores_desvios(*contagens, list(limites), n, minimo)
+
+
+def abrir(backend, cubo_base=None, indice_datas=None, caminho_parquet=None, hist=None, indice_hist=None):
+    """Cria o backend pelo nome (ver BACKENDS). Nome desconhecido gera ValueError."""
+    if backend == "pandas":
+        return ConsultaPandas(cubo_base, indice_datas, hist, indice_hist)
+    if backend == "duckdb":
+        return ConsultaDuckDB(caminho_parquet)
+    raise ValueError(f"Backend '{backend}' desconhecido. Use: {', '.join(BACKENDS)}.")
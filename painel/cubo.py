@@ -0,0 +1,130 @@
+"""
+Cubo de viagens: contagem de viagens por combinação de chaves.
+
+Montado uma vez por base, substitui a base linha a linha em todos os
+cálculos do painel (filtros, último dia, dias equivalentes, abas e
+rankings). Como o número de combinações é muito menor que o de viagens,
+mudar um filtro custa milissegundos mesmo com milhões de viagens.
+
+Chaves: Data_Agendada, Sistema, Empresa, Linha, Hora_Agendada,
+Situação_viagem, Situação_categoria e Faixa_Adiantamento. Tipo_Dia e
+Faixa_Horaria são derivados de Data_Agendada e Hora_Agendada e vão junto
+como colunas do cubo. A contagem fica em Qtd.
+"""
+
+import numpy as np
+import pandas as pd
+
+from painel import tratamento
+
+# limites (minutos) das marcações Adianta_3/5/10
+LIMITES_ADIANTAMENTO = [3, 5, 10]
+
+# Faixa_Adiantamento = quantos limites o adiantamento ultrapassa (0 a 3);
+# sem horário realizado conta como 0, como nas marcações Adianta_*
+FAIXAS_ADIANTAMENTO = ["até 3 min", "3 a 5 min", "5 a 10 min", "mais de 10 min"]
+
+CHAVES_CUBO = [
+    "Data_Agendada",
+    "Sistema",
+    "Empresa",
+    "Linha",
+    "Hora_Agendada",
+    "Situação_viagem",
+    "Situação_categoria",
+    "Faixa_Adiantamento",
+]
+
+
+def faixa_adiantamento(adiantamento_min):
+    """Código da faixa de adiantamento (int8): nº de limites ultrapassados."""
+    valores = np.asarray(adiantamento_min, dtype=float)
+    faixa = np.searchsorted(LIMITES_ADIANTAMENTO, valores, side="left")
+    faixa[np.isnan(valores)] = 0
+    return faixa.astype(np.int8)
+
+
+def _codificar(serie):
+    """Retorna (códigos int64 com -1 para nulo, valores) de uma coluna."""
+    if isinstance(serie.dtype, pd.CategoricalDtype):
+        return serie.cat.codes.to_numpy(dtype=np.int64), serie.cat.categories
+    codigos, valores = pd.factorize(serie, sort=True)
+    return codigos.astype(np.int64), valores
+
+
+def _decodificar(codigos, valores):
+    """Volta dos códigos para a coluna (datetime ou categoria)."""
+    valores = pd.Index(valores)
+    if isinstance(valores, pd.DatetimeIndex):
+        return valores.take(codigos, allow_fill=True, fill_value=pd.NaT)
+    return pd.Categorical.from_codes(codigos, categories=valores)
+
+
+def contar_combinacoes(codigos, tamanhos):
+    """
+    Agrupa linhas por várias colunas já codificadas (-1 = nulo, que vira
+    um grupo próprio). Retorna (códigos de cada grupo por coluna, contagem),
+    com os grupos em ordem crescente das colunas (a primeira manda).
+    """
+    radices = [t + 1 for t in tamanhos]
+    if np.prod(np.array(radices, dtype=float)) < 2**62:
+        chave = np.zeros(len(codigos[0]), dtype=np.int64)
+        for cod, radix in zip(codigos, radices):
+            chave *= radix
+            chave += cod + 1
+        unicas, qtd = np.unique(chave, return_counts=True)
+        grupos = []
+        for radix in reversed(radices):
+            grupos.append(unicas % radix - 1)
+            unicas = unicas // radix
+        grupos.reverse()
+    else:
+        matriz, qtd = np.unique(np.column_stack(codigos), axis=0, return_counts=True)
+        grupos = [matriz[:, i] for i in range(matriz.shape[1])]
+    return grupos, qtd
+
+
+def codificar_chave(df, coluna):
+    """(códigos int64 com -1 para nulo, valores) de uma chave do cubo."""
+    if coluna == "Hora_Agendada":
+        hora = df[coluna].to_numpy(dtype=float, na_value=np.nan)
+        return np.where(np.isnan(hora), -1, hora).astype(np.int64), np.arange(24, dtype=np.int8)
+    return _codificar(df[coluna])
+
+
+def decodificar_chave(coluna, codigos, valores):
+    """Volta uma chave do cubo dos códigos para a coluna."""
+    if coluna == "Hora_Agendada":
+        return pd.arrays.IntegerArray(np.maximum(codigos, 0).astype(np.int8), codigos < 0)
+    return _decodificar(codigos, valores)
+
+
+def montar_cubo(df):
+    """Conta as viagens da base tratada por combinação das chaves do cubo."""
+    chaves = [c for c in CHAVES_CUBO if c in df.columns or c == "Faixa_Adiantamento"]
+
+    codigos, valores = [], []
+    for c in chaves:
+        if c == "Faixa_Adiantamento":
+            codigos.append(faixa_adiantamento(df["Adiantamento_min"]).astype(np.int64))
+            valores.append(np.arange(len(LIMITES_ADIANTAMENTO) + 1, dtype=np.int8))
+        else:
+            cod, val = codificar_chave(df, c)
+            codigos.append(cod)
+            valores.append(val)
+
+    grupos, qtd = contar_combinacoes(codigos, [len(v) for v in valores])
+
+    cubo = {}
+    for c, cod, val in zip(chaves, grupos, valores):
+        if c == "Faixa_Adiantamento":
+            cubo[c] = cod.astype(np.int8)
+        else:
+            cubo[c] = decodificar_chave(c, cod, val)
+    cubo = pd.DataFrame(cubo)
+    cubo["Qtd"] = qtd.astype(np.int64)
+
+    # colunas derivadas (mesmas regras do tratamento da base)
+    cubo["Tipo_Dia"] = tratamento.tipo_dia(cubo["Data_Agendada"])
+    cubo["Faixa_Horaria"] = tratamento.faixa_horaria(cubo["Hora_Agendada"])
+    return cubo
@@ -0,0 +1,58 @@
+"""
+Filtros da barra lateral (BLOCO 8) avaliados sobre os códigos das categorias.
+
+Cada seleção (Sistema, Empresa, Linha, Faixa horária) vira uma tabela
+booleana do tamanho das categorias, indexada pelos códigos da coluna — sem
+comparar textos linha a linha como o isin. O resultado não é um DataFrame
+copiado, e sim as posições das linhas selecionadas (array de inteiros),
+que seguem pelo resto do cálculo (último dia, dias equivalentes, janela do
+ranking). Só as colunas que cada tabela precisa são recortadas no fim.
+"""
+
+import numpy as np
+import pandas as pd
+
+
+def mascara_valores(serie, valores):
+    """Equivalente a serie.isin(valores) para coluna categórica, pelos códigos."""
+    categorias = serie.cat.categories
+    tabela = np.zeros(len(categorias) + 1, dtype=bool)
+    tabela[:-1] = categorias.isin(list(valores))
+    # código -1 (nulo) cai na última posição, que é False
+    return tabela[serie.cat.codes.to_numpy()]
+
+
+def filtrar(cubo, sistema=None, empresas=None, linhas=None, faixas=None, posicoes=None):
+    """
+    Posições das linhas do cubo que passam nos filtros.
+
+    Lista vazia (ou None) em empresas/linhas/faixas não filtra, como no
+    painel original. `posicoes` restringe o filtro a um recorte anterior.
+    """
+    mask = np.ones(len(cubo), dtype=bool)
+
+    if sistema is not None:
+        mask &= mascara_valores(cubo["Sistema"], [sistema])
+    if empresas and "Empresa" in cubo.columns:
+        mask &= mascara_valores(cubo["Empresa"], empresas)
+    if linhas and "Linha" in cubo.columns:
+        mask &= mascara_valores(cubo["Linha"], linhas)
+    if faixas:
+        mask &= mascara_valores(cubo["Faixa_Horaria"], faixas)
+
+    if posicoes is None:
+        return np.flatnonzero(mask)
+    return posicoes[mask[posicoes]]
+
+
+def opcoes(cubo, posicoes, coluna):
+    """Valores distintos (não nulos, ordenados) de uma coluna categórica nas posições."""
+    serie = cubo[coluna]
+    codigos = np.unique(serie.cat.codes.to_numpy()[posicoes])
+    codigos = codigos[codigos >= 0]
+    return sorted(serie.cat.categories.take(codigos))
+
+
+def recorte(cubo, posicoes, colunas):
+    """DataFrame só com as colunas pedidas, nas posições dadas."""
+    return pd.DataFrame({c: cubo[c].array.take(posicoes) for c in colunas})
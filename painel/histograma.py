@@ -0,0 +1,131 @@
+"""
+Histograma de Adiantamento_min por dia, sistema, empresa, linha e hora.
+
+O cubo (painel.cubo) guarda só em qual dos limites fixos (3, 5 e 10 min) o
+adiantamento cai. Para limites quaisquer e percentis, este histograma conta
+as viagens em faixas de meio minuto entre -60 e 120 min (mais uma faixa
+abaixo, uma acima e uma para viagens sem horário realizado), no mesmo
+formato longo do cubo: chaves Data_Agendada, Sistema, Empresa, Linha e
+Hora_Agendada, a faixa em Faixa_Minuto e a contagem em Qtd. Os filtros e o
+índice por data do cubo (painel.filtros, painel.indice) servem para ele.
+
+Montado uma vez por base, qualquer conjunto de limites múltiplos de 0,5
+min é respondido com somas acumuladas das faixas, e os percentis com
+interpolação dentro da faixa (erro de no máximo meio minuto).
+"""
+
+import numpy as np
+import pandas as pd
+
+from painel import cubo, tratamento
+
+LARGURA_FAIXA = 0.5
+MINIMO, MAXIMO = -60.0, 120.0
+
+# bordas das faixas; a faixa k (2 a N_FAIXAS - 2) vai de BORDAS[k - 2]
+# (exclusive) a BORDAS[k - 1] (inclusive), como "adiantada > limite"
+BORDAS = np.arange(MINIMO, MAXIMO + LARGURA_FAIXA / 2, LARGURA_FAIXA)
+SEM_REALIZADO, ABAIXO = 0, 1
+ACIMA = len(BORDAS) + 1
+N_FAIXAS = len(BORDAS) + 2
+
+CHAVES_HISTOGRAMA = ["Data_Agendada", "Sistema", "Empresa", "Linha", "Hora_Agendada"]
+
+# percentis mostrados na aba 1 (das viagens adiantadas, > 0 min)
+PERCENTIS = [50, 90, 99]
+
+
+def faixa_minuto(adiantamento_min):
+    """Código da faixa de meio minuto de cada adiantamento (int16)."""
+    valores = np.asarray(adiantamento_min, dtype=float)
+    faixa = np.searchsorted(BORDAS, valores, side="left") + 1
+    faixa[np.isnan(valores)] = SEM_REALIZADO
+    return faixa.astype(np.int16)
+
+
+def validar_limites(limites):
+    """Limites precisam ser múltiplos de 0,5 min entre -60 e 120 (ValueError se não)."""
+    for limite in limites:
+        if not (MINIMO <= limite <= MAXIMO) or (limite / LARGURA_FAIXA) % 1:
+            raise ValueError(
+                f"Limite de adiantamento inválido: {limite}. Use múltiplos de "
+                f"{LARGURA_FAIXA:g} min entre {MINIMO:g} e {MAXIMO:g}."
+            )
+
+
+def montar_histograma(df):
+    """Conta as viagens da base tratada por chave e faixa de meio minuto."""
+    chaves = [c for c in CHAVES_HISTOGRAMA if c in df.columns]
+
+    codigos, valores = [], []
+    for c in chaves:
+        cod, val = cubo.codificar_chave(df, c)
+        codigos.append(cod)
+        valores.append(val)
+    codigos.append(faixa_minuto(df["Adiantamento_min"]).astype(np.int64))
+
+    grupos, qtd = cubo.contar_combinacoes(codigos, [len(v) for v in valores] + [N_FAIXAS])
+
+    hist = {c: cubo.decodificar_chave(c, cod, val) for c, cod, val in zip(chaves, grupos, valores)}
+    hist["Faixa_Minuto"] = grupos[-1].astype(np.int16)
+    hist = pd.DataFrame(hist)
+    hist["Qtd"] = qtd.astype(np.int64)
+
+    # colunas derivadas, para os mesmos filtros e índice do cubo
+    hist["Tipo_Dia"] = tratamento.tipo_dia(hist["Data_Agendada"])
+    hist["Faixa_Horaria"] = tratamento.faixa_horaria(hist["Hora_Agendada"])
+    return hist
+
+
+def contagens(hist, posicoes):
+    """Viagens por faixa (vetor de N_FAIXAS) nas posições do histograma."""
+    return np.bincount(
+        hist["Faixa_Minuto"].to_numpy()[posicoes],
+        weights=hist["Qtd"].to_numpy()[posicoes],
+        minlength=N_FAIXAS,
+    ).astype(np.int64)
+
+
+def contagens_por_dia(hist, indice_hist, posicoes):
+    """Viagens por dia do índice (painel.indice) e faixa: matriz dias x N_FAIXAS."""
+    k = np.searchsorted(indice_hist.inicio[:-1], posicoes, side="right") - 1
+    validos = k >= 0  # data nula fica de fora
+    return np.bincount(
+        k[validos] * N_FAIXAS + hist["Faixa_Minuto"].to_numpy()[posicoes][validos],
+        weights=hist["Qtd"].to_numpy()[posicoes][validos],
+        minlength=len(indice_hist.dias) * N_FAIXAS,
+    ).astype(np.int64).reshape(len(indice_hist.dias), N_FAIXAS)
+
+
+def acima_de(contagens_faixas, limites):
+    """
+    Viagens com adiantamento > cada limite (última dimensão = faixas).
+    Viagens sem horário realizado não contam, como nas marcações Adianta_*.
+    """
+    validar_limites(limites)
+    # acumulado[..., k] = viagens nas faixas k em diante
+    acumulado = np.cumsum(contagens_faixas[..., ::-1], axis=-1)[..., ::-1]
+    k = np.searchsorted(BORDAS, np.asarray(limites, dtype=float)) + 2
+    return acumulado[..., k]
+
+
+def percentis(contagens_faixas, ps=PERCENTIS, acima_de_min=0.0):
+    """
+    Percentis (min) do adiantamento das viagens com adiantamento >
+    acima_de_min, interpolando dentro da faixa de meio minuto. NaN se não
+    houver viagens; na faixa acima de 120 min, o resultado é 120.
+    """
+    validar_limites([acima_de_min])
+    k_ini = int(np.searchsorted(BORDAS, acima_de_min)) + 2
+    qtd = contagens_faixas[k_ini:].astype(float)
+    total = qtd.sum()
+    if total == 0:
+        return np.full(len(ps), np.nan)
+    acumulado = np.cumsum(qtd)
+    alvo = np.asarray(ps, dtype=float) / 100 * total
+    j = np.minimum(np.searchsorted(acumulado, alvo, side="left"), len(qtd) - 1)
+    k = j + k_ini
+    antes = acumulado[j] - qtd[j]
+    fracao = np.where(qtd[j] > 0, (alvo - antes) / np.where(qtd[j] > 0, qtd[j], 1), 0.0)
+    inferior = BORDAS[np.minimum(k - 2, len(BORDAS) - 1)]
+    return np.where(k == ACIMA, MAXIMO, inferior + np.clip(fracao, 0, 1) * LARGURA_FAIXA)
@@ -0,0 +1,58 @@
+"""
+Índice por data do cubo de viagens (BLOCOS 9 e 10).
+
+O cubo sai de painel.cubo ordenado por Data_Agendada (nulos primeiro), e
+as posições vindas de painel.filtros são crescentes. Guardando os dias
+distintos e a posição onde cada um começa no cubo, o último dia, os dias
+equivalentes e a janela do ranking viram buscas binárias (searchsorted)
+sobre as posições filtradas, em vez de varrer a coluna de datas inteira a
+cada interação.
+"""
+
+import numpy as np
+import pandas as pd
+
+
+class IndiceDatas:
+    """Dias distintos do cubo, onde cada um começa e o Tipo_Dia de cada um."""
+
+    def __init__(self, cubo):
+        datas = pd.DatetimeIndex(cubo["Data_Agendada"])
+        valores = datas.asi8  # NaT é o menor int64, então fica no começo
+        if (valores[1:] < valores[:-1]).any():
+            raise ValueError("O cubo precisa estar ordenado por Data_Agendada.")
+
+        primeiro = int(np.count_nonzero(datas.isna()))
+        mudancas = np.flatnonzero(np.diff(valores[primeiro:])) + 1 + primeiro
+        inicio_dias = np.concatenate([[primeiro], mudancas]) if primeiro < len(valores) else np.array([], dtype=np.int64)
+
+        self.dias = datas.take(inicio_dias)
+        self.tipos = np.asarray(cubo["Tipo_Dia"].array.take(inicio_dias), dtype=object)
+        # inicio[k] é a primeira posição do dia k; inicio[-1] é o fim do cubo
+        self.inicio = np.append(inicio_dias, len(valores)).astype(np.int64)
+
+    def dia_da_posicao(self, posicao):
+        """Índice do dia de uma posição do cubo (-1 se a data for nula)."""
+        return int(np.searchsorted(self.inicio[:-1], posicao, side="right")) - 1
+
+    def dias_com_dados(self, posicoes):
+        """Índices (crescentes) dos dias que têm alguma das posições."""
+        # uma busca por dia (não por posição): dias com início e fim diferentes
+        return np.flatnonzero(np.diff(np.searchsorted(posicoes, self.inicio)) > 0)
+
+    def recortar(self, posicoes, k_ini, k_fim):
+        """Posições (crescentes) que caem nos dias k_ini até k_fim - 1."""
+        a, b = np.searchsorted(posicoes, self.inicio[[k_ini, k_fim]])
+        return posicoes[a:b]
+
+    def nos_dias(self, posicoes, datas):
+        """Posições (crescentes) que caem nas datas dadas."""
+        ks = np.sort(self.dias.get_indexer(pd.DatetimeIndex(datas)))
+        partes = [self.recortar(posicoes, k, k + 1) for k in ks[ks >= 0]]
+        return np.concatenate(partes) if partes else posicoes[:0]
+
+    def faixa_dias(self, data_ini, data_fim):
+        """(k_ini, k_fim) dos dias entre data_ini e data_fim, inclusive."""
+        k_ini = int(self.dias.searchsorted(data_ini, side="left"))
+        k_fim = int(self.dias.searchsorted(data_fim, side="right"))
+        return k_ini, max(k_ini, k_fim)
@@ -0,0 +1,106 @@
+"""
+Instrumentação opcional dos blocos do painel.
+
+Com PAINEL_INSTRUMENTACAO=1 no ambiente, cada bloco embrulhado em
+`rastro.etapa(...)` registra tempo de parede, linhas de entrada e de saída
+e a variação de memória do processo (RSS). O app mostra os registros de
+cada execução num painel recolhível da barra lateral e exporta o rastro em
+JSON. Desligada, `etapa` devolve sempre o mesmo objeto vazio: o custo é
+uma chamada de função por bloco.
+"""
+
+import datetime
+import json
+import os
+import time
+
+ATIVA = os.environ.get("PAINEL_INSTRUMENTACAO", "").strip().lower() not in ("", "0", "false", "nao", "não")
+
+try:
+    _PAGINA = os.sysconf("SC_PAGE_SIZE")
+except (AttributeError, ValueError, OSError):
+    _PAGINA = None
+
+
+def memoria_rss():
+    """Memória residente do processo em bytes (None onde /proc não existe)."""
+    if _PAGINA is None:
+        return None
+    try:
+        with open("/proc/self/statm", "rb") as f:
+            return int(f.read().split()[1]) * _PAGINA
+    except OSError:
+        return None
+
+
+class _EtapaDesligada:
+    """Usada quando a instrumentação está desligada: não mede nada."""
+
+    __slots__ = ("saida",)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *erro):
+        return False
+
+
+_DESLIGADA = _EtapaDesligada()
+
+
+class _Etapa:
+    __slots__ = ("rastro", "nome", "entrada", "saida", "_inicio", "_memoria")
+
+    def __init__(self, rastro, nome, entrada):
+        self.rastro = rastro
+        self.nome = nome
+        self.entrada = entrada
+        self.saida = None
+
+    def __enter__(self):
+        self._memoria = memoria_rss()
+        self._inicio = time.perf_counter()
+        return self
+
+    def __exit__(self, tipo_erro, *erro):
+        segundos = time.perf_counter() - self._inicio
+        memoria = memoria_rss()
+        self.rastro.registros.append({
+            "etapa": self.nome,
+            "segundos": segundos,
+            "linhas_entrada": self.entrada,
+            "linhas_saida": self.saida,
+            "memoria_delta_mb": (
+                (memoria - self._memoria) / 1024**2
+                if memoria is not None and self._memoria is not None else None
+            ),
+            "erro": tipo_erro.__name__ if tipo_erro is not None else None,
+        })
+        return False
+
+
+class Rastro:
+    """Registros de uma execução do script (um rerun do Streamlit)."""
+
+    def __init__(self, ativa=None):
+        self.ativa = ATIVA if ativa is None else ativa
+        self.inicio = datetime.datetime.now().isoformat(timespec="seconds")
+        self.registros = []
+
+    def etapa(self, nome, entrada=None):
+        """
+        Context manager que mede um bloco. Atribua `.saida` (linhas de
+        saída) dentro do bloco, se fizer sentido.
+        """
+        if not self.ativa:
+            return _DESLIGADA
+        return _Etapa(self, nome, entrada)
+
+    def resumo(self):
+        """Dicionário com o início da execução e os registros."""
+        return {"inicio": self.inicio, "etapas": list(self.registros)}
+
+
+def exportar_json(rastros):
+    """JSON de uma lista de resumos (Rastro.resumo) de várias execuções."""
+    return json.dumps(rastros, ensure_ascii=False, indent=2)
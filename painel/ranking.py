@@ -0,0 +1,255 @@
+"""
+Rankings da aba 4 numa passada só, por empresa, linha ou empresa x linha.
+
+Os três rankings (adiantamento, Situação_viagem e Situação_categoria) saem
+das mesmas contagens: o código do grupo de cada linha do cubo é calculado
+uma vez, a partir dos códigos das categorias, e cada medida é um bincount
+sobre (grupo, código da medida). "Viagem concluída" é tirada comparando as
+categorias de Situação_viagem (poucas), não as viagens.
+
+As tabelas saem só das contagens (grupos, total, adiantadas por limite e
+viagens por situação), então o backend duckdb (painel.consulta) monta as
+contagens em SQL e usa as mesmas funções. Com granularidade por linha, o
+ranking 1 pode ficar só com os K grupos de maior % (np.partition), e os
+rankings 2 e 3 mostram os mesmos grupos, na mesma ordem.
+"""
+
+import numpy as np
+import pandas as pd
+
+from painel import analises, histograma
+
+# colunas de agrupamento de cada granularidade
+GRANULARIDADES = {
+    "Empresa": ["Empresa"],
+    "Linha": ["Linha"],
+    "Empresa × Linha": ["Empresa", "Linha"],
+}
+
+COLUNAS_SITUACAO = ["Situação_viagem", "Situação_categoria"]
+
+# valor das situações nulas nas tabelas (como o fillna("") de antes)
+SEM_SITUACAO = ""
+
+
+def _codigos_em(serie, posicoes, categorias):
+    """Códigos da coluna categórica nas posições, em termos de `categorias` (-1 = nulo ou ausente)."""
+    codigos = serie.cat.codes.to_numpy()[posicoes].astype(np.int64)
+    if serie.cat.categories.equals(categorias):
+        return codigos
+    # categorias em outra ordem (cubo e histograma de arquivos diferentes): traduz pelas categorias
+    traducao = np.append(categorias.get_indexer(serie.cat.categories), -1)
+    return traducao[codigos]
+
+
+def _combinar(tabela, posicoes, colunas, referencia=None):
+    """
+    Código combinado das colunas de agrupamento (-1 se alguma for nula) e o
+    número de categorias de cada uma, nas categorias da tabela `referencia`.
+    """
+    referencia = tabela if referencia is None else referencia
+    categorias = [referencia[c].cat.categories for c in colunas]
+    codigos = [_codigos_em(tabela[c], posicoes, cat) for c, cat in zip(colunas, categorias)]
+    tamanhos = [len(cat) for cat in categorias]
+    validos = np.logical_and.reduce([c >= 0 for c in codigos])
+    combinado = np.full(len(posicoes), -1, dtype=np.int64)
+    combinado[validos] = np.ravel_multi_index([c[validos] for c in codigos], tamanhos)
+    return combinado, tamanhos
+
+
+def _codigos_grupo(tabela, posicoes, colunas):
+    """
+    Código do grupo de cada posição (-1 se alguma chave for nula), os grupos
+    presentes (na ordem das categorias) e o mapa código combinado -> grupo.
+    """
+    combinado, tamanhos = _combinar(tabela, posicoes, colunas)
+    n_combinacoes = int(np.prod(tamanhos))
+    presentes = np.flatnonzero(np.bincount(combinado[combinado >= 0], minlength=n_combinacoes))
+    mapa = np.full(n_combinacoes + 1, -1, dtype=np.int64)  # a última casa recebe os -1
+    mapa[presentes] = np.arange(len(presentes))
+    chaves = np.unravel_index(presentes, tamanhos)
+    grupos = pd.DataFrame({
+        c: pd.Categorical.from_codes(k, dtype=tabela[c].dtype) for c, k in zip(colunas, chaves)
+    })
+    return mapa[combinado], grupos, mapa
+
+
+def _por_grupo(grupo, n_grupos, codigos, n_valores, qtd):
+    """Matriz grupos x valores com a soma de qtd."""
+    return np.bincount(
+        grupo * n_valores + codigos, weights=qtd, minlength=n_grupos * n_valores
+    ).astype(np.int64).reshape(n_grupos, n_valores)
+
+
+def contar(cubo_base, posicoes, colunas=("Empresa",), limites=None, hist=None, pos_hist=None):
+    """
+    Contagens dos três rankings por grupo, numa passada sobre as posições.
+
+    Adiantadas saem das faixas do cubo (limites padrão) ou, com outros
+    limites, do histograma de meio minuto (hist e pos_hist, mesmos grupos).
+    """
+    recortes_hist = None if pos_hist is None else [pos_hist]
+    return contar_recortes(cubo_base, [posicoes], colunas, limites, hist, recortes_hist)[0]
+
+
+def contar_recortes(cubo_base, recortes, colunas=("Empresa",), limites=None, hist=None, recortes_hist=None):
+    """
+    Contagens (como em contar) de vários recortes de posições nos mesmos
+    grupos: os presentes em algum dos recortes, na mesma ordem em todos.
+    recortes_hist traz as posições do histograma de cada recorte.
+    """
+    colunas = list(colunas)
+    limites = analises.LIMITES_ADIANTAMENTO if limites is None else list(limites)
+    grupo, grupos, mapa = _codigos_grupo(cubo_base, np.concatenate(recortes), colunas)
+    fins = np.cumsum([len(posicoes) for posicoes in recortes])
+    return [
+        _contar(
+            cubo_base, posicoes, grupo[fim - len(posicoes):fim], grupos, mapa, colunas, limites,
+            hist, None if recortes_hist is None else recortes_hist[k],
+        )
+        for k, (posicoes, fim) in enumerate(zip(recortes, fins))
+    ]
+
+
+def _contar(cubo_base, posicoes, grupo, grupos, mapa, colunas, limites, hist, pos_hist):
+    """Contagens de um recorte, com o grupo de cada posição já calculado."""
+    validos = grupo >= 0
+    grupo = grupo[validos]
+    posicoes = posicoes[validos]
+    qtd = cubo_base["Qtd"].to_numpy()[posicoes]
+    n_grupos = len(grupos)
+
+    contagens = {"grupos": grupos, "total": np.bincount(grupo, weights=qtd, minlength=n_grupos).astype(np.int64)}
+
+    if limites == analises.LIMITES_ADIANTAMENTO:
+        # faixa i = acima do limite i - 1: adiantadas > limite i = faixas i + 1 em diante
+        n_faixas = len(analises.LIMITES_ADIANTAMENTO) + 1
+        faixas = _por_grupo(grupo, n_grupos, cubo_base["Faixa_Adiantamento"].to_numpy()[posicoes].astype(np.int64),
+                            n_faixas, qtd)
+        contagens["adiantadas"] = np.cumsum(faixas[:, ::-1], axis=1)[:, ::-1][:, 1:]
+    else:
+        # códigos do histograma nas categorias do cubo: o mapa de grupos vale para os dois
+        grupo_hist = mapa[_combinar(hist, pos_hist, colunas, cubo_base)[0]]
+        validos_hist = grupo_hist >= 0
+        pos_hist = pos_hist[validos_hist]
+        faixas = _por_grupo(
+            grupo_hist[validos_hist], n_grupos, hist["Faixa_Minuto"].to_numpy()[pos_hist].astype(np.int64),
+            histograma.N_FAIXAS, hist["Qtd"].to_numpy()[pos_hist],
+        )
+        contagens["adiantadas"] = histograma.acima_de(faixas, limites)
+
+    for coluna in COLUNAS_SITUACAO:
+        serie = cubo_base[coluna]
+        codigos = serie.cat.codes.to_numpy()[posicoes].astype(np.int64)
+        n_valores = len(serie.cat.categories)
+        codigos[codigos < 0] = n_valores  # nulos na última coluna
+        valores = np.append(np.asarray(serie.cat.categories, dtype=object), SEM_SITUACAO)
+        contagens[coluna] = (valores, _por_grupo(grupo, n_grupos, codigos, n_valores + 1, qtd))
+    return contagens
+
+
+def selecionar_top(valores, k):
+    """
+    Índices dos k maiores valores, do maior para o menor (np.partition +
+    ordenação dos k). Empates ficam na ordem dos índices, também no corte.
+    """
+    if k is None or k >= len(valores):
+        return np.argsort(-valores, kind="stable")
+    # k-ésimo maior valor: entram os maiores que ele e os primeiros iguais a ele
+    corte = -np.partition(-valores, k - 1)[k - 1]
+    acima = np.flatnonzero(valores > corte)
+    escolhidos = np.sort(np.concatenate([acima, np.flatnonzero(valores == corte)[:k - len(acima)]]))
+    return escolhidos[np.argsort(-valores[escolhidos], kind="stable")]
+
+
+def _grupos(contagens, selecao):
+    return contagens["grupos"].iloc[selecao].reset_index(drop=True)
+
+
+def tabela_adiantamento(contagens, limites=None, k=None, minimo=0):
+    """
+    Ranking 1: % de adiantadas acima de cada limite por grupo, do maior %
+    (maior limite) para o menor. Com k, só os k primeiros; grupos com menos
+    de `minimo` viagens ficam de fora. Retorna (tabela, índices dos grupos).
+    """
+    limites = analises.LIMITES_ADIANTAMENTO if limites is None else list(limites)
+    colunas_pct = [analises.coluna_pct(lim) for lim in limites]
+    total = contagens["total"]
+    candidatos = np.flatnonzero((total > 0) & (total >= minimo))
+
+    resumo1 = _grupos(contagens, candidatos)
+    resumo1["Total"] = total[candidatos]
+    for i, limite in enumerate(limites):
+        resumo1[f"Adianta{limite:g}"] = contagens["adiantadas"][candidatos, i]
+
+    if k is None:
+        # todos os grupos: mesma ordenação do ranking por empresa de sempre
+        resumo1 = analises.resumo_adiantamento(resumo1, limites)
+        ordem = candidatos[resumo1.index.to_numpy()]
+    else:
+        pct = contagens["adiantadas"][candidatos, np.argmax(limites)] / total[candidatos]
+        escolhidos = selecionar_top(pct, k)
+        resumo1 = analises.resumo_adiantamento(resumo1.iloc[escolhidos].reset_index(drop=True), limites)
+        resumo1 = resumo1.loc[np.arange(len(escolhidos))]
+        ordem = candidatos[escolhidos]
+    colunas_grupo = list(contagens["grupos"].columns)
+    return resumo1[colunas_grupo + ["Total"] + colunas_pct], ordem
+
+
+def _distribuicao(contagens, coluna, manter, selecao):
+    """% de cada valor (colunas `manter`) dentro do grupo, nos grupos da seleção que têm viagens."""
+    valores, matriz = contagens[coluna]
+    matriz = matriz[:, manter]
+    valores = valores[manter]
+    if selecao is not None:
+        matriz = matriz[selecao]
+    total = matriz.sum(axis=1)
+    linhas = np.flatnonzero(total > 0)
+    grupos = _grupos(contagens, linhas if selecao is None else np.asarray(selecao)[linhas])
+    pct = matriz[linhas] / total[linhas, None] * 100
+    return grupos, valores, pct, matriz[linhas]
+
+
+def tabela_situacao_viagem(contagens, selecao=None):
+    """
+    Ranking 2: distribuição de Situação_viagem por grupo, sem 'Viagem
+    concluída' (% sobre as demais). Vazio se não sobrar nada.
+    """
+    valores, _ = contagens["Situação_viagem"]
+    grupos, valores, pct, matriz = _distribuicao(contagens, "Situação_viagem", ~analises.concluida(valores), selecao)
+    if grupos.empty:
+        return pd.DataFrame()
+
+    # só as situações que aparecem, em ordem alfabética (como o pivot_table)
+    presentes = np.flatnonzero(matriz.sum(axis=0) > 0)
+    presentes = presentes[np.argsort(valores[presentes].astype(str), kind="stable")]
+    tabela = pd.concat([grupos, pd.DataFrame(pct[:, presentes], columns=valores[presentes])], axis=1)
+    tabela.columns.name = "Situação_viagem"
+    return tabela
+
+
+def tabela_situacao_categoria(contagens, selecao=None):
+    """Ranking 3: distribuição de Situação_categoria por grupo (todas as CATEGORIAS)."""
+    valores, _ = contagens["Situação_categoria"]
+    grupos, valores, pct, matriz = _distribuicao(
+        contagens, "Situação_categoria", np.ones(len(valores), dtype=bool), selecao
+    )
+    tabela = grupos.copy()
+    posicao = {str(v): i for i, v in enumerate(valores)}
+    for c in analises.CATEGORIAS:
+        i = posicao.get(c)
+        # categoria que não aparece fica 0 (inteiro, como no pivot_table de antes)
+        tabela[c] = pct[:, i] if i is not None and matriz[:, i].any() else 0
+    tabela.columns.name = "Situação_categoria"
+    return tabela
+
+
+def rankings(contagens, limites=None, k=None, minimo=0):
+    """Rankings 1 a 3 a partir das contagens; com k, os rankings 2 e 3 seguem os grupos do 1."""
+    resumo1, ordem = tabela_adiantamento(contagens, limites, k, minimo)
+    selecao = None if k is None and not minimo else ordem
+    return (
+        resumo1,
+        tabela_situacao_viagem(contagens, selecao),
+        tabela_situacao_categoria(contagens, selecao),
+    )
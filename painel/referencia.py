@@ -0,0 +1,112 @@
+"""
+Dia de referência: resumo por dia e dias equivalentes de todas as datas.
+
+O BLOCO 9 compara o último dia com os dias equivalentes anteriores. Para
+escolher outro dia de referência sem refazer as contas, o resumo guarda as
+viagens de cada dia por faixa de meio minuto de adiantamento (uma matriz
+dias x faixas, painel.histograma) e, numa passada vetorizada por Tipo_Dia,
+a soma dos dias equivalentes de cada data (diferença de somas acumuladas
+dos dias do mesmo tipo que têm dados). Trocar o dia de referência vira
+ler duas linhas da matriz.
+
+Feriados (opcionais) contam como domingo: o dia de referência feriado é
+comparado com domingos e feriados anteriores, e os feriados saem da base dos
+dias úteis. O calendário é um arquivo texto com uma data por linha
+(AAAA-MM-DD ou DD/MM/AAAA; o que vier depois de ";" ou "," é ignorado, e
+linhas com "#" são comentários), indicado em PAINEL_FERIADOS.
+"""
+
+import os
+
+import numpy as np
+import pandas as pd
+
+from painel import analises, histograma, tratamento
+
+FERIADOS = os.environ.get("PAINEL_FERIADOS", "")
+
+# Tipo_Dia de um feriado
+TIPO_FERIADO = "Domingo"
+
+
+def ler_feriados(caminho=FERIADOS):
+    """Datas do calendário de feriados (vazio sem arquivo). Data inválida gera ValueError."""
+    if not caminho:
+        return pd.DatetimeIndex([])
+    datas = []
+    with open(caminho, encoding="utf-8") as f:
+        for n, linha in enumerate(f, start=1):
+            texto = linha.replace(",", ";").split(";")[0].strip()
+            if not texto or texto.startswith("#"):
+                continue
+            try:
+                datas.append(pd.to_datetime(texto, format="%d/%m/%Y" if "/" in texto else "%Y-%m-%d"))
+            except ValueError:
+                raise ValueError(f"Data inválida na linha {n} do calendário de feriados ({caminho}): {texto}")
+    return pd.DatetimeIndex(datas).unique().sort_values()
+
+
+def tipos_dos_dias(dias, feriados=()):
+    """Tipo_Dia de cada dia, com os feriados como domingo."""
+    tipos = np.asarray(tratamento.tipo_dia(dias), dtype=object)
+    if len(feriados):
+        tipos[pd.DatetimeIndex(dias).isin(pd.DatetimeIndex(feriados))] = TIPO_FERIADO
+    return tipos
+
+
+def base_equivalente(contagens_dias, tipos, n_dias=None):
+    """
+    Soma das linhas dos dias equivalentes de cada dia (mesmo tipo, anteriores,
+    com dados) e quantos dias entraram. Retorna (soma, n_equiv).
+    """
+    tem_dados = contagens_dias.sum(axis=1) > 0
+    soma = np.zeros_like(contagens_dias)
+    n_equiv = np.zeros(len(tipos), dtype=np.int64)
+    for tipo in pd.unique(tipos[tem_dados]):
+        k = np.flatnonzero((tipos == tipo) & tem_dados)
+        n = analises.quantos_dias_equivalentes(tipo, n_dias)
+        # acumulado[j] = soma dos j primeiros dias deste tipo
+        acumulado = np.cumsum(contagens_dias[k], axis=0)
+        acumulado = np.concatenate([np.zeros_like(acumulado[:1]), acumulado])
+        j = np.arange(len(k))
+        inicio = np.maximum(j - n, 0)
+        soma[k] = acumulado[j] - acumulado[inicio]
+        n_equiv[k] = j - inicio
+    return soma, n_equiv
+
+
+def montar_resumo(dias, contagens_dias, feriados=(), n_dias=None):
+    """
+    Resumo por dia: dias (DatetimeIndex), tipos, viagens por faixa de cada
+    dia e dos dias equivalentes de cada dia, só com os dias que têm dados.
+    """
+    tem_dados = contagens_dias.sum(axis=1) > 0
+    dias = pd.DatetimeIndex(dias)[tem_dados]
+    contagens_dias = contagens_dias[tem_dados]
+    tipos = tipos_dos_dias(dias, feriados)
+    base, n_equiv = base_equivalente(contagens_dias, tipos, n_dias)
+    return {"dias": dias, "tipos": tipos, "contagens": contagens_dias, "base": base, "n_equiv": n_equiv}
+
+
+def tabela_dias(resumo, limites):
+    """
+    Uma linha por dia (mais recente primeiro): viagens, dias equivalentes e,
+    para cada limite, % de adiantadas no dia e nos dias equivalentes.
+    """
+    total = resumo["contagens"].sum(axis=1)
+    total_base = resumo["base"].sum(axis=1)
+    acima = histograma.acima_de(resumo["contagens"], limites)
+    acima_base = histograma.acima_de(resumo["base"], limites)
+    tabela = pd.DataFrame({
+        "Data": resumo["dias"].strftime("%d/%m/%Y"),
+        "Tipo": resumo["tipos"],
+        "Total": total,
+        "Dias Equivalentes": resumo["n_equiv"],
+    })
+    # sem dias equivalentes, a % da base fica vazia
+    divisor_base = np.where(total_base > 0, total_base, np.nan)
+    for i, limite in enumerate(limites):
+        coluna = analises.coluna_pct(limite)
+        tabela[coluna] = acima[:, i] / total * 100
+        tabela[f"{coluna} (equiv.)"] = acima_base[:, i] / divisor_base * 100
+    return tabela.iloc[::-1].reset_index(drop=True)
@@ -0,0 +1,143 @@
+"""
+Registro das bases em memória, compartilhado por todas as sessões do app.
+
+Sessões que enviam a mesma exportação (mesmo hash do conteúdo, ver
+painel.cache_disco) usam os mesmos objetos: a base tratada, o cubo e o
+histograma são montados uma vez por processo e entregues por referência,
+sem a cópia que o st.cache_data faz para cada sessão. As sessões só leem
+esses objetos: com o copy-on-write do pandas, uma alteração vira cópia
+local e não chega às outras sessões.
+
+Cada item (chave da base, nome do item) tem o tamanho medido ao entrar.
+Passando do orçamento de memória, saem os itens usados há mais tempo (LRU),
+nunca o que acabou de entrar. Quem já está usando um item que saiu continua
+com ele até o fim da execução; o próximo pedido monta de novo (em geral do
+cache em disco).
+
+Configuração por variável de ambiente:
+- PAINEL_REGISTRO_MB : orçamento em MB (padrão 4096; 0 não guarda nada)
+"""
+
+import os
+import sys
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+ORCAMENTO_MB = int(os.environ.get("PAINEL_REGISTRO_MB", "4096"))
+
+
+def tamanho(valor):
+    """Memória aproximada (bytes) de DataFrames, arrays e das tuplas, listas e objetos que os guardam."""
+    if isinstance(valor, (pd.DataFrame, pd.Index)):
+        return int(np.sum(valor.memory_usage(deep=True)))
+    if isinstance(valor, pd.Series):
+        return int(valor.memory_usage(deep=True))
+    if isinstance(valor, np.ndarray):
+        return int(valor.nbytes)
+    if isinstance(valor, (tuple, list)):
+        return sum(tamanho(v) for v in valor)
+    if isinstance(valor, dict):
+        return sum(tamanho(v) for v in valor.values())
+    if hasattr(valor, "__dict__"):
+        return tamanho(vars(valor))
+    return sys.getsizeof(valor)
+
+
+class _Item:
+    __slots__ = ("valor", "bytes", "criado", "usado", "acessos")
+
+    def __init__(self, valor):
+        self.valor = valor
+        self.bytes = tamanho(valor)
+        self.criado = self.usado = time.time()
+        self.acessos = 1
+
+
+class Registro:
+    """Itens por (chave da base, nome), com orçamento de memória e LRU. Seguro entre threads."""
+
+    def __init__(self, orcamento_mb=ORCAMENTO_MB):
+        self.orcamento = orcamento_mb * 1024**2
+        self._itens = OrderedDict()
+        # soma de item.bytes, atualizada ao guardar e ao remover
+        self._ocupado = 0
+        self._trava = threading.Lock()
+        # uma trava por item em montagem: duas sessões com a mesma base montam uma vez só
+        self._montando = {}
+        self.removidos = 0
+
+    def obter(self, chave, nome, montar):
+        """Item (chave, nome); se não estiver no registro, montar() o cria."""
+        item = self._pegar((chave, nome))
+        if item is not None:
+            return item
+
+        with self._trava:
+            trava_item = self._montando.setdefault((chave, nome), threading.Lock())
+        with trava_item:
+            # outra sessão pode ter montado enquanto esta esperava
+            item = self._pegar((chave, nome))
+            if item is not None:
+                return item
+            try:
+                valor = montar()
+                self._guardar((chave, nome), _Item(valor))
+            finally:
+                with self._trava:
+                    self._montando.pop((chave, nome), None)
+            return valor
+
+    def _pegar(self, id_item):
+        with self._trava:
+            item = self._itens.get(id_item)
+            if item is None:
+                return None
+            self._itens.move_to_end(id_item)
+            item.usado = time.time()
+            item.acessos += 1
+            return item.valor
+
+    def _guardar(self, id_item, item):
+        with self._trava:
+            if item.bytes > self.orcamento:
+                return
+            anterior = self._itens.pop(id_item, None)
+            if anterior is not None:
+                self._ocupado -= anterior.bytes
+            self._itens[id_item] = item
+            self._ocupado += item.bytes
+            # os mais antigos saem primeiro; o que acabou de entrar (último) fica
+            while self._ocupado > self.orcamento and len(self._itens) > 1:
+                _, velho = self._itens.popitem(last=False)
+                self._ocupado -= velho.bytes
+                self.removidos += 1
+
+    def ocupado(self):
+        """Bytes dos itens no registro."""
+        return self._ocupado
+
+    def remover(self, chave):
+        """Tira do registro todos os itens de uma base."""
+        with self._trava:
+            for id_item in [i for i in self._itens if i[0] == chave]:
+                self._ocupado -= self._itens.pop(id_item).bytes
+
+    def resumo(self):
+        """Uma linha por item, do usado há mais tempo ao mais recente."""
+        with self._trava:
+            linhas = [
+                {
+                    "Base": chave,
+                    "Item": nome,
+                    "MB": item.bytes / 1024**2,
+                    "Acessos": item.acessos,
+                    "Montado em": pd.Timestamp.fromtimestamp(item.criado).floor("s"),
+                    "Último uso": pd.Timestamp.fromtimestamp(item.usado).floor("s"),
+                }
+                for (chave, nome), item in self._itens.items()
+            ]
+        return pd.DataFrame(linhas, columns=["Base", "Item", "MB", "Acessos", "Montado em", "Último uso"])
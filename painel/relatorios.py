@@ -0,0 +1,330 @@
+"""
+Motor do painel sem Streamlit: as mesmas contas das abas, para qualquer
+sistema e dia de referência.
+
+O app.py usa estas funções para carregar a base, separar o último dia, os
+dias equivalentes e a janela do ranking, e montar as tabelas de cada visão.
+A linha de comando (python -m painel) usa as mesmas funções para gerar os
+relatórios de todos os Sistema x dia de referência em lote, então os números
+batem com os da tela.
+"""
+
+import os
+
+import pandas as pd
+
+from painel import acervo, alertas, analises, cache_disco, carga, cubo, filtros, histograma, indice, ranking, referencia, tratamento
+
+# janela usada APENAS para ranking (últimos N dias)
+JANELA_RANK_DIAS = 7
+
+# tabelas de um relatório, na ordem das abas
+TABELAS = [
+    "adiantamento",
+    "situacao_viagem",
+    "situacao_categoria",
+    "ranking_adiantamento",
+    "ranking_situacao_viagem",
+    "ranking_situacao_categoria",
+]
+
+FORMATOS = ["parquet", "csv", "html"]
+
+
+def carregar_base(arquivos, processos=None, ao_concluir=None, chave=None):
+    """
+    Base tratada a partir dos arquivos (BLOCOS 2 a 7), passando pelo cache em
+    disco. Retorna (df, relatorio); relatorio["origem"] diz se veio do cache.
+    chave (cache_disco.chave_arquivos) evita ler os arquivos de novo para o
+    hash. Arquivo inválido ou coluna faltando geram ValueError.
+    """
+    chave = cache_disco.chave_arquivos(arquivos) if chave is None else chave
+    em_cache = cache_disco.ler(chave)
+    if em_cache is not None:
+        df, relatorio = em_cache
+        relatorio["origem"] = "cache em disco"
+        return df, relatorio
+
+    df, relatorio = carga.carregar_arquivos(arquivos, processos=processos, ao_concluir=ao_concluir)
+    df, relatorio["conversao_horarios"] = tratamento.tratar_base(df)
+
+    relatorio["chave"] = chave
+    cache_disco.gravar(chave, df, relatorio)
+    relatorio["origem"] = "arquivos enviados"
+    return df, relatorio
+
+
+def preparar_arquivo(arquivos, processos=None, ao_concluir=None):
+    """
+    Como carregar_base, mas devolve (caminho do Parquet no cache, relatorio)
+    em vez da base: para backends que consultam o arquivo sem carregá-lo
+    inteiro na memória (painel.consulta). Exige o cache em disco ligado.
+    """
+    chave = cache_disco.chave_arquivos(arquivos)
+    localizado = cache_disco.localizar(chave)
+    origem = "cache em disco"
+    if localizado is None:
+        carregar_base(arquivos, processos=processos, ao_concluir=ao_concluir)
+        localizado = cache_disco.localizar(chave)
+        origem = "arquivos enviados"
+    if localizado is None:
+        raise ValueError("Este backend consulta o Parquet do cache em disco: ligue o cache (PAINEL_CACHE_MB > 0).")
+
+    caminho, relatorio = localizado
+    relatorio["origem"] = origem
+    return caminho, relatorio
+
+
+def montar_cubo(df):
+    """Cubo de viagens e índice por data (uma vez por base)."""
+    cubo_base = cubo.montar_cubo(df)
+    return cubo_base, indice.IndiceDatas(cubo_base)
+
+
+def cubo_do_acervo(diretorio=acervo.DIRETORIO):
+    """Cubo de viagens e índice por data do acervo local (painel.acervo)."""
+    cubo_base = acervo.carregar_cubo(diretorio)
+    return cubo_base, indice.IndiceDatas(cubo_base)
+
+
+def montar_histograma(df):
+    """Histograma de Adiantamento_min (painel.histograma) e índice por data."""
+    hist = histograma.montar_histograma(df)
+    return hist, indice.IndiceDatas(hist)
+
+
+def histograma_do_acervo(diretorio=acervo.DIRETORIO):
+    """Histograma de Adiantamento_min e índice por data do acervo local."""
+    hist = acervo.carregar_histograma(diretorio)
+    return hist, indice.IndiceDatas(hist)
+
+
+def posicoes_filtro(cubo_base, sistema, empresas=None, linhas=None, faixas=None):
+    """
+    Posições do cubo para um sistema e filtros (BLOCO 8). None seleciona
+    todas as opções do sistema, como o padrão dos filtros da tela.
+    """
+    pos_sistema = filtros.filtrar(cubo_base, sistema=sistema)
+    selecao = {}
+    for nome, coluna, valores in [
+        ("empresas", "Empresa", empresas),
+        ("linhas", "Linha", linhas),
+        ("faixas", "Faixa_Horaria", faixas),
+    ]:
+        if valores is None and coluna in cubo_base.columns:
+            valores = filtros.opcoes(cubo_base, pos_sistema, coluna)
+        selecao[nome] = valores
+    return filtros.filtrar(cubo_base, posicoes=pos_sistema, **selecao)
+
+
+def separar_periodos(
+    cubo_base, indice_datas, posicoes, dia_referencia=None, janela=JANELA_RANK_DIAS, n_dias=None, feriados=()
+):
+    """
+    Último dia, dias equivalentes e janela do ranking (BLOCOS 9 e 10).
+
+    Com dia_referencia, só entram as datas até ele (o relatório fica como
+    se a base terminasse naquele dia). n_dias e feriados mudam os dias
+    equivalentes (painel.referencia). Gera ValueError se não houver datas.
+    """
+    if dia_referencia is not None:
+        k_fim = int(indice_datas.dias.searchsorted(pd.Timestamp(dia_referencia), side="right"))
+        posicoes = indice_datas.recortar(posicoes, 0, k_fim)
+
+    tipos = referencia.tipos_dos_dias(indice_datas.dias, feriados) if len(feriados) else None
+    ultimo_dia, tipo_dia_ult, pos_ultimo, pos_base_equiv = analises.separar_ultimo_dia(
+        cubo_base, indice_datas, posicoes, n_dias, tipos
+    )
+    return {
+        "ultimo_dia": ultimo_dia,
+        "tipo_dia": tipo_dia_ult,
+        "dias_equiv": list(indice_datas.dias[indice_datas.dias_com_dados(pos_base_equiv)]),
+        "pos_ultimo": pos_ultimo,
+        "pos_base_equiv": pos_base_equiv,
+        "pos_rank": analises.janela_ranking(indice_datas, posicoes, ultimo_dia, janela),
+    }
+
+
+def tabela_adiantamento(cubo_base, pos_base_equiv, pos_ultimo):
+    """Aba 1: viagens adiantadas acima de cada limite, último dia x dias equivalentes."""
+    linhas = []
+    for limite in cubo.LIMITES_ADIANTAMENTO:
+        qtd_dia, pct_dia, pct_base = analises.adiantamento_equiv(
+            cubo_base, pos_base_equiv, pos_ultimo, limite
+        )
+        linhas.append(linha_adiantamento(limite, qtd_dia, pct_dia, pct_base))
+    return pd.DataFrame(linhas)
+
+
+def linha_adiantamento(limite, qtd_dia, pct_dia, pct_base):
+    """Uma linha da tabela da aba 1 (também usada pelos backends de painel.consulta)."""
+    return {
+        "Limite (min)": limite,
+        "Qtd Último Dia": qtd_dia,
+        "% Último Dia": pct_dia,
+        "% Dias Equivalentes": pct_base,
+        "Desvio (p.p.)": pct_dia - pct_base,
+    }
+
+
+def tabela_limites(contagens_dia, contagens_base, limites):
+    """
+    Aba 1 para limites quaisquer, a partir das viagens por faixa de meio
+    minuto do último dia e dos dias equivalentes (painel.histograma).
+    """
+    acima_dia = histograma.acima_de(contagens_dia, limites)
+    acima_base = histograma.acima_de(contagens_base, limites)
+    linhas = []
+    for limite, qtd_dia, qtd_base in zip(limites, acima_dia, acima_base):
+        linhas.append(linha_adiantamento(limite, *analises.percentuais_adiantamento(
+            int(qtd_dia), int(contagens_dia.sum()), int(qtd_base), int(contagens_base.sum())
+        )))
+    return pd.DataFrame(linhas)
+
+
+def tabela_percentis(contagens_dia, contagens_base, percentis=histograma.PERCENTIS):
+    """Percentis do adiantamento das viagens adiantadas (> 0 min), último dia x dias equivalentes."""
+    return pd.DataFrame({
+        "Percentil": [f"p{p:g}" for p in percentis],
+        "Último Dia (min)": histograma.percentis(contagens_dia, percentis),
+        "Dias Equivalentes (min)": histograma.percentis(contagens_base, percentis),
+    })
+
+
+def rankings(cubo_base, pos_rank, granularidade="Empresa", limites=None, k=None, minimo=0, hist=None, pos_hist=None):
+    """
+    Rankings 1 a 3 na janela (aba 4), por empresa, linha ou empresa x linha
+    (ranking.GRANULARIDADES), numa passada só sobre o cubo.
+    """
+    contagens = ranking.contar(
+        cubo_base, pos_rank, ranking.GRANULARIDADES[granularidade], limites, hist, pos_hist
+    )
+    return ranking.rankings(contagens, limites, k, minimo)
+
+
+def tabela_alertas(
+    cubo_base, pos_ultimo, pos_base_equiv, limites=None, n=alertas.N_ALERTAS, minimo=alertas.MINIMO_VIAGENS,
+    hist=None, hist_ultimo=None, hist_base_equiv=None,
+):
+    """
+    Alertas: maiores desvios do último dia contra os dias equivalentes em
+    cada Empresa x Linha x Faixa_Horaria (painel.alertas).
+    """
+    colunas = [c for c in alertas.COLUNAS if c in cubo_base.columns]
+    contagens_dia, contagens_base = alertas.contar(
+        cubo_base, pos_ultimo, pos_base_equiv, colunas, limites, hist, hist_ultimo, hist_base_equiv
+    )
+    return alertas.maiores_desvios(contagens_dia, contagens_base, limites, n, minimo)
+
+
+def calcular_tabelas(cubo_base, periodos):
+    """Todas as TABELAS de um relatório (dicionário nome -> DataFrame)."""
+    pos_ultimo, pos_base_equiv = periodos["pos_ultimo"], periodos["pos_base_equiv"]
+    tabelas = {
+        "adiantamento": tabela_adiantamento(cubo_base, pos_base_equiv, pos_ultimo),
+        "situacao_viagem": analises.tabela_comparativa(
+            cubo_base, pos_ultimo, pos_base_equiv, "Situação_viagem"
+        ),
+        "situacao_categoria": analises.tabela_comparativa(
+            cubo_base, pos_ultimo, pos_base_equiv, "Situação_categoria"
+        ),
+    }
+    if "Empresa" in cubo_base.columns and len(periodos["pos_rank"]) > 0:
+        r1, r2, r3 = rankings(cubo_base, periodos["pos_rank"])
+    else:
+        r1 = r2 = r3 = pd.DataFrame()
+    tabelas["ranking_adiantamento"] = r1
+    tabelas["ranking_situacao_viagem"] = r2
+    tabelas["ranking_situacao_categoria"] = r3
+    return tabelas
+
+
+def gerar_lote(
+    cubo_base, indice_datas, sistemas=None, inicio=None, fim=None, janela=JANELA_RANK_DIAS, n_dias=None, feriados=()
+):
+    """
+    Relatórios de cada Sistema x dia de referência (dias com viagens do
+    sistema, entre inicio e fim). Gera (sistema, periodos, tabelas).
+    """
+    for sistema in sistemas or tratamento.SISTEMAS:
+        posicoes = posicoes_filtro(cubo_base, sistema)
+        for k in indice_datas.dias_com_dados(posicoes):
+            dia = indice_datas.dias[k]
+            if (inicio is not None and dia < pd.Timestamp(inicio)) or (
+                fim is not None and dia > pd.Timestamp(fim)
+            ):
+                continue
+            periodos = separar_periodos(cubo_base, indice_datas, posicoes, dia, janela, n_dias, feriados)
+            yield sistema, periodos, calcular_tabelas(cubo_base, periodos)
+
+
+def _nome_arquivo(texto):
+    return "".join(c if c.isalnum() or c in "-_" else "_" for c in str(texto))
+
+
+def _html_relatorio(sistema, periodos, tabelas):
+    titulo = f"{sistema} — {periodos['ultimo_dia']:%d/%m/%Y} ({periodos['tipo_dia']})"
+    partes = [f"<html><head><meta charset='utf-8'><title>{titulo}</title></head><body>", f"<h1>{titulo}</h1>"]
+    for nome in TABELAS:
+        partes.append(f"<h2>{nome}</h2>")
+        if tabelas[nome].empty:
+            partes.append("<p>Sem dados para exibir nesta tabela.</p>")
+        else:
+            partes.append(tabelas[nome].to_html(index=False, float_format=lambda v: f"{v:.2f}"))
+    partes.append("</body></html>")
+    return "\n".join(partes)
+
+
+def gravar_lote(lote, pasta, formato="parquet"):
+    """
+    Grava os relatórios gerados por gerar_lote em `pasta`.
+
+    parquet/csv: um arquivo por tabela, com Sistema e Dia_Referencia nas
+    primeiras colunas. html: uma página por Sistema x dia e um index.html.
+    Retorna a lista de arquivos gravados.
+    """
+    if formato not in FORMATOS:
+        raise ValueError(f"Formato '{formato}' não suportado. Use: {', '.join(FORMATOS)}.")
+    os.makedirs(pasta, exist_ok=True)
+
+    gravados = []
+    acumulado = {nome: [] for nome in TABELAS}
+    paginas = []
+
+    for sistema, periodos, tabelas in lote:
+        if formato == "html":
+            nome = f"{_nome_arquivo(sistema)}_{periodos['ultimo_dia']:%Y-%m-%d}.html"
+            with open(os.path.join(pasta, nome), "w", encoding="utf-8") as f:
+                f.write(_html_relatorio(sistema, periodos, tabelas))
+            paginas.append((sistema, periodos["ultimo_dia"], nome))
+            gravados.append(os.path.join(pasta, nome))
+            continue
+        for nome, tabela in tabelas.items():
+            if tabela.empty:
+                continue
+            tabela = tabela.copy()
+            tabela.columns = [str(c) for c in tabela.columns]
+            tabela.insert(0, "Dia_Referencia", periodos["ultimo_dia"])
+            tabela.insert(0, "Sistema", sistema)
+            acumulado[nome].append(tabela)
+
+    if formato == "html":
+        itens = "\n".join(
+            f"<li><a href='{nome}'>{sistema} — {dia:%d/%m/%Y}</a></li>" for sistema, dia, nome in paginas
+        )
+        caminho = os.path.join(pasta, "index.html")
+        with open(caminho, "w", encoding="utf-8") as f:
+            f.write(f"<html><head><meta charset='utf-8'></head><body><ul>\n{itens}\n</ul></body></html>")
+        return gravados + [caminho]
+
+    for nome, partes in acumulado.items():
+        if not partes:
+            continue
+        tabela = pd.concat(partes, ignore_index=True)
+        caminho = os.path.join(pasta, f"{nome}.{formato}")
+        if formato == "parquet":
+            tabela.to_parquet(caminho, index=False)
+        else:
+            tabela.to_csv(caminho, index=False)
+        gravados.append(caminho)
+    return gravados
@@ -0,0 +1,182 @@
+"""
+Gerador de exportações de viagens sintéticas, no mesmo formato dos arquivos
+enviados ao painel (colunas "Horário agendado", "Horário realizado",
+"Situação viagem", "Situação categoria", "Empresa" e "Linha", horários em
+texto dd/mm/aaaa hh:mm:ss).
+
+Serve para medir o painel em qualquer tamanho (benchmarks/) sem depender de
+dados reais. Quantidade de viagens, empresas, linhas, dias e a mistura de
+situações e categorias são configuráveis.
+
+Uso:
+    python -m painel.sintetico --linhas 1000000 --saida viagens.csv
+    python -m painel.sintetico --linhas 200000 --dias 60 --saida viagens.xlsx
+"""
+
+import argparse
+import os
+
+import numpy as np
+import pandas as pd
+
+# participação de cada Situação_viagem e o deslocamento típico do horário
+# realizado (minutos, Adiantamento_min = realizado - agendado, como no painel)
+MIX_SITUACAO = {
+    "Viagem concluída": 0.82,
+    "Viagem adiantada": 0.07,
+    "Viagem atrasada": 0.07,
+    "Viagem não realizada": 0.04,
+}
+DESLOCAMENTO_SITUACAO = {
+    "Viagem concluída": (0.0, 1.5),
+    "Viagem adiantada": (7.0, 4.0),
+    "Viagem atrasada": (-8.0, 5.0),
+    "Viagem não realizada": None,  # sem horário realizado
+}
+
+# participação de cada Situação_categoria (mesmas categorias do Ranking 3)
+MIX_CATEGORIA = {
+    "OK": 0.70, "ACI": 0.04, "AVL": 0.05, "CII": 0.02, "EXT": 0.01, "IAC": 0.03,
+    "IEP": 0.02, "MRI": 0.03, "QUE": 0.02, "SIS": 0.03, "TRI": 0.01, "VNR": 0.04,
+}
+
+# viagens por hora do dia (picos da manhã e do fim da tarde)
+PESO_HORA = np.array([
+    1, 1, 1, 1, 3, 8, 12, 12, 9, 6, 5, 5, 5, 5, 5, 6, 9, 12, 12, 8, 5, 4, 3, 2,
+], dtype=float)
+
+# viagens por dia da semana (segunda = 0); fim de semana tem menos oferta
+PESO_DIA_SEMANA = np.array([1.0, 1.0, 1.0, 1.0, 1.0, 0.6, 0.4])
+
+# limite de linhas de uma planilha .xlsx (sem o cabeçalho)
+LIMITE_XLSX = 1_048_575
+
+
+def _sortear(rng, mix, n):
+    """Códigos sorteados com as participações do dicionário (normalizadas)."""
+    pesos = np.array(list(mix.values()), dtype=float)
+    return rng.choice(len(pesos), size=n, p=pesos / pesos.sum())
+
+
+def _texto_horarios(segundos, inicio):
+    """
+    Segundos desde `inicio` -> texto dd/mm/aaaa hh:mm:ss (nulo onde NaN).
+    Formata só os valores distintos, como painel.tratamento faz na leitura.
+    """
+    validos = ~np.isnan(segundos)
+    unicos, inverso = np.unique(segundos[validos].astype(np.int64), return_inverse=True)
+    textos = (pd.Timestamp(inicio) + pd.to_timedelta(unicos, unit="s")).strftime("%d/%m/%Y %H:%M:%S")
+    resultado = np.full(len(segundos), None, dtype=object)
+    resultado[validos] = np.asarray(textos, dtype=object)[inverso]
+    return resultado
+
+
+def gerar_viagens(
+    linhas,
+    empresas=12,
+    empresas_aquaviario=1,
+    linhas_onibus=300,
+    dias=30,
+    inicio="2024-01-01",
+    mix_situacao=None,
+    mix_categoria=None,
+    semente=0,
+):
+    """
+    DataFrame de viagens sintéticas no formato da exportação.
+
+    Empresas com "VJB" no nome são do Aquaviário (regra do painel). Cada
+    linha de ônibus pertence a uma empresa. mix_situacao e mix_categoria
+    trocam as participações padrão (MIX_SITUACAO, MIX_CATEGORIA).
+    """
+    rng = np.random.default_rng(semente)
+    mix_situacao = mix_situacao or MIX_SITUACAO
+    mix_categoria = mix_categoria or MIX_CATEGORIA
+
+    nomes_empresas = [f"Viação {i + 1:02d}" for i in range(empresas)]
+    nomes_empresas += [f"VJB Aquaviário {i + 1}" for i in range(empresas_aquaviario)]
+    nomes_linhas = np.array([str(500 + i) for i in range(linhas_onibus)], dtype=object)
+    empresa_da_linha = rng.integers(0, len(nomes_empresas), linhas_onibus)
+
+    # dia (pesado pelo dia da semana), hora (pesada pelos picos) e minuto
+    datas = pd.date_range(inicio, periods=dias, freq="D")
+    peso_dia = PESO_DIA_SEMANA[datas.weekday]
+    dia = rng.choice(dias, size=linhas, p=peso_dia / peso_dia.sum())
+    hora = rng.choice(24, size=linhas, p=PESO_HORA / PESO_HORA.sum())
+    agendado = dia * 86400.0 + hora * 3600.0 + rng.integers(0, 60, linhas) * 60.0
+
+    situacao = _sortear(rng, mix_situacao, linhas)
+    realizado = np.full(linhas, np.nan)
+    for i, nome in enumerate(mix_situacao):
+        deslocamento = DESLOCAMENTO_SITUACAO.get(nome, (0.0, 1.5))
+        if deslocamento is None:
+            continue
+        sel = situacao == i
+        media, desvio = deslocamento
+        realizado[sel] = agendado[sel] + np.round(rng.normal(media, desvio, sel.sum()) * 60)
+
+    linha = rng.integers(0, linhas_onibus, linhas)
+
+    return pd.DataFrame({
+        "Horário agendado": _texto_horarios(agendado, inicio),
+        "Horário realizado": _texto_horarios(realizado, inicio),
+        "Situação viagem": np.array(list(mix_situacao), dtype=object)[situacao],
+        "Situação categoria": np.array(list(mix_categoria), dtype=object)[_sortear(rng, mix_categoria, linhas)],
+        "Empresa": np.array(nomes_empresas, dtype=object)[empresa_da_linha[linha]],
+        "Linha": nomes_linhas[linha],
+    })
+
+
+def gravar(df, caminho):
+    """Grava em .csv (separador ;, como a exportação) ou .xlsx, pela extensão."""
+    if caminho.lower().endswith(".csv"):
+        df.to_csv(caminho, sep=";", index=False, encoding="utf-8-sig")
+    elif caminho.lower().endswith(".xlsx"):
+        if len(df) > LIMITE_XLSX:
+            raise ValueError(f"Uma planilha .xlsx comporta no máximo {LIMITE_XLSX} viagens.")
+        from openpyxl import Workbook
+
+        # write_only grava linha a linha, sem montar a planilha na memória
+        livro = Workbook(write_only=True)
+        planilha = livro.create_sheet()
+        planilha.append(list(df.columns))
+        for registro in df.itertuples(index=False):
+            planilha.append(list(registro))
+        livro.save(caminho)
+    else:
+        raise ValueError("Formato não suportado. Use .csv ou .xlsx.")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m painel.sintetico",
+        description="Gera uma exportação de viagens sintética (.csv ou .xlsx).",
+    )
+    parser.add_argument("--linhas", type=int, default=100_000, help="quantidade de viagens")
+    parser.add_argument("--empresas", type=int, default=12)
+    parser.add_argument("--empresas-aquaviario", type=int, default=1)
+    parser.add_argument("--linhas-onibus", type=int, default=300)
+    parser.add_argument("--dias", type=int, default=30)
+    parser.add_argument("--inicio", default="2024-01-01", help="primeiro dia (AAAA-MM-DD)")
+    parser.add_argument("--semente", type=int, default=0)
+    parser.add_argument("--saida", required=True, help="arquivo .csv ou .xlsx")
+    args = parser.parse_args(argv)
+
+    df = gerar_viagens(
+        args.linhas,
+        empresas=args.empresas,
+        empresas_aquaviario=args.empresas_aquaviario,
+        linhas_onibus=args.linhas_onibus,
+        dias=args.dias,
+        inicio=args.inicio,
+        semente=args.semente,
+    )
+    try:
+        gravar(df, args.saida)
+    except ValueError as erro:
+        parser.exit(1, f"erro: {erro}\n")
+    print(f"{len(df)} viagens gravadas em {args.saida} ({os.path.getsize(args.saida) / 1024**2:.1f} MB)")
+
+
+if __name__ == "__main__":
+    main()
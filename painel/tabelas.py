@@ -0,0 +1,159 @@
+"""
+Tabelas em semáforo (gradiente em vermelho) sem formatar célula a célula.
+
+O tabela_semáforo do app formatava cada célula com formato_br_num e pintava
+as colunas de percentual com Styler.background_gradient (matplotlib). Aqui
+a formatação PT-BR e as cores saem de operações sobre as colunas inteiras
+(NumPy), com o mesmo resultado: mesma escala "Reds" do matplotlib,
+normalizada pelo mínimo e máximo de cada coluna, e o mesmo critério de
+texto claro sobre fundo escuro. O app só monta o Styler da página que vai
+mostrar.
+"""
+
+import numpy as np
+import pandas as pd
+
+# tabelas maiores que isso são mostradas em páginas
+LINHAS_POR_PAGINA = 100
+
+# cores da escala "Reds" do matplotlib (ColorBrewer), igualmente espaçadas
+_REDS = np.array([
+    (1.0, 0.9607843137254902, 0.9411764705882353),
+    (0.996078431372549, 0.8784313725490196, 0.8235294117647058),
+    (0.9882352941176471, 0.7333333333333333, 0.6313725490196078),
+    (0.9882352941176471, 0.5725490196078431, 0.4470588235294118),
+    (0.984313725490196, 0.41568627450980394, 0.2901960784313726),
+    (0.9372549019607843, 0.23137254901960785, 0.17254901960784313),
+    (0.796078431372549, 0.09411764705882353, 0.11372549019607843),
+    (0.6470588235294118, 0.058823529411764705, 0.08235294117647057),
+    (0.403921568627451, 0.0, 0.05098039215686274),
+])
+
+# tamanho da tabela de cores do matplotlib e limiar de texto claro do pandas
+_N_CORES = 256
+_LIMIAR_LUMINANCIA = 0.408
+
+
+def _tabela_cores(ancoras, n):
+    """Interpolação linear das âncoras em n cores (como LinearSegmentedColormap)."""
+    x = np.linspace(0, 1, len(ancoras)) * (n - 1)
+    xind = (n - 1) * np.linspace(0, 1, n)
+    ind = np.searchsorted(x, xind)[1:-1]
+    distancia = (xind[1:-1] - x[ind - 1]) / (x[ind] - x[ind - 1])
+    tabela = np.concatenate([
+        ancoras[:1],
+        distancia[:, None] * (ancoras[ind] - ancoras[ind - 1]) + ancoras[ind - 1],
+        ancoras[-1:],
+    ])
+    return np.clip(tabela, 0.0, 1.0)
+
+
+def _luminancia(rgb):
+    """Luminância relativa (W3C) de cada cor."""
+    linear = np.where(rgb <= 0.04045, rgb / 12.92, ((rgb + 0.055) / 1.055) ** 2.4)
+    return linear @ np.array([0.2126, 0.7152, 0.0722])
+
+
+def _hex(rgb):
+    inteiros = np.round(rgb * 255).astype(int)
+    return np.array([f"#{r:02x}{g:02x}{b:02x}" for r, g, b in inteiros], dtype=object)
+
+
+# CSS de cada uma das 256 cores e da cor de "sem valor" (preta, como no matplotlib)
+_CORES = _tabela_cores(_REDS, _N_CORES)
+_CSS = np.append(
+    [
+        f"background-color: {fundo};color: {'#f1f1f1' if escuro else '#000000'};"
+        for fundo, escuro in zip(_hex(_CORES), _luminancia(_CORES) < _LIMIAR_LUMINANCIA)
+    ],
+    "background-color: #000000;color: #f1f1f1;",
+).astype(object)
+
+
+def estilos_gradiente(valores):
+    """
+    CSS de fundo e texto de cada valor de uma coluna, normalizada entre o
+    mínimo e o máximo dela (Styler.background_gradient(cmap="Reds")).
+    """
+    v = np.asarray(valores, dtype=float)
+    validos = ~np.isnan(v)
+    if not validos.any():
+        return _CSS[np.full(len(v), _N_CORES)]
+    minimo, maximo = v[validos].min(), v[validos].max()
+    if minimo == maximo:
+        # como o Normalize do matplotlib: tudo na primeira cor, até os nulos
+        return _CSS[np.zeros(len(v), dtype=np.int64)]
+    posicao = (v - minimo) / (maximo - minimo)
+    with np.errstate(invalid="ignore"):
+        indice = np.minimum(posicao * _N_CORES, _N_CORES - 1).astype(np.int64)
+    indice[~validos] = _N_CORES
+    return _CSS[indice]
+
+
+def _formatar_um(v, casas):
+    # caminho lento (formato_br_num), só para os poucos valores em que o
+    # arredondamento vetorizado poderia divergir do format do Python
+    s = f"{v:,.{casas}f}"
+    return s.replace(",", "X").replace(".", ",").replace("X", ".")
+
+
+def formatar_numeros(valores, casas=0, sufixo=""):
+    """
+    Números no padrão PT-BR (1.234,56), como formato_br_num, para uma
+    coluna inteira de uma vez. Nulos viram texto vazio.
+    """
+    v = np.asarray(valores, dtype=float)
+    nulos = np.isnan(v)
+    escala = 10 ** casas
+    escalado = np.abs(np.where(nulos, 0.0, v)) * escala
+    unidades = np.rint(escalado)
+    # empates exatos (x,5 depois de multiplicar), infinitos e números enormes
+    # vão pelo format do Python, que arredonda sobre o valor exato
+    lentos = ~nulos & (~np.isfinite(escalado) | (escalado >= 2**53) | (np.abs(escalado - np.trunc(escalado)) == 0.5))
+    unidades[lentos] = 0
+
+    unidades = unidades.astype(np.int64)
+    inteiros, fracoes = np.divmod(unidades, escala)
+
+    # milhares: grupos de 3 dígitos da direita para a esquerda
+    texto = np.where(inteiros >= 1000, np.char.zfill((inteiros % 1000).astype(str), 3), (inteiros % 1000).astype(str))
+    resto = inteiros // 1000
+    while (resto > 0).any():
+        grupo = np.where(resto >= 1000, np.char.zfill((resto % 1000).astype(str), 3), (resto % 1000).astype(str))
+        texto = np.where(resto > 0, np.char.add(np.char.add(grupo, "."), texto), texto)
+        resto //= 1000
+
+    if casas > 0:
+        texto = np.char.add(np.char.add(texto, ","), np.char.zfill(fracoes.astype(str), casas))
+    texto = np.where(np.signbit(v) & ~nulos, np.char.add("-", texto), texto)
+    if sufixo:
+        texto = np.char.add(texto, sufixo)
+
+    resultado = texto.astype(object)
+    resultado[nulos] = ""
+    for i in np.flatnonzero(lentos):
+        resultado[i] = _formatar_um(v[i], casas) + sufixo
+    return resultado
+
+
+def tabela_semaforo(df_tab, colunas_pct, colunas_milhar=("Total",)):
+    """
+    Retorna (texto, estilos) para mostrar df_tab em semáforo: `texto` é a
+    tabela com os percentuais ("12,34 %") e os totais ("1.234") já
+    formatados; `estilos` tem o CSS de cada célula (vazio fora de
+    colunas_pct), para Styler.apply(..., axis=None).
+    """
+    texto = df_tab.copy()
+    estilos = pd.DataFrame("", index=df_tab.index, columns=df_tab.columns, dtype=object)
+    for c in colunas_pct:
+        texto[c] = formatar_numeros(df_tab[c].to_numpy(dtype=float, na_value=np.nan), casas=2, sufixo=" %")
+        estilos[c] = estilos_gradiente(df_tab[c].to_numpy(dtype=float, na_value=np.nan))
+    for c in colunas_milhar:
+        if c in df_tab.columns:
+            texto[c] = formatar_numeros(df_tab[c].to_numpy(dtype=float, na_value=np.nan), casas=0)
+    return texto, estilos
+
+
+def paginas(n_linhas, tamanho=LINHAS_POR_PAGINA):
+    """Quantidade de páginas de uma tabela com n_linhas."""
+    return max(1, -(-n_linhas // tamanho))
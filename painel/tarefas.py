@@ -0,0 +1,142 @@
+"""
+Cálculos do painel em segundo plano, com cancelamento dos estados velhos.
+
+Cada sessão do app tem, por canal ("base", "resumo", "abas"), uma tarefa: a
+lista de etapas de um estado (base, filtros, dia...). As etapas rodam em
+ordem numa thread do pool, e o resultado de cada uma fica disponível assim
+que ela termina, para a tela mostrar o que já está pronto. Um estado novo no
+mesmo canal (outro clique nos filtros) cancela a tarefa anterior: a que
+ainda não começou nem roda, e a que está rodando para na próxima etapa (ou
+antes, se a etapa chamar tarefa.verificar()).
+
+Configuração por variável de ambiente:
+- PAINEL_TRABALHADORES : threads do pool (padrão 4; 0 roda as etapas na
+  própria execução do script, sem segundo plano)
+- PAINEL_RESULTADOS_MB : memória dos resultados das etapas guardados para
+  reuso (padrão 512), ver painel.registro
+"""
+
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+TRABALHADORES = int(os.environ.get("PAINEL_TRABALHADORES", "4"))
+RESULTADOS_MB = int(os.environ.get("PAINEL_RESULTADOS_MB", "512"))
+
+# tarefas guardadas (sessão x canal); as mais antigas saem primeiro
+MAX_TAREFAS = 256
+
+
+class Cancelada(Exception):
+    """A tarefa foi substituída por um estado mais novo."""
+
+
+class Tarefa:
+    """
+    Etapas (nome, função) de um estado. Cada função recebe a tarefa e pode
+    ler os resultados das anteriores em tarefa.resultados.
+    """
+
+    def __init__(self, estado, etapas):
+        self.estado = estado
+        self.etapas = list(etapas)
+        self.resultados = {}
+        self.erros = {}
+        self.etapa_atual = None
+        self.texto = ""
+        self.fracao_etapa = 0.0
+        self._cancelada = threading.Event()
+        self._terminou = threading.Event()
+        self.futuro = None
+
+    @property
+    def cancelada(self):
+        return self._cancelada.is_set()
+
+    @property
+    def terminou(self):
+        return self._terminou.is_set()
+
+    def cancelar(self):
+        self._cancelada.set()
+        if self.futuro is not None and self.futuro.cancel():
+            self._terminou.set()
+
+    def verificar(self):
+        """Para a etapa em andamento se a tarefa foi cancelada."""
+        if self.cancelada:
+            raise Cancelada()
+
+    def informar(self, fracao, texto=""):
+        """Andamento dentro da etapa atual (0 a 1), para a barra de progresso."""
+        self.fracao_etapa, self.texto = fracao, texto
+        self.verificar()
+
+    def rodar(self):
+        try:
+            for nome, funcao in self.etapas:
+                if self.cancelada:
+                    return
+                self.etapa_atual, self.fracao_etapa, self.texto = nome, 0.0, ""
+                try:
+                    self.resultados[nome] = funcao(self)
+                except Cancelada:
+                    return
+                except Exception as erro:
+                    # guardado para a tela; as etapas seguintes podem não depender desta
+                    self.erros[nome] = erro
+        finally:
+            self.etapa_atual = None
+            self._terminou.set()
+
+    def resolvidas(self, nomes):
+        """Se as etapas já terminaram (com resultado ou erro)."""
+        return all(n in self.resultados or n in self.erros for n in nomes) or self.terminou
+
+    def resultado(self, nome):
+        """Resultado da etapa; o erro dela, se houve, é levantado de novo."""
+        if nome in self.erros:
+            raise self.erros[nome]
+        return self.resultados[nome]
+
+    def fracao(self):
+        """Fração das etapas concluídas (contando o andamento da atual)."""
+        if not self.etapas:
+            return 1.0
+        feitas = len(self.resultados) + len(self.erros)
+        atual = self.fracao_etapa if self.etapa_atual is not None else 0.0
+        return min(1.0, (feitas + atual) / len(self.etapas))
+
+
+class Fila:
+    """Pool de threads com a tarefa atual de cada sessão e canal."""
+
+    def __init__(self, trabalhadores=TRABALHADORES):
+        self.trabalhadores = trabalhadores
+        self._pool = ThreadPoolExecutor(trabalhadores, thread_name_prefix="painel") if trabalhadores > 0 else None
+        self._tarefas = OrderedDict()
+        self._trava = threading.Lock()
+
+    def submeter(self, sessao, canal, estado, etapas):
+        """
+        Tarefa do estado para a sessão e o canal. Mesmo estado devolve a
+        tarefa que já existe; outro estado cancela a anterior.
+        """
+        with self._trava:
+            anterior = self._tarefas.get((sessao, canal))
+            if anterior is not None and anterior.estado == estado and not anterior.cancelada:
+                self._tarefas.move_to_end((sessao, canal))
+                return anterior
+            if anterior is not None:
+                anterior.cancelar()
+            tarefa = Tarefa(estado, etapas)
+            self._tarefas[(sessao, canal)] = tarefa
+            while len(self._tarefas) > MAX_TAREFAS:
+                _, velha = self._tarefas.popitem(last=False)
+                velha.cancelar()
+            if self._pool is not None:
+                tarefa.futuro = self._pool.submit(tarefa.rodar)
+        if self._pool is None:
+            tarefa.rodar()
+        return tarefa
@@ -0,0 +1,87 @@
+"""
+Tendência diária: % de adiantadas e distribuição das situações dia a dia,
+no período inteiro carregado, por sistema (todas as empresas juntas) ou por
+empresa.
+
+Cada série sai de uma única contagem agrupada (np.bincount) sobre o código
+do dia (posição no índice por data, painel.indice), o código do grupo e o
+código da faixa ou da situação: uma passada sobre as linhas selecionadas
+do cubo ou do histograma, sem laço por dia. As funções de tabela recebem
+só as contagens (dias x grupos x valores), então o backend duckdb
+(painel.consulta) usa as mesmas.
+"""
+
+import numpy as np
+import pandas as pd
+
+from painel import analises, histograma
+
+# rótulo do grupo quando as empresas vão juntas
+TODAS = "Todas as empresas"
+
+
+def _codigos(tabela, coluna, posicoes):
+    """Códigos (int64, -1 = nulo) e valores de uma coluna categórica nas posições."""
+    serie = tabela[coluna]
+    return serie.cat.codes.to_numpy()[posicoes].astype(np.int64), serie.cat.categories
+
+
+def contar_por_dia(tabela, indice, posicoes, coluna_grupo, coluna_valor):
+    """
+    Contagens dias x grupos x valores (soma de Qtd) numa passada.
+
+    coluna_grupo=None junta tudo num grupo só; coluna_valor="Faixa_Minuto"
+    usa as faixas do histograma. Linhas sem data, sem grupo ou sem valor
+    ficam de fora. Retorna (dias, grupos, valores, contagens).
+    """
+    k = np.searchsorted(indice.inicio[:-1], posicoes, side="right") - 1
+    if coluna_grupo is None:
+        grupo, grupos = np.zeros(len(posicoes), dtype=np.int64), pd.Index([TODAS])
+    else:
+        grupo, grupos = _codigos(tabela, coluna_grupo, posicoes)
+    if coluna_valor == "Faixa_Minuto":
+        valor = tabela[coluna_valor].to_numpy()[posicoes].astype(np.int64)
+        valores = pd.RangeIndex(histograma.N_FAIXAS)
+    else:
+        valor, valores = _codigos(tabela, coluna_valor, posicoes)
+
+    validos = (k >= 0) & (grupo >= 0) & (valor >= 0)
+    forma = (len(indice.dias), len(grupos), len(valores))
+    contagens = np.bincount(
+        np.ravel_multi_index((k[validos], grupo[validos], valor[validos]), forma),
+        weights=tabela["Qtd"].to_numpy()[posicoes][validos],
+        minlength=int(np.prod(forma)),
+    ).astype(np.int64).reshape(forma)
+    return indice.dias, grupos, valores, contagens
+
+
+def _longa(dias, grupos, nomes, percentuais, totais, coluna_nome):
+    """Tabela longa (Data, Grupo, coluna_nome, %, Total) só com dia x grupo que têm viagens."""
+    d, g, n = np.meshgrid(np.arange(len(dias)), np.arange(len(grupos)), np.arange(len(nomes)), indexing="ij")
+    tabela = pd.DataFrame({
+        "Data": pd.DatetimeIndex(dias)[d.ravel()],
+        "Grupo": np.asarray(grupos, dtype=object)[g.ravel()],
+        coluna_nome: np.asarray(nomes, dtype=object)[n.ravel()],
+        "%": percentuais.ravel(),
+        "Total": np.repeat(totais.ravel(), len(nomes)),
+    })
+    return tabela[tabela["Total"] > 0].reset_index(drop=True)
+
+
+def serie_adiantamento(dias, grupos, contagens_faixas, limites):
+    """% de viagens adiantadas acima de cada limite, por dia e grupo."""
+    total = contagens_faixas.sum(axis=-1)
+    acima = histograma.acima_de(contagens_faixas, limites)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        percentuais = acima / total[..., None] * 100
+    return _longa(dias, grupos, [analises.coluna_pct(lim) for lim in limites], percentuais, total, "Indicador")
+
+
+def serie_distribuicao(dias, grupos, valores, contagens, coluna):
+    """% de cada valor de `coluna` (entre as viagens com ela preenchida), por dia e grupo."""
+    presentes = contagens.sum(axis=(0, 1)) > 0
+    valores, contagens = np.asarray(valores, dtype=object)[presentes], contagens[..., presentes]
+    total = contagens.sum(axis=-1)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        percentuais = contagens / total[..., None] * 100
+    return _longa(dias, grupos, valores, percentuais, total, coluna)
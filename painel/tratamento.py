@@ -0,0 +1,219 @@
+"""
+Tratamento das colunas da base de viagens (BLOCOS 5 a 7 do painel).
+
+Converte os horários, cria Data_Agendada, Tipo_Dia, Sistema, Hora_Agendada,
+Faixa_Horaria, Adiantamento_min e as marcações Adianta_3/5/10.
+
+As colunas derivadas são calculadas de forma vetorizada: dia da semana e
+hora viram códigos que indexam tabelas de rótulos (categorias), sem chamar
+uma função Python por viagem. As tabelas são geradas pelas próprias funções
+classificar_tipo_dia e rotulo_faixa, então o resultado é o mesmo do
+cálculo linha a linha.
+
+Os horários são convertidos com formato explícito, descoberto uma vez a
+partir de uma amostra, e só os textos distintos são convertidos (horários
+agendados se repetem muito). O número de valores que não viraram data é
+devolvido para aparecer no painel.
+"""
+
+import warnings
+
+import numpy as np
+import pandas as pd
+from pandas.tseries.api import guess_datetime_format
+
+COLUNAS_NECESSARIAS = [
+    "Horário_agendado",
+    "Horário_realizado",
+    "Situação_viagem",
+    "Situação_categoria",
+    "Empresa"
+]
+
+
+def classificar_tipo_dia(ts):
+    if pd.isna(ts):
+        return "Desconhecido"
+    wd = ts.weekday()
+    if wd <= 4:
+        return "Dia útil"
+    elif wd == 5:
+        return "Sábado"
+    else:
+        return "Domingo"
+
+
+def rotulo_faixa(h):
+    """Rótulo da faixa horária de uma hora (0 a 23)."""
+    return f"{int(h):02d}:00–{int(h):02d}:59" if pd.notnull(h) else "Sem horário"
+
+
+# tabelas de rótulos indexadas pelo código (dia da semana / hora; último = sem data)
+_SEGUNDA = pd.Timestamp("2024-01-01")
+TIPOS_DIA = list(dict.fromkeys(
+    [classificar_tipo_dia(_SEGUNDA + pd.Timedelta(days=d)) for d in range(7)]
+    + [classificar_tipo_dia(pd.NaT)]
+))
+_TIPO_POR_DIA_SEMANA = np.array(
+    [TIPOS_DIA.index(classificar_tipo_dia(_SEGUNDA + pd.Timedelta(days=d))) for d in range(7)]
+    + [TIPOS_DIA.index(classificar_tipo_dia(pd.NaT))],
+    dtype=np.int8,
+)
+
+FAIXAS_HORARIAS = [rotulo_faixa(h) for h in range(24)] + [rotulo_faixa(None)]
+
+SISTEMAS = ["Aquaviário", "Transcol"]
+
+COLUNAS_HORARIO = ["Horário_agendado", "Horário_realizado"]
+
+# textos distintos usados para descobrir o formato dos horários
+TAMANHO_AMOSTRA = 1000
+_CANDIDATOS_FORMATO = 20
+
+
+def _codigos(valores_float, n_validos):
+    """Converte um array float (NaN = ausente) em códigos int8, com ausente = n_validos."""
+    return np.where(np.isnan(valores_float), n_validos, valores_float).astype(np.int8)
+
+
+def tipo_dia(datas):
+    """Tipo_Dia (categoria) de uma coluna de datas, pelo dia da semana."""
+    dia_semana = pd.Series(datas).dt.weekday.to_numpy(dtype=float, na_value=np.nan)
+    return pd.Categorical.from_codes(
+        _TIPO_POR_DIA_SEMANA[_codigos(dia_semana, 7)], categories=TIPOS_DIA
+    )
+
+
+def faixa_horaria(horas):
+    """Faixa_Horaria (categoria) de uma coluna de horas (0 a 23, nulo = sem horário)."""
+    hora = pd.array(horas, dtype="Float64").to_numpy(dtype=float, na_value=np.nan)
+    return pd.Categorical.from_codes(_codigos(hora, 24), categories=FAIXAS_HORARIAS)
+
+
+def verificar_colunas(df):
+    """Gera ValueError se faltar alguma coluna obrigatória."""
+    for c in COLUNAS_NECESSARIAS:
+        if c not in df.columns:
+            raise ValueError(f"A coluna obrigatória '{c}' não existe na base!")
+
+
+def detectar_formato(textos):
+    """
+    Descobre o formato (strftime) dos horários a partir de uma amostra.
+
+    Os candidatos vêm de guess_datetime_format (mês primeiro e dia
+    primeiro); fica o que converte mais valores da amostra. No empate vale
+    o de mês primeiro, que é o que o pd.to_datetime sem formato usaria.
+    Retorna None se nenhum formato for reconhecido.
+    """
+    amostra = pd.Index([t for t in textos if isinstance(t, str)], dtype=object)
+    if len(amostra) == 0:
+        return None
+
+    candidatos = []
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        for texto in amostra[:_CANDIDATOS_FORMATO]:
+            for dia_primeiro in (False, True):
+                formato = guess_datetime_format(texto.strip(), dayfirst=dia_primeiro)
+                if formato and formato not in candidatos:
+                    candidatos.append(formato)
+
+    melhor, melhor_qtd = None, 0
+    for formato in candidatos:
+        qtd = pd.to_datetime(amostra, format=formato, errors="coerce").notna().sum()
+        if qtd > melhor_qtd:
+            melhor, melhor_qtd = formato, qtd
+    return melhor
+
+
+def converter_horarios(serie):
+    """
+    Converte uma coluna de horários para datetime.
+
+    Retorna (Series datetime, formato usado, quantidade de valores não
+    nulos que não puderam ser convertidos e viraram NaT).
+    """
+    if pd.api.types.is_datetime64_any_dtype(serie):
+        return serie, None, 0
+
+    codigos, unicos = pd.factorize(serie)
+    unicos = pd.Index(unicos, dtype=object)
+
+    passo = max(len(unicos) // TAMANHO_AMOSTRA, 1)
+    formato = detectar_formato(unicos[::passo][:TAMANHO_AMOSTRA])
+    if formato is not None:
+        convertidos = pd.to_datetime(unicos, format=formato, errors="coerce")
+    else:
+        convertidos = pd.to_datetime(unicos, errors="coerce")
+
+    # cada texto distinto foi convertido uma vez; agora espalha pelos códigos
+    resultado = pd.DatetimeIndex(convertidos).take(codigos, allow_fill=True, fill_value=pd.NaT)
+
+    frequencia = np.bincount(codigos[codigos >= 0], minlength=len(unicos))
+    falhas = int(frequencia[np.asarray(pd.isna(convertidos))].sum())
+
+    return pd.Series(resultado, index=serie.index, name=serie.name), formato, falhas
+
+
+def tratar_base(df):
+    """
+    Aplica os BLOCOS 5 a 7 sobre a base carregada (altera o próprio df).
+
+    Retorna (df, conversão), onde conversão traz, por coluna de horário, o
+    formato detectado e quantos valores não puderam ser convertidos.
+    """
+    verificar_colunas(df)
+
+    # --- BLOCO 5 — colunas básicas ---
+
+    # Horário_agendado e Horário_realizado como datetime
+    conversao = {}
+    for c in COLUNAS_HORARIO:
+        df[c], formato, falhas = converter_horarios(df[c])
+        conversao[c] = {"formato": formato, "falhas": falhas}
+
+    # Data_Agendada como datetime normalizado (meia-noite)
+    df["Data_Agendada"] = df["Horário_agendado"].dt.normalize()
+
+    enriquecer(df)
+    return df, conversao
+
+
+def enriquecer(df):
+    """
+    Cria Tipo_Dia, Sistema, Hora_Agendada, Faixa_Horaria, Adiantamento_min e
+    Adianta_3/5/10 a partir dos horários já convertidos (vetorizado).
+    """
+    # Tipo de dia: dia da semana -> código -> rótulo
+    df["Tipo_Dia"] = tipo_dia(df["Data_Agendada"])
+
+    # CRIAÇÃO DO CAMPO SISTEMA (Transcol x Aquaviário): avaliado uma vez por empresa
+    empresa = df["Empresa"].astype("category")
+    aquaviario = empresa.cat.categories.astype(str).str.contains("VJB", case=False)
+    cod_empresa = empresa.cat.codes.to_numpy()
+    e_aquaviario = np.append(aquaviario, False)[cod_empresa]
+    df["Sistema"] = pd.Categorical.from_codes(
+        np.where(e_aquaviario, 0, 1).astype(np.int8), categories=SISTEMAS
+    )
+
+    # --- BLOCO 6 — faixa horária ---
+
+    hora = df["Horário_agendado"].dt.hour.to_numpy(dtype=float, na_value=np.nan)
+    sem_hora = np.isnan(hora)
+    df["Hora_Agendada"] = pd.arrays.IntegerArray(
+        np.where(sem_hora, 0, hora).astype(np.int8), sem_hora
+    )
+    df["Faixa_Horaria"] = faixa_horaria(hora)
+
+    # --- BLOCO 7 — adiantamento ---
+
+    df["Adiantamento_min"] = (
+        df["Horário_realizado"] - df["Horário_agendado"]
+    ).dt.total_seconds() / 60
+
+    df["Adianta_3"] = df["Adiantamento_min"] > 3
+    df["Adianta_5"] = df["Adiantamento_min"] > 5
+    df["Adianta_10"] = df["Adiantamento_min"] > 10
+
+    return df
@@ -0,0 +1,69 @@
+"""Acervo local (painel.acervo): lote interrompido no meio e repetido."""
+
+import pandas as pd
+import pytest
+
+from painel import acervo, carga, sintetico
+
+
+def _exportacao(pasta, nome, linhas, semente):
+    caminho = str(pasta / nome)
+    sintetico.gravar(sintetico.gerar_viagens(linhas, dias=6, semente=semente), caminho)
+    return caminho
+
+
+def _cubo_ordenado(diretorio):
+    c = acervo.carregar_cubo(diretorio)
+    colunas = [x for x in c.columns if x != "Qtd"]
+    c[colunas] = c[colunas].astype(str)
+    return c.sort_values(colunas).reset_index(drop=True)
+
+
+def test_lote_interrompido_e_repetido(tmp_path, monkeypatch):
+    caminho = _exportacao(tmp_path, "viagens.csv", 3000, semente=1)
+    inteiro = str(tmp_path / "inteiro")
+    acervo.adicionar([carga.abrir_arquivo(caminho)], inteiro, processos=1)
+
+    interrompido = str(tmp_path / "interrompido")
+    gravar_dia = acervo._gravar_dia
+    gravados = []
+
+    def falhar_no_terceiro(diretorio, dia, novas):
+        if len(gravados) == 2:
+            raise OSError("processo interrompido")
+        gravados.append(dia)
+        return gravar_dia(diretorio, dia, novas)
+
+    monkeypatch.setattr(acervo, "_gravar_dia", falhar_no_terceiro)
+    with pytest.raises(OSError):
+        acervo.adicionar([carga.abrir_arquivo(caminho)], interrompido, processos=1)
+    monkeypatch.undo()
+
+    parcial = acervo.ler_manifesto(interrompido)
+    assert sorted(parcial["dias"]) == gravados
+    assert parcial["revisao"] == 2
+    assert not parcial["arquivos"]
+
+    relatorio = acervo.adicionar([carga.abrir_arquivo(caminho)], interrompido, processos=1)
+    assert relatorio["linhas_novas"] + relatorio["linhas_repetidas"] == relatorio["linhas_lidas"]
+    assert acervo.resumo(interrompido)["linhas"] == acervo.resumo(inteiro)["linhas"]
+    assert acervo.ler_manifesto(interrompido)["dias"] == acervo.ler_manifesto(inteiro)["dias"]
+    pd.testing.assert_frame_equal(_cubo_ordenado(interrompido), _cubo_ordenado(inteiro))
+
+
+def test_dia_gravado_sem_manifesto_e_refeito(tmp_path, monkeypatch):
+    caminho = _exportacao(tmp_path, "viagens.csv", 2000, semente=2)
+    diretorio = str(tmp_path / "acervo")
+    chave_antes = acervo.chave(diretorio)
+
+    # o lote grava as viagens de todos os dias e cai antes do manifesto
+    monkeypatch.setattr(acervo, "_gravar_manifesto", lambda manifesto, diretorio: None)
+    acervo.adicionar([carga.abrir_arquivo(caminho)], diretorio, processos=1)
+    monkeypatch.undo()
+    assert acervo.chave(diretorio) == chave_antes
+
+    relatorio = acervo.adicionar([carga.abrir_arquivo(caminho)], diretorio, processos=1)
+    assert relatorio["linhas_novas"] == 0
+    assert relatorio["dias_alterados"]
+    assert acervo.chave(diretorio) != chave_antes
+    assert acervo.resumo(diretorio)["linhas"] == relatorio["linhas_lidas"]
@@ -0,0 +1,71 @@
+"""Cache em disco (painel.cache_disco): gravação, leitura e limpeza por LRU."""
+
+import json
+import os
+
+import pandas as pd
+
+from painel import cache_disco
+
+
+def _gravar(diretorio, chave, linhas, mtime, limite_mb=1024):
+    cache_disco.gravar(chave, pd.DataFrame({"v": range(linhas)}), {"linhas": linhas}, str(diretorio), limite_mb)
+    caminho = os.path.join(diretorio, f"{chave}.parquet")
+    os.utime(caminho, (mtime, mtime))
+    return caminho
+
+
+def test_gravar_e_ler(tmp_path):
+    _gravar(tmp_path, "a", 10, 1000)
+    df, relatorio = cache_disco.ler("a", str(tmp_path))
+    assert df["v"].tolist() == list(range(10))
+    assert relatorio == {"linhas": 10}
+    # nenhum temporário fica para trás
+    assert sorted(os.listdir(tmp_path)) == ["a.json", "a.parquet"]
+
+
+def test_ler_marca_o_acesso(tmp_path):
+    caminho = _gravar(tmp_path, "a", 10, 1000)
+    cache_disco.ler("a", str(tmp_path))
+    assert os.stat(caminho).st_mtime > 1000
+
+
+def test_limpar_remove_os_menos_usados(tmp_path):
+    caminhos = {c: _gravar(tmp_path, c, 5000, t) for c, t in [("velho", 1000), ("meio", 2000), ("novo", 3000)]}
+    tamanho = os.stat(caminhos["velho"]).st_size
+    cache_disco.ler("velho", str(tmp_path))  # passa a ser o mais recente
+
+    cache_disco.limpar(str(tmp_path), 2 * tamanho)
+    assert sorted(n for n in os.listdir(tmp_path) if n.endswith(".parquet")) == ["novo.parquet", "velho.parquet"]
+    assert not os.path.exists(tmp_path / "meio.json")
+
+
+def test_limpar_mantem_o_que_acabou_de_entrar(tmp_path):
+    caminho = _gravar(tmp_path, "grande", 50_000, 1000)
+    _gravar(tmp_path, "outro", 10, 2000)
+    cache_disco.limpar(str(tmp_path), 1, manter=caminho)
+    assert sorted(os.listdir(tmp_path)) == ["grande.json", "grande.parquet"]
+
+
+def test_relatorio_corrompido_descarta_o_item(tmp_path):
+    _gravar(tmp_path, "a", 10, 1000)
+    with open(tmp_path / "a.json", "w", encoding="utf-8") as f:
+        f.write('{"linhas": 1')
+    assert cache_disco.ler("a", str(tmp_path)) is None
+    assert os.listdir(tmp_path) == []
+
+
+def test_relatorio_gravado_de_uma_vez(tmp_path, monkeypatch):
+    # quem lê durante a gravação vê o relatório antigo inteiro ou o novo inteiro
+    _gravar(tmp_path, "a", 10, 1000)
+    lidos = []
+    dump = json.dump
+
+    def dump_e_ler(obj, f, **kwargs):
+        dump(obj, f, **kwargs)
+        lidos.append(cache_disco.ler("a", str(tmp_path)))
+
+    monkeypatch.setattr(json, "dump", dump_e_ler)
+    cache_disco.gravar("a", pd.DataFrame({"v": range(20)}), {"linhas": 20}, str(tmp_path), 1024)
+    assert lidos[0][1] == {"linhas": 10}
+    assert cache_disco.ler("a", str(tmp_path))[1] == {"linhas": 20}
@@ -0,0 +1,58 @@
+"""Leitura pelo esquema de viagens (painel.carga): CSV e XLSX juntos."""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from painel import carga, sintetico
+
+pytest.importorskip("openpyxl")
+
+
+@pytest.fixture
+def exportacoes(tmp_path):
+    """A mesma base em CSV e em XLSX, com Linha numérica nas células da planilha."""
+    df = sintetico.gerar_viagens(400, linhas_onibus=15, semente=4)
+    csv = str(tmp_path / "viagens.csv")
+    sintetico.gravar(df.iloc[:200], csv)
+    planilha = df.iloc[200:].copy()
+    planilha["Linha"] = planilha["Linha"].astype(int)
+    xlsx = str(tmp_path / "viagens.xlsx")
+    sintetico.gravar(planilha, xlsx)
+    return df, csv, xlsx
+
+
+@pytest.mark.parametrize("motor", ["calamine", "openpyxl"])
+def test_csv_e_xlsx_com_linha_numerica_viram_as_mesmas_categorias(exportacoes, motor):
+    if motor == "calamine":
+        pytest.importorskip("python_calamine")
+    df, csv, xlsx = exportacoes
+    parte_csv, _ = carga.ler_csv(carga.abrir_arquivo(csv))
+    parte_xlsx, _ = carga.ler_xlsx(carga.abrir_arquivo(xlsx), motor=motor)
+    base = carga.combinar_partes([parte_csv, parte_xlsx])
+
+    linhas = base["Linha"].cat.categories
+    assert not linhas.has_duplicates
+    assert linhas.dtype == np.int64
+    assert sorted(linhas) == sorted(df["Linha"].astype(int).unique())
+    # cada viagem com a Linha da exportação, venha do CSV ou da planilha
+    assert base["Linha"].astype(int).tolist() == df["Linha"].astype(int).tolist()
+    assert base["Empresa"].astype(str).tolist() == df["Empresa"].tolist()
+
+
+def test_carregar_arquivos_csv_e_xlsx(exportacoes):
+    df, csv, xlsx = exportacoes
+    base, relatorio = carga.carregar_arquivos([carga.abrir_arquivo(csv), carga.abrir_arquivo(xlsx)], processos=1)
+    assert relatorio["linhas"] == len(df)
+    assert base["Linha"].nunique() == df["Linha"].nunique()
+    assert not base["Linha"].cat.categories.has_duplicates
+
+
+def test_combinar_uma_parte_sem_copia():
+    parte = pd.DataFrame({
+        "Horário_agendado": pd.array(["01/01/2024 10:00:00", None], dtype="str"),
+        "Linha": pd.Categorical(["507", "500"]),
+    })
+    base = carga.combinar_partes([parte])
+    assert base is parte
+    assert base["Linha"].cat.categories.tolist() == [500, 507]
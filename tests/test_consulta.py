@@ -0,0 +1,141 @@
+"""
+Paridade dos backends de painel.consulta: ConsultaPandas (cubo em memória)
+e ConsultaDuckDB (SQL sobre o Parquet) devolvem as mesmas tabelas para os
+mesmos filtros e períodos, numa base sintética (painel.sintetico).
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+pytest.importorskip("duckdb")
+
+from painel import cache_disco, carga, consulta, relatorios, sintetico, tratamento  # noqa: E402
+
+LIMITES_OUTROS = [-2.5, 0.5, 3, 7.5]
+
+
+@pytest.fixture(scope="module")
+def backends(tmp_path_factory):
+    pasta = tmp_path_factory.mktemp("consulta")
+    caminho = str(pasta / "viagens.csv")
+    sintetico.gravar(sintetico.gerar_viagens(30_000, dias=30, linhas_onibus=40, semente=5), caminho)
+    df, _ = carga.carregar_arquivos([carga.abrir_arquivo(caminho)], processos=1)
+    df, _ = tratamento.tratar_base(df)
+    cache_disco.gravar("base", df, {}, diretorio=str(pasta), limite_mb=1024)
+
+    cubo_base, indice_datas = relatorios.montar_cubo(df)
+    hist, indice_hist = relatorios.montar_histograma(df)
+    pandas_ = consulta.abrir("pandas", cubo_base, indice_datas, hist=hist, indice_hist=indice_hist)
+    duckdb_ = consulta.abrir("duckdb", caminho_parquet=str(pasta / "base.parquet"))
+    return pandas_, duckdb_
+
+
+def filtros_teste(p):
+    """Sem filtro, por empresas, linhas e faixas, combinados e no Aquaviário."""
+    empresas = p.opcoes("Transcol", "Empresa")
+    linhas = p.opcoes("Transcol", "Linha")
+    faixas = p.opcoes("Transcol", "Faixa_Horaria")
+    return [
+        {"sistema": "Transcol", "empresas": [], "linhas": [], "faixas": []},
+        {"sistema": "Transcol", "empresas": empresas[:2], "linhas": [], "faixas": []},
+        {"sistema": "Transcol", "empresas": [], "linhas": linhas[::7], "faixas": []},
+        {"sistema": "Transcol", "empresas": [], "linhas": [], "faixas": faixas[6:10]},
+        {"sistema": "Transcol", "empresas": empresas[1:5], "linhas": [], "faixas": faixas[15:20]},
+        {"sistema": "Aquaviário", "empresas": [], "linhas": [], "faixas": []},
+    ]
+
+
+# janela do ranking, dia de referência (posição entre os dias com dados), dias equivalentes, feriados
+JANELAS = [
+    {"janela": 7},
+    {"janela": 1, "n_dias": {"Dia útil": 2, "Sábado": 2, "Domingo": 1}},
+    {"janela": 3, "dia": -5},
+    {"janela": 7, "dia": -9, "feriados": (pd.Timestamp("2024-01-25"),)},
+]
+
+
+def iguais(a, b):
+    """Mesmas colunas e valores (números com tolerância, o resto como texto)."""
+    a, b = a.reset_index(drop=True), b.reset_index(drop=True)
+    assert list(a.columns) == list(b.columns)
+    assert len(a) == len(b)
+    for coluna in a.columns:
+        x, y = a[coluna], b[coluna]
+        if pd.api.types.is_numeric_dtype(x) and pd.api.types.is_numeric_dtype(y):
+            np.testing.assert_allclose(x.astype(float), y.astype(float), equal_nan=True, err_msg=coluna)
+        else:
+            assert x.astype(str).tolist() == y.astype(str).tolist(), coluna
+
+
+def casos(p):
+    for filtro in filtros_teste(p):
+        for janela in JANELAS:
+            yield filtro, janela
+
+
+def periodos_dos_dois(p, d, filtro, janela):
+    janela = dict(janela)
+    if "dia" in janela:
+        janela["dia"] = p.resumo_dias(filtro)["dias"][janela["dia"]]
+    return p.periodos(filtro, **janela), d.periodos(filtro, **janela)
+
+
+def test_opcoes(backends):
+    p, d = backends
+    for sistema in ["Transcol", "Aquaviário"]:
+        for coluna in ["Empresa", "Linha", "Faixa_Horaria"]:
+            assert p.opcoes(sistema, coluna) == d.opcoes(sistema, coluna)
+
+
+def test_periodos_e_resumo_dias(backends):
+    p, d = backends
+    for filtro, janela in casos(p):
+        a, b = periodos_dos_dois(p, d, filtro, janela)
+        for chave in ["ultimo_dia", "tipo_dia", "dias_equiv", "tem_janela"]:
+            assert a[chave] == b[chave], (filtro, janela, chave)
+
+        feriados = janela.get("feriados", ())
+        ra = p.resumo_dias(filtro, janela.get("n_dias"), feriados)
+        rb = d.resumo_dias(filtro, janela.get("n_dias"), feriados)
+        assert ra["dias"].equals(rb["dias"])
+        assert list(ra["tipos"]) == list(rb["tipos"])
+        np.testing.assert_array_equal(ra["contagens"], rb["contagens"])
+        np.testing.assert_allclose(ra["base"], rb["base"])
+        np.testing.assert_array_equal(ra["n_equiv"], rb["n_equiv"])
+
+
+def test_tabelas_das_abas(backends):
+    p, d = backends
+    for filtro, janela in casos(p):
+        a, b = periodos_dos_dois(p, d, filtro, janela)
+        iguais(p.tabela_adiantamento(a), d.tabela_adiantamento(b))
+        iguais(p.tabela_adiantamento(a, LIMITES_OUTROS), d.tabela_adiantamento(b, LIMITES_OUTROS))
+        iguais(p.percentis_adiantamento(a), d.percentis_adiantamento(b))
+        for coluna in ["Situação_viagem", "Situação_categoria"]:
+            iguais(p.tabela_comparativa(a, coluna), d.tabela_comparativa(b, coluna))
+
+
+@pytest.mark.parametrize("granularidade", ["Empresa", "Linha", "Empresa × Linha"])
+def test_rankings(backends, granularidade):
+    p, d = backends
+    for filtro, janela in casos(p):
+        a, b = periodos_dos_dois(p, d, filtro, janela)
+        for limites, minimo in [(relatorios.cubo.LIMITES_ADIANTAMENTO, 0), (LIMITES_OUTROS, 20)]:
+            for x, y in zip(p.rankings(a, limites, granularidade, None, minimo),
+                            d.rankings(b, limites, granularidade, None, minimo)):
+                iguais(x, y)
+
+
+def test_alertas(backends):
+    p, d = backends
+    ordem = ["Empresa", "Linha", "Faixa_Horaria", "Indicador"]
+    for filtro, janela in casos(p):
+        a, b = periodos_dos_dois(p, d, filtro, janela)
+        for limites in [relatorios.cubo.LIMITES_ADIANTAMENTO, LIMITES_OUTROS]:
+            # todos os desvios, na mesma ordem de grupos
+            x, y = p.alertas(a, limites, None, 3), d.alertas(b, limites, None, 3)
+            iguais(x.sort_values(ordem), y.sort_values(ordem))
+            # os n maiores: empates de |z| podem trocar quem entra, mas não os escores
+            x, y = p.alertas(a, limites, 15), d.alertas(b, limites, 15)
+            np.testing.assert_allclose(np.sort(np.abs(x["Escore z"])), np.sort(np.abs(y["Escore z"])))
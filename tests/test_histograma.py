@@ -0,0 +1,100 @@
+"""
+painel.histograma: faixas de meio minuto, contagem acima de limites quaisquer
+e percentis contra o cálculo direto sobre os adiantamentos de cada viagem.
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from painel import histograma, relatorios, sintetico, tratamento
+
+
+@pytest.fixture(scope="module")
+def base():
+    df = sintetico.gerar_viagens(20_000, dias=14, semente=11)
+    df.columns = [c.replace(" ", "_") for c in df.columns]
+    df, _ = tratamento.tratar_base(df)
+    hist, _ = relatorios.montar_histograma(df)
+    return df, hist
+
+
+def adiantamentos_bordas():
+    """Valores exatamente nas bordas das faixas, fora do intervalo e sem realizado."""
+    return np.array([
+        -200.0, -60.0, -59.99, -0.5, -0.01, 0.0, 0.01, 0.5, 2.99, 3.0, 3.01,
+        5.0, 9.5, 10.0, 10.49, 119.5, 120.0, 120.01, 400.0, np.nan, np.nan,
+    ])
+
+
+def test_acima_de_igual_a_comparacao_direta():
+    valores = adiantamentos_bordas()
+    contagens = np.bincount(histograma.faixa_minuto(valores), minlength=histograma.N_FAIXAS)
+    limites = [-60, -0.5, 0, 0.5, 3, 5, 9.5, 10, 119.5, 120]
+    esperado = [int((valores > limite).sum()) for limite in limites]
+    assert histograma.acima_de(contagens, limites).tolist() == esperado
+
+
+def test_faixas_nas_bordas():
+    faixas = histograma.faixa_minuto(adiantamentos_bordas())
+    assert faixas[0] == faixas[1] == histograma.ABAIXO
+    assert faixas[-1] == faixas[-2] == histograma.SEM_REALIZADO
+    assert faixas[-3] == faixas[-4] == histograma.ACIMA
+    # 3,0 fica na faixa (2,5; 3,0], que não conta como "> 3"
+    k = list(adiantamentos_bordas()).index(3.0)
+    assert histograma.BORDAS[faixas[k] - 2] == 2.5 and histograma.BORDAS[faixas[k] - 1] == 3.0
+
+
+def test_acima_de_na_base(base):
+    df, hist = base
+    contagens = histograma.contagens(hist, np.arange(len(hist)))
+    assert contagens.sum() == len(df)
+
+    limites = [-10, -2.5, 0, 1.5, 3, 5, 7.5, 10, 20]
+    esperado = [int((df["Adiantamento_min"] > limite).sum()) for limite in limites]
+    assert histograma.acima_de(contagens, limites).tolist() == esperado
+    assert histograma.acima_de(contagens, [3, 5, 10]).tolist() == [
+        int(df[c].sum()) for c in ["Adianta_3", "Adianta_5", "Adianta_10"]
+    ]
+
+
+@pytest.mark.parametrize("acima_de_min", [0.0, 3.0, -5.0])
+def test_percentis_dentro_de_uma_faixa_do_np_percentile(base, acima_de_min):
+    df, hist = base
+    ps = [1, 10, 25, 50, 75, 90, 99]
+    delta = df["Adiantamento_min"].to_numpy()
+    delta = delta[delta > acima_de_min]
+    esperado = np.percentile(delta, ps)
+
+    obtido = histograma.percentis(histograma.contagens(hist, np.arange(len(hist))), ps, acima_de_min)
+    np.testing.assert_allclose(obtido, esperado, atol=histograma.LARGURA_FAIXA)
+    assert np.all(np.diff(obtido) >= 0)
+
+
+def test_percentis_por_empresa(base):
+    df, hist = base
+    for empresa in df["Empresa"].unique()[:5]:
+        delta = df.loc[df["Empresa"] == empresa, "Adiantamento_min"].to_numpy()
+        delta = delta[delta > 0]
+        posicoes = np.flatnonzero(hist["Empresa"].astype(object).to_numpy() == empresa)
+        obtido = histograma.percentis(histograma.contagens(hist, posicoes))
+        np.testing.assert_allclose(
+            obtido, np.percentile(delta, histograma.PERCENTIS), atol=histograma.LARGURA_FAIXA, err_msg=empresa
+        )
+
+
+def test_percentis_sem_viagens_e_acima_do_maximo():
+    contagens = np.bincount(histograma.faixa_minuto([-3.0, 0.0, np.nan]), minlength=histograma.N_FAIXAS)
+    assert np.isnan(histograma.percentis(contagens)).all()
+
+    contagens = np.bincount(histograma.faixa_minuto([1.2, 150.0, 300.0, 500.0]), minlength=histograma.N_FAIXAS)
+    p = histograma.percentis(contagens, [10, 50, 99])
+    assert 1.0 <= p[0] <= 1.5
+    assert p[1:].tolist() == [histograma.MAXIMO, histograma.MAXIMO]
+
+
+def test_validar_limites():
+    histograma.validar_limites([-60, 0, 2.5, 120])
+    for invalido in [0.25, -60.5, 120.5, 3.1]:
+        with pytest.raises(ValueError):
+            histograma.validar_limites([invalido])
@@ -0,0 +1,175 @@
+"""
+Rankings da aba 4 (painel.ranking, via painel.relatorios.rankings) contra o
+groupby + pivot_table linha a linha do app.py original, por empresa, linha e
+empresa x linha, com empates no % e K maior que o número de grupos.
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from painel import analises, cubo, ranking, relatorios, sintetico, tratamento
+
+LIMITES_OUTROS = [-2.5, 0.5, 7.5]
+
+
+def tratada(df):
+    df, _ = tratamento.tratar_base(df)
+    return df
+
+
+def base_empates():
+    """
+    Empresas com o mesmo % de adiantadas > 10 min (B, C e E com 50%, A e D
+    com 25%) e F com mais viagens, em duas linhas; situações e categorias
+    com nulos.
+    """
+    adiantamentos = {
+        "A": [12, 4, 0, -3],
+        "B": [12, 11, 6, np.nan],
+        "C": [15, 0, 20, 1],
+        "D": [0, 30, -1, 2],
+        "E": [11, 11, 3, 3],
+        "F": [1, 2, 3, 4, 5, 6, 0, np.nan],
+    }
+    linhas = []
+    for empresa, valores in adiantamentos.items():
+        for i, minutos in enumerate(valores):
+            linhas.append({
+                "Empresa": f"Empresa {empresa}",
+                "Linha": "500" if i % 2 else "501",
+                "Minutos": minutos,
+                "Situação_viagem": ["Viagem concluída", "Viagem adiantada", None, "Viagem atrasada"][i % 4],
+                "Situação_categoria": ["OK", "AVL", "OK", None, "SIS"][(i + len(empresa)) % 5],
+            })
+    df = pd.DataFrame(linhas)
+    agendado = pd.Timestamp("2024-01-08 07:00") + pd.to_timedelta(np.arange(len(df)), unit="min")
+    df["Horário_agendado"] = pd.Series(agendado)
+    df["Horário_realizado"] = df["Horário_agendado"] + pd.to_timedelta(df.pop("Minutos"), unit="min")
+    return tratada(df)
+
+
+@pytest.fixture(scope="module")
+def base_sintetica():
+    df = sintetico.gerar_viagens(20_000, dias=7, linhas_onibus=25, semente=17)
+    df.columns = [c.replace(" ", "_") for c in df.columns]
+    df.loc[df.index[::53], "Situação_viagem"] = None
+    df.loc[df.index[::61], "Situação_categoria"] = None
+    return tratada(df)
+
+
+def referencia(df, colunas, limites, k=None, minimo=0):
+    """Os três rankings como o app.py montava (groupby e pivot_table), com K e mínimo de viagens."""
+    resumo1 = df.groupby(colunas).size().rename("Total").reset_index()
+    for limite in limites:
+        adiantadas = (df["Adiantamento_min"] > limite).groupby([df[c] for c in colunas]).sum()
+        resumo1[analises.coluna_pct(limite)] = adiantadas.to_numpy() / resumo1["Total"] * 100
+    resumo1 = resumo1[resumo1["Total"] >= max(minimo, 1)]
+    resumo1 = resumo1.sort_values(analises.coluna_pct(max(limites)), ascending=False, kind="stable")
+    if k is not None:
+        resumo1 = resumo1.head(k)
+    ordem = pd.MultiIndex.from_frame(resumo1[colunas]) if k is not None or minimo else None
+
+    df_sv = df.copy()
+    df_sv["Situação_viagem"] = df_sv["Situação_viagem"].astype(object).fillna("")
+    df_sv = df_sv[~df_sv["Situação_viagem"].str.strip().str.lower().isin(analises.SITUACOES_CONCLUIDA)]
+    tabela2 = distribuicao(df_sv, colunas, "Situação_viagem", ordem)
+
+    df_cat = df.copy()
+    df_cat["Situação_categoria"] = df_cat["Situação_categoria"].astype(object).fillna("")
+    tabela3 = distribuicao(df_cat, colunas, "Situação_categoria", ordem)
+    for c in analises.CATEGORIAS:
+        if c not in tabela3.columns:
+            tabela3[c] = 0
+    tabela3 = tabela3[colunas + analises.CATEGORIAS]
+
+    colunas_pct = [analises.coluna_pct(lim) for lim in limites]
+    return resumo1[colunas + ["Total"] + colunas_pct], tabela2, tabela3
+
+
+def distribuicao(df, colunas, coluna, ordem):
+    """% de cada valor de `coluna` dentro do grupo (pivot_table), nos grupos e na ordem do ranking 1."""
+    df = df.astype({c: object for c in colunas})
+    if ordem is not None:
+        df = df[pd.MultiIndex.from_frame(df[colunas]).isin(ordem)]
+    total = df.groupby(colunas).size().rename("TotalGrupo")
+    dist = df.groupby(colunas + [coluna]).size().rename("Qtd").reset_index()
+    dist = dist.merge(total.reset_index(), on=colunas, how="left")
+    dist["%"] = dist["Qtd"] / dist["TotalGrupo"] * 100
+    tabela = dist.pivot_table(index=colunas, columns=coluna, values="%", fill_value=0)
+    if ordem is not None:
+        tabela = tabela.reindex([i for i in ordem if i in tabela.index] if len(colunas) > 1
+                                else [i[0] for i in ordem if i[0] in tabela.index])
+    return tabela.reset_index()
+
+
+def iguais(a, b):
+    """Mesmas colunas e valores (números com tolerância, o resto como texto)."""
+    a, b = a.reset_index(drop=True), b.reset_index(drop=True)
+    assert [str(c) for c in a.columns] == [str(c) for c in b.columns]
+    assert len(a) == len(b)
+    for coluna in a.columns:
+        x, y = a[coluna], b[coluna]
+        if pd.api.types.is_numeric_dtype(x) and pd.api.types.is_numeric_dtype(y):
+            np.testing.assert_allclose(x.astype(float), y.astype(float), err_msg=str(coluna))
+        else:
+            assert x.astype(str).tolist() == y.astype(str).tolist(), coluna
+
+
+def comparar(df, granularidade, limites, k=None, minimo=0):
+    cubo_base, _ = relatorios.montar_cubo(df)
+    hist = pos_hist = None
+    if limites != cubo.LIMITES_ADIANTAMENTO:
+        hist, _ = relatorios.montar_histograma(df)
+        pos_hist = np.arange(len(hist))
+    obtidos = relatorios.rankings(
+        cubo_base, np.arange(len(cubo_base)), granularidade, limites, k, minimo, hist, pos_hist
+    )
+    esperados = referencia(df, ranking.GRANULARIDADES[granularidade], limites, k, minimo)
+    for obtido, esperado in zip(obtidos, esperados):
+        iguais(obtido, esperado)
+    return obtidos
+
+
+@pytest.mark.parametrize("granularidade", list(ranking.GRANULARIDADES))
+@pytest.mark.parametrize("limites", [cubo.LIMITES_ADIANTAMENTO, LIMITES_OUTROS], ids=["cubo", "histograma"])
+@pytest.mark.parametrize("k,minimo", [(None, 0), (3, 0), (500, 0), (None, 300), (5, 300)])
+def test_rankings_iguais_ao_pivot_table(base_sintetica, granularidade, limites, k, minimo):
+    if granularidade == "Empresa" and minimo:
+        minimo = 3_000
+    comparar(base_sintetica, granularidade, limites, k, minimo)
+
+
+@pytest.mark.parametrize("granularidade", list(ranking.GRANULARIDADES))
+@pytest.mark.parametrize("k", [None, 1, 2, 3, 4, 6, 20])
+def test_empates_na_ordem_dos_grupos(granularidade, k):
+    comparar(base_empates(), granularidade, cubo.LIMITES_ADIANTAMENTO, k)
+
+
+def test_empate_no_corte_do_k_fica_com_os_primeiros_grupos():
+    r1, r2, r3 = comparar(base_empates(), "Empresa", cubo.LIMITES_ADIANTAMENTO, k=2)
+    # B, C e E empatam em 50%: entram os dois primeiros na ordem das empresas
+    assert r1["Empresa"].astype(str).tolist() == ["Empresa B", "Empresa C"]
+    assert r3["Empresa"].astype(str).tolist() == ["Empresa B", "Empresa C"]
+
+    r1, _, _ = comparar(base_empates(), "Empresa", cubo.LIMITES_ADIANTAMENTO, k=4)
+    assert r1["Empresa"].astype(str).tolist() == ["Empresa B", "Empresa C", "Empresa E", "Empresa A"]
+
+
+def test_k_maior_que_os_grupos_e_minimo_acima_de_todos():
+    df = base_empates()
+    todos, _, _ = comparar(df, "Empresa", cubo.LIMITES_ADIANTAMENTO)
+    com_k, _, _ = comparar(df, "Empresa", cubo.LIMITES_ADIANTAMENTO, k=100)
+    iguais(com_k, todos)
+    assert len(todos) == 6
+
+    cubo_base, _ = relatorios.montar_cubo(df)
+    r1, r2, r3 = relatorios.rankings(cubo_base, np.arange(len(cubo_base)), "Empresa", minimo=1_000)
+    assert r1.empty and r2.empty and r3.empty
+
+
+def test_selecionar_top_com_empates():
+    valores = np.array([0.5, 0.25, 0.5, 0.5, 0.0, 0.25])
+    assert ranking.selecionar_top(valores, None).tolist() == [0, 2, 3, 1, 5, 4]
+    for k in range(1, 8):
+        assert ranking.selecionar_top(valores, k).tolist() == [0, 2, 3, 1, 5, 4][:k]
@@ -0,0 +1,117 @@
+"""
+painel.referencia: base dos dias equivalentes de cada dia (somas acumuladas
+por Tipo_Dia) contra a escolha dos dias feita à mão sobre a base linha a
+linha, com e sem feriados.
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from painel import analises, histograma, referencia, relatorios, sintetico, tratamento
+
+LIMITES = [0, 3, 7.5]
+
+# uma quarta, uma segunda e um sábado
+FERIADOS = pd.DatetimeIndex(["2024-01-10", "2024-01-22", "2024-02-03"])
+
+
+@pytest.fixture(scope="module")
+def base():
+    df = sintetico.gerar_viagens(15_000, dias=42, semente=13)
+    df.columns = [c.replace(" ", "_") for c in df.columns]
+    df, _ = tratamento.tratar_base(df)
+    # dois dias sem viagens: não contam como dias equivalentes
+    df = df[~df["Data_Agendada"].isin(pd.to_datetime(["2024-01-17", "2024-01-27"]))].reset_index(drop=True)
+    hist, indice_hist = relatorios.montar_histograma(df)
+    contagens_dias = histograma.contagens_por_dia(hist, indice_hist, np.arange(len(hist)))
+    return df, indice_hist, contagens_dias
+
+
+def tipo_a_mao(dia, feriados):
+    if dia in feriados or dia.weekday() == 6:
+        return "Domingo"
+    return "Sábado" if dia.weekday() == 5 else "Dia útil"
+
+
+def equivalentes_a_mao(dias, feriados, n_dias):
+    """Para cada dia, os n últimos dias anteriores do mesmo tipo (todos os dias têm dados)."""
+    tipos = [tipo_a_mao(d, feriados) for d in dias]
+    n_dias = n_dias or analises.DIAS_EQUIVALENTES
+    equivalentes = []
+    for k, tipo in enumerate(tipos):
+        anteriores = [dias[j] for j in range(k) if tipos[j] == tipo]
+        equivalentes.append(anteriores[max(0, len(anteriores) - n_dias[tipo]):])
+    return tipos, equivalentes
+
+
+@pytest.mark.parametrize("feriados", [(), FERIADOS], ids=["sem_feriados", "com_feriados"])
+@pytest.mark.parametrize("n_dias", [None, {"Dia útil": 3, "Sábado": 2, "Domingo": 2}], ids=["padrao", "outros"])
+def test_base_equivalente_igual_a_escolha_a_mao(base, feriados, n_dias):
+    df, indice_hist, contagens_dias = base
+    resumo = referencia.montar_resumo(indice_hist.dias, contagens_dias, feriados, n_dias)
+    dias = list(resumo["dias"])
+    assert pd.Timestamp("2024-01-17") not in dias and len(dias) == 40
+
+    tipos, equivalentes = equivalentes_a_mao(dias, pd.DatetimeIndex(feriados), n_dias)
+    assert list(resumo["tipos"]) == tipos
+    assert resumo["n_equiv"].tolist() == [len(e) for e in equivalentes]
+
+    tabela = referencia.tabela_dias(resumo, LIMITES).iloc[::-1].reset_index(drop=True)
+    for k, dia in enumerate(dias):
+        do_dia = df.loc[df["Data_Agendada"] == dia, "Adiantamento_min"]
+        da_base = df.loc[df["Data_Agendada"].isin(equivalentes[k]), "Adiantamento_min"]
+        assert tabela.loc[k, "Total"] == len(do_dia)
+        for limite in LIMITES:
+            coluna = analises.coluna_pct(limite)
+            assert tabela.loc[k, coluna] == pytest.approx((do_dia > limite).mean() * 100)
+            if len(da_base):
+                assert tabela.loc[k, f"{coluna} (equiv.)"] == pytest.approx((da_base > limite).mean() * 100)
+            else:
+                assert np.isnan(tabela.loc[k, f"{coluna} (equiv.)"])
+
+
+def test_feriado_sai_da_base_dos_dias_uteis(base):
+    _, indice_hist, contagens_dias = base
+    resumo = referencia.montar_resumo(indice_hist.dias, contagens_dias, FERIADOS)
+    dias = list(resumo["dias"])
+
+    def linhas(datas):
+        return resumo["contagens"][[dias.index(pd.Timestamp(d)) for d in datas]].sum(axis=0)
+
+    def base_do_dia(dia):
+        return resumo["base"][dias.index(pd.Timestamp(dia))]
+
+    # sexta 12/01: a quarta 10/01 (feriado) fica de fora dos 5 dias úteis
+    assert resumo["tipos"][dias.index(pd.Timestamp("2024-01-10"))] == "Domingo"
+    np.testing.assert_array_equal(
+        base_do_dia("2024-01-12"),
+        linhas(["2024-01-04", "2024-01-05", "2024-01-08", "2024-01-09", "2024-01-11"]),
+    )
+    # domingo 14/01 compara com o feriado de quarta, o "domingo" anterior
+    np.testing.assert_array_equal(base_do_dia("2024-01-14"), linhas(["2024-01-10"]))
+    # o feriado compara com o domingo anterior
+    np.testing.assert_array_equal(base_do_dia("2024-01-10"), linhas(["2024-01-07"]))
+    # sábado seguinte ao sábado feriado (03/02) pula o feriado; 27/01 não tem viagens
+    np.testing.assert_array_equal(base_do_dia("2024-02-10"), linhas(["2024-01-20"]))
+
+
+def test_tipos_dos_dias_com_feriados():
+    dias = pd.date_range("2024-01-05", periods=4)
+    assert referencia.tipos_dos_dias(dias).tolist() == ["Dia útil", "Sábado", "Domingo", "Dia útil"]
+    assert referencia.tipos_dos_dias(dias, [pd.Timestamp("2024-01-08"), pd.Timestamp("2024-01-06")]).tolist() == [
+        "Dia útil", "Domingo", "Domingo", "Domingo",
+    ]
+
+
+def test_ler_feriados(tmp_path):
+    caminho = tmp_path / "feriados.txt"
+    caminho.write_text(
+        "# feriados de 2024\n2024-01-01; Confraternização\n\n25/12/2024, Natal\n2024-01-01\n", encoding="utf-8"
+    )
+    assert referencia.ler_feriados(str(caminho)).tolist() == [pd.Timestamp("2024-01-01"), pd.Timestamp("2024-12-25")]
+    assert len(referencia.ler_feriados("")) == 0
+
+    caminho.write_text("2024-13-01\n", encoding="utf-8")
+    with pytest.raises(ValueError, match="linha 1"):
+        referencia.ler_feriados(str(caminho))
@@ -0,0 +1,114 @@
+"""
+painel.registro.Registro: LRU dentro do orçamento, uma montagem por item
+mesmo com sessões concorrentes e a conta de memória ocupada.
+"""
+
+import threading
+
+import numpy as np
+
+from painel import registro
+
+# 400 mil bytes por item: cabem dois no orçamento de 1 MB, não três
+N = 50_000
+
+
+def bloco(valor=0.0):
+    return np.full(N, valor)
+
+
+def test_lru_tira_o_usado_ha_mais_tempo():
+    reg = registro.Registro(orcamento_mb=1)
+    reg.obter("a", "base", bloco)
+    reg.obter("b", "base", bloco)
+    # "a" usado de novo: o mais antigo passa a ser "b"
+    reg.obter("a", "base", lambda: None)
+    reg.obter("c", "base", bloco)
+
+    assert [(b, i) for b, i in reg.resumo()[["Base", "Item"]].itertuples(index=False)] == [
+        ("a", "base"), ("c", "base"),
+    ]
+    assert reg.removidos == 1
+    assert reg.ocupado() == 2 * N * 8
+
+
+def test_item_maior_que_o_orcamento_nao_entra_e_o_ultimo_sempre_fica():
+    reg = registro.Registro(orcamento_mb=1)
+    reg.obter("a", "base", bloco)
+    grande = reg.obter("g", "base", lambda: np.zeros(200_000))
+    assert len(grande) == 200_000
+    assert reg.resumo()["Base"].tolist() == ["a"]
+
+    vazio = registro.Registro(orcamento_mb=0)
+    chamadas = []
+    for _ in range(2):
+        vazio.obter("a", "base", lambda: chamadas.append(1) or bloco())
+    assert len(chamadas) == 2
+    assert vazio.ocupado() == 0
+
+
+def test_ocupado_acompanha_guardar_remover_e_lru():
+    reg = registro.Registro(orcamento_mb=1)
+    reg.obter("a", "base", bloco)
+    reg.obter("a", "cubo", lambda: np.zeros(1_000))
+    assert reg.ocupado() == N * 8 + 8_000
+
+    reg.obter("b", "base", bloco)
+    assert reg.ocupado() == 2 * N * 8 + 8_000
+    # passa do orçamento: "a"/"base" sai pelo LRU; "a"/"cubo", "b" e "c" ficam
+    reg.obter("c", "base", bloco)
+    assert reg.ocupado() == 2 * N * 8 + 8_000
+    assert reg.removidos == 1
+
+    reg.remover("b")
+    assert reg.ocupado() == N * 8 + 8_000
+    assert reg.ocupado() == round(reg.resumo()["MB"].sum() * 1024**2)
+    reg.remover("a")
+    reg.remover("c")
+    assert reg.ocupado() == 0 and reg.resumo().empty
+
+
+def test_montagem_concorrente_do_mesmo_item_roda_uma_vez():
+    reg = registro.Registro(orcamento_mb=1)
+    comecou, liberar = threading.Event(), threading.Event()
+    chamadas = []
+
+    def montar():
+        chamadas.append(threading.current_thread().name)
+        comecou.set()
+        liberar.wait(5)
+        return bloco(1.0)
+
+    resultados = []
+    threads = [
+        threading.Thread(target=lambda: resultados.append(reg.obter("a", "base", montar)))
+        for _ in range(4)
+    ]
+    for t in threads:
+        t.start()
+    # a primeira está montando; as outras esperam a trava do item
+    assert comecou.wait(5)
+    liberar.set()
+    for t in threads:
+        t.join(5)
+
+    assert len(chamadas) == 1
+    assert len(resultados) == 4
+    assert all(r is resultados[0] for r in resultados)
+    assert reg._montando == {}
+
+
+def test_erro_na_montagem_libera_a_trava_do_item():
+    reg = registro.Registro(orcamento_mb=1)
+
+    def falhar():
+        raise ValueError("arquivo inválido")
+
+    for _ in range(2):
+        try:
+            reg.obter("a", "base", falhar)
+        except ValueError:
+            pass
+    assert reg._montando == {}
+    assert reg.ocupado() == 0
+    assert reg.obter("a", "base", bloco).shape == (N,)
@@ -0,0 +1,200 @@
+"""
+Tabelas de um relatório (painel.relatorios.calcular_tabelas, sobre o cubo)
+contra os BLOCOS 9 a 15 do app.py original, calculados linha a linha sobre
+uma base sintética (painel.sintetico): velocímetros da aba 1, tabelas de
+Situação_viagem e Situação_categoria e os três rankings.
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from painel import analises, relatorios, sintetico, tratamento
+
+CATEGORIAS = ["ACI", "AVL", "CII", "EXT", "IAC", "IEP", "MRI", "OK", "QUE", "SIS", "TRI", "VNR"]
+
+
+@pytest.fixture(scope="module")
+def base():
+    df = sintetico.gerar_viagens(25_000, dias=24, linhas_onibus=40, semente=5)
+    df.columns = [c.replace(" ", "_") for c in df.columns]
+    df.loc[df.index[::89], "Situação_viagem"] = None
+    df.loc[df.index[::97], "Situação_categoria"] = None
+    df.loc[df.index[::113], "Empresa"] = None
+    df, _ = tratamento.tratar_base(df)
+    cubo_base, indice_datas = relatorios.montar_cubo(df)
+    return df, cubo_base, indice_datas
+
+
+def periodos_por_linha(df_filtro):
+    """BLOCOS 9 e 10: último dia, dias equivalentes e janela do ranking."""
+    ultimo_dia = df_filtro["Data_Agendada"].max()
+    df_ultimo = df_filtro[df_filtro["Data_Agendada"] == ultimo_dia]
+    tipo_dia_ult = df_ultimo["Tipo_Dia"].iloc[0]
+    df_hist = df_filtro[df_filtro["Data_Agendada"] < ultimo_dia]
+    n_dias = 5 if tipo_dia_ult == "Dia útil" else 1
+    datas_equiv = (
+        df_hist.loc[df_hist["Tipo_Dia"] == tipo_dia_ult, "Data_Agendada"]
+        .drop_duplicates()
+        .sort_values(ascending=False)
+        .head(n_dias)
+    )
+    df_base_equiv = df_filtro[df_filtro["Data_Agendada"].isin(datas_equiv)]
+    inicio_rank = ultimo_dia - pd.Timedelta(days=relatorios.JANELA_RANK_DIAS - 1)
+    df_rank = df_filtro[(df_filtro["Data_Agendada"] >= inicio_rank) & (df_filtro["Data_Agendada"] <= ultimo_dia)]
+    return ultimo_dia, df_ultimo, df_base_equiv, df_rank
+
+
+def velocimetros(df_base, df_dia):
+    """BLOCO 12 (calcula_adiantamento_equiv para 3, 5 e 10 min)."""
+    linhas = []
+    for limite in [3, 5, 10]:
+        if len(df_dia) == 0 or len(df_base) == 0:
+            qtd_dia, pct_dia, pct_base = 0, 0.0, 0.0
+        else:
+            qtd_dia = (df_dia["Adiantamento_min"] > limite).sum()
+            pct_dia = qtd_dia / len(df_dia) * 100
+            pct_base = (df_base["Adiantamento_min"] > limite).sum() / len(df_base) * 100
+        linhas.append({
+            "Limite (min)": limite, "Qtd Último Dia": qtd_dia, "% Último Dia": pct_dia,
+            "% Dias Equivalentes": pct_base, "Desvio (p.p.)": pct_dia - pct_base,
+        })
+    return pd.DataFrame(linhas)
+
+
+def situacao(df_ultimo, df_base_equiv, coluna):
+    """BLOCOS 13 e 14: quantidade e % no último dia e nos dias equivalentes."""
+    tab_ult = df_ultimo.groupby(coluna).size().reset_index(name="Qtd Último Dia")
+    if df_base_equiv.empty:
+        tab_base = tab_ult.copy()
+        tab_base["Qtd Base Dias Equivalentes"] = 0
+        tab_base = tab_base[[coluna, "Qtd Base Dias Equivalentes"]]
+    else:
+        tab_base = df_base_equiv.groupby(coluna).size().reset_index(name="Qtd Base Dias Equivalentes")
+    tabela = tab_ult.merge(tab_base, on=coluna, how="outer").fillna(0)
+    soma_ult = tabela["Qtd Último Dia"].sum()
+    soma_base = tabela["Qtd Base Dias Equivalentes"].sum()
+    tabela["% Último Dia"] = tabela["Qtd Último Dia"] / soma_ult * 100 if soma_ult > 0 else 0
+    tabela["% Dias Equivalentes"] = tabela["Qtd Base Dias Equivalentes"] / soma_base * 100 if soma_base > 0 else 0
+    tabela["Desvio (p.p.)"] = tabela["% Último Dia"] - tabela["% Dias Equivalentes"]
+    return tabela
+
+
+def rankings_por_linha(df_rank):
+    """BLOCO 15: rankings 1 a 3 por empresa (groupby e pivot_table)."""
+    resumo1 = df_rank.groupby("Empresa").agg(
+        Total=("Empresa", "size"),
+        Adianta3=("Adianta_3", "sum"),
+        Adianta5=("Adianta_5", "sum"),
+        Adianta10=("Adianta_10", "sum"),
+    ).reset_index()
+    for limite in [3, 5, 10]:
+        resumo1[f"% >{limite} min"] = resumo1[f"Adianta{limite}"] / resumo1["Total"] * 100
+    resumo1 = resumo1.sort_values("% >10 min", ascending=False, kind="stable")
+    resumo1 = resumo1[["Empresa", "Total", "% >3 min", "% >5 min", "% >10 min"]]
+
+    df_sv = df_rank.copy()
+    df_sv["Situação_viagem"] = df_sv["Situação_viagem"].astype(object).fillna("")
+    df_sv = df_sv[~df_sv["Situação_viagem"].str.strip().str.lower().isin(["viagem concluída", "viagem concluida"])]
+    tabela_sv = distribuicao(df_sv, "Situação_viagem")
+
+    df_cat = df_rank.copy()
+    df_cat["Situação_categoria"] = df_cat["Situação_categoria"].astype(object).fillna("")
+    tabela_cat = distribuicao(df_cat, "Situação_categoria").set_index("Empresa")
+    for c in CATEGORIAS:
+        if c not in tabela_cat.columns:
+            tabela_cat[c] = 0
+    return resumo1, tabela_sv, tabela_cat[CATEGORIAS].reset_index()
+
+
+def distribuicao(df, coluna):
+    total = df.groupby("Empresa")[coluna].size().rename("TotalEmp")
+    dist = df.groupby(["Empresa", coluna]).size().rename("Qtd").reset_index()
+    dist = dist.merge(total, on="Empresa", how="left")
+    dist["%"] = dist["Qtd"] / dist["TotalEmp"] * 100
+    return dist.pivot_table(index="Empresa", columns=coluna, values="%", fill_value=0).reset_index()
+
+
+def iguais(a, b):
+    """Mesmas colunas e valores (números com tolerância, o resto como texto)."""
+    a, b = a.reset_index(drop=True), b.reset_index(drop=True)
+    assert [str(c) for c in a.columns] == [str(c) for c in b.columns]
+    assert len(a) == len(b)
+    for coluna in a.columns:
+        x, y = a[coluna], b[coluna]
+        if pd.api.types.is_numeric_dtype(x) and pd.api.types.is_numeric_dtype(y):
+            np.testing.assert_allclose(x.astype(float), y.astype(float), err_msg=str(coluna))
+        else:
+            assert x.astype(str).tolist() == y.astype(str).tolist(), coluna
+
+
+def filtros_teste(df):
+    """(sistema, empresas, linhas, faixas, dia de referência); None em empresas, linhas e faixas = todas."""
+    transcol = df[df["Sistema"] == "Transcol"]
+    empresas = sorted(transcol["Empresa"].dropna().unique())
+    linhas = sorted(transcol["Linha"].dropna().unique())
+    faixas = sorted(transcol["Faixa_Horaria"].dropna().unique())
+    return [
+        ("Transcol", None, None, None, None),
+        ("Transcol", empresas[:3], None, None, None),
+        ("Transcol", None, linhas[::4], faixas[5:12], None),
+        ("Transcol", None, None, None, "2024-01-13"),  # sábado
+        ("Transcol", empresas[1:], None, None, "2024-01-21"),  # domingo
+        ("Transcol", None, None, faixas[16:20], "2024-01-10"),  # quarta
+        ("Transcol", None, None, None, "2024-01-01"),  # primeiro dia: sem dias equivalentes
+        ("Aquaviário", None, None, None, None),
+    ]
+
+
+def filtrar_linhas(df, sistema, empresas, linhas, faixas, dia):
+    """BLOCO 8 sobre a base linha a linha, com a base terminando no dia de referência."""
+    mask = df["Sistema"] == sistema
+    for coluna, valores in [("Empresa", empresas), ("Linha", linhas), ("Faixa_Horaria", faixas)]:
+        if valores is None:
+            # o padrão da tela: todas as opções do sistema (sem os nulos)
+            valores = df.loc[df["Sistema"] == sistema, coluna].dropna().unique()
+        mask &= df[coluna].isin(valores)
+    if dia is not None:
+        mask &= df["Data_Agendada"] <= pd.Timestamp(dia)
+    return df[mask]
+
+
+@pytest.mark.parametrize("caso", range(8))
+def test_tabelas_iguais_ao_calculo_por_linha(base, caso):
+    df, cubo_base, indice_datas = base
+    sistema, empresas, linhas, faixas, dia = filtros_teste(df)[caso]
+
+    posicoes = relatorios.posicoes_filtro(cubo_base, sistema, empresas, linhas, faixas)
+    periodos = relatorios.separar_periodos(cubo_base, indice_datas, posicoes, dia)
+    tabelas = relatorios.calcular_tabelas(cubo_base, periodos)
+
+    df_filtro = filtrar_linhas(df, sistema, empresas, linhas, faixas, dia)
+    assert len(df_filtro) > 0
+    ultimo_dia, df_ultimo, df_base_equiv, df_rank = periodos_por_linha(df_filtro)
+
+    assert periodos["ultimo_dia"] == ultimo_dia
+    assert periodos["dias_equiv"] == sorted(df_base_equiv["Data_Agendada"].unique())
+    assert cubo_base["Qtd"].to_numpy()[periodos["pos_ultimo"]].sum() == len(df_ultimo)
+    assert cubo_base["Qtd"].to_numpy()[periodos["pos_base_equiv"]].sum() == len(df_base_equiv)
+
+    iguais(tabelas["adiantamento"], velocimetros(df_base_equiv, df_ultimo))
+    iguais(tabelas["situacao_viagem"], situacao(df_ultimo, df_base_equiv, "Situação_viagem"))
+    iguais(tabelas["situacao_categoria"], situacao(df_ultimo, df_base_equiv, "Situação_categoria"))
+
+    r1, r2, r3 = rankings_por_linha(df_rank)
+    iguais(tabelas["ranking_adiantamento"], r1)
+    iguais(tabelas["ranking_situacao_viagem"], r2)
+    iguais(tabelas["ranking_situacao_categoria"], r3)
+
+
+def test_primeiro_dia_sem_dias_equivalentes_zera_a_base(base):
+    df, cubo_base, indice_datas = base
+    posicoes = relatorios.posicoes_filtro(cubo_base, "Transcol")
+    periodos = relatorios.separar_periodos(cubo_base, indice_datas, posicoes, "2024-01-01")
+    tabelas = relatorios.calcular_tabelas(cubo_base, periodos)
+
+    assert periodos["dias_equiv"] == [] and len(periodos["pos_base_equiv"]) == 0
+    assert (tabelas["adiantamento"][["Qtd Último Dia", "% Último Dia", "% Dias Equivalentes"]] == 0).all().all()
+    assert (tabelas["situacao_viagem"]["Qtd Base Dias Equivalentes"] == 0).all()
+    assert tabelas["situacao_viagem"]["% Último Dia"].sum() == pytest.approx(100)
+    assert analises.quantos_dias_equivalentes("Dia útil") == 5
@@ -0,0 +1,114 @@
+"""
+painel.tarefas.Fila.submeter: reuso da tarefa do mesmo estado, cancelamento
+da anterior quando o estado muda e execução sem pool (trabalhadores=0).
+"""
+
+import threading
+
+from painel import tarefas
+
+
+def etapa(valor, registro=None):
+    def rodar(tarefa):
+        if registro is not None:
+            registro.append(valor)
+        return valor
+    return rodar
+
+
+def test_sem_trabalhadores_roda_na_hora():
+    fila = tarefas.Fila(trabalhadores=0)
+    feitas = []
+    tarefa = fila.submeter("s1", "base", ("x",), [("a", etapa(1, feitas)), ("b", etapa(2, feitas))])
+    assert tarefa.terminou
+    assert feitas == [1, 2]
+    assert tarefa.resultado("b") == 2 and tarefa.fracao() == 1.0
+
+
+def test_mesmo_estado_devolve_a_mesma_tarefa():
+    fila = tarefas.Fila(trabalhadores=0)
+    feitas = []
+    primeira = fila.submeter("s1", "abas", ("x", 1), [("a", etapa(1, feitas))])
+    segunda = fila.submeter("s1", "abas", ("x", 1), [("a", etapa(1, feitas))])
+    assert segunda is primeira
+    assert feitas == [1]
+
+    # outra sessão ou outro canal com o mesmo estado tem tarefa própria
+    assert fila.submeter("s2", "abas", ("x", 1), [("a", etapa(1, feitas))]) is not primeira
+    assert fila.submeter("s1", "resumo", ("x", 1), [("a", etapa(1, feitas))]) is not primeira
+
+
+def test_erro_fica_na_etapa_e_as_seguintes_rodam():
+    fila = tarefas.Fila(trabalhadores=0)
+
+    def falhar(tarefa):
+        raise ValueError("sem dados")
+
+    tarefa = fila.submeter("s1", "abas", 1, [("a", falhar), ("b", etapa(2))])
+    assert isinstance(tarefa.erros["a"], ValueError)
+    assert tarefa.resultado("b") == 2
+    try:
+        tarefa.resultado("a")
+    except ValueError as erro:
+        assert str(erro) == "sem dados"
+    else:
+        raise AssertionError("o erro da etapa deveria ser levantado de novo")
+
+
+def test_estado_novo_cancela_a_tarefa_em_andamento():
+    fila = tarefas.Fila(trabalhadores=2)
+    comecou, liberar = threading.Event(), threading.Event()
+    feitas = []
+
+    def lenta(tarefa):
+        comecou.set()
+        liberar.wait(5)
+        tarefa.verificar()
+        return "velha"
+
+    velha = fila.submeter("s1", "abas", 1, [("a", lenta), ("b", etapa("b", feitas))])
+    assert comecou.wait(5)
+    nova = fila.submeter("s1", "abas", 2, [("a", etapa("nova", feitas))])
+    assert nova is not velha
+    assert velha.cancelada
+    liberar.set()
+
+    nova.futuro.result(5)
+    velha.futuro.result(5)
+    assert velha.terminou
+    # a etapa em andamento parou em verificar() e a seguinte nem começou
+    assert velha.resultados == {} and velha.erros == {}
+    assert feitas == ["nova"]
+    assert nova.resultado("a") == "nova"
+    # o mesmo estado da tarefa cancelada não a reaproveita
+    assert fila.submeter("s1", "abas", 2, []) is nova
+
+
+def test_tarefa_na_fila_cancelada_antes_de_comecar():
+    fila = tarefas.Fila(trabalhadores=1)
+    comecou, liberar = threading.Event(), threading.Event()
+    feitas = []
+
+    def ocupar(tarefa):
+        comecou.set()
+        liberar.wait(5)
+
+    ocupada = fila.submeter("s1", "base", 1, [("a", ocupar)])
+    assert comecou.wait(5)
+    # o único trabalhador está ocupado: esta fica esperando no pool
+    esperando = fila.submeter("s1", "abas", 1, [("a", etapa(1, feitas))])
+    fila.submeter("s1", "abas", 2, [("a", etapa(2, feitas))])
+    assert esperando.terminou and esperando.futuro.cancelled()
+    liberar.set()
+    ocupada.futuro.result(5)
+    fila.submeter("s1", "abas", 2, []).futuro.result(5)
+    assert feitas == [2]
+
+
+def test_limite_de_tarefas_guardadas(monkeypatch):
+    monkeypatch.setattr(tarefas, "MAX_TAREFAS", 3)
+    fila = tarefas.Fila(trabalhadores=0)
+    primeiras = [fila.submeter(f"s{i}", "abas", 1, []) for i in range(4)]
+    # a mais antiga saiu: o mesmo estado monta uma tarefa nova
+    assert fila.submeter("s0", "abas", 1, []) is not primeiras[0]
+    assert fila.submeter("s3", "abas", 1, []) is primeiras[3]
@@ -0,0 +1,191 @@
+"""
+As colunas derivadas de painel.tratamento.enriquecer (vetorizadas) contra o
+cálculo linha a linha original do app.py (BLOCOS 5 a 7), e a detecção do
+formato e a conversão dos horários (detectar_formato, converter_horarios).
+"""
+
+import datetime
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from painel import sintetico, tratamento
+
+
+def classificar_tipo_dia(ts):
+    # cópia do BLOCO 4 original
+    if pd.isna(ts):
+        return "Desconhecido"
+    wd = ts.weekday()
+    if wd <= 4:
+        return "Dia útil"
+    elif wd == 5:
+        return "Sábado"
+    else:
+        return "Domingo"
+
+
+def referencia(df):
+    """BLOCOS 5 a 7 como eram no app.py, com apply por linha."""
+    df = df.copy()
+    df["Tipo_Dia"] = df["Data_Agendada"].apply(classificar_tipo_dia)
+    df["Sistema"] = np.where(
+        df["Empresa"].str.contains("VJB", case=False, na=False),
+        "Aquaviário",
+        "Transcol"
+    )
+    df["Hora_Agendada"] = df["Horário_agendado"].dt.hour
+    df["Faixa_Horaria"] = df["Hora_Agendada"].apply(
+        lambda h: f"{int(h):02d}:00–{int(h):02d}:59" if pd.notnull(h) else "Sem horário"
+    )
+    df["Adiantamento_min"] = (
+        df["Horário_realizado"] - df["Horário_agendado"]
+    ).dt.total_seconds() / 60
+    df["Adianta_3"] = df["Adiantamento_min"] > 3
+    df["Adianta_5"] = df["Adiantamento_min"] > 5
+    df["Adianta_10"] = df["Adiantamento_min"] > 10
+    return df
+
+
+def base_bordas():
+    """Datas nulas, Empresa nula e horas nas bordas das faixas e dos limites."""
+    agendado = pd.to_datetime(pd.Series([
+        "2024-01-01 00:00:00",  # segunda, primeira faixa
+        "2024-01-05 23:59:59",  # sexta, última faixa
+        "2024-01-06 12:00:00",  # sábado
+        "2024-01-07 13:59:59",  # domingo
+        None,                   # sem horário agendado
+        "2024-01-02 05:00:00",
+        "2024-01-03 06:59:59",
+        "2024-01-04 07:00:00",
+        None,
+    ]))
+    realizado = pd.to_datetime(pd.Series([
+        "2024-01-01 00:03:00",  # exatamente 3 min: não conta
+        "2024-01-06 00:04:59",  # 5 min: não conta em >5
+        "2024-01-06 12:10:00",  # exatamente 10 min
+        "2024-01-07 14:10:00",
+        "2024-01-01 10:00:00",
+        None,                   # não realizada
+        "2024-01-03 06:50:00",  # atrasada (negativo)
+        "2024-01-04 07:03:01",
+        None,
+    ]))
+    return pd.DataFrame({
+        "Horário_agendado": agendado,
+        "Horário_realizado": realizado,
+        "Empresa": ["Viação 01", "VJB Aquaviário", "vjb minúsculo", None, "Viação 02", None,
+                    "Viação 01", "OUTRA vJb", None],
+    })
+
+
+def base_sintetica():
+    df = sintetico.gerar_viagens(20_000, dias=21, semente=3)
+    df.columns = [c.replace(" ", "_") for c in df.columns]
+    for c in tratamento.COLUNAS_HORARIO:
+        df[c] = pd.to_datetime(df[c], format="%d/%m/%Y %H:%M:%S")
+    df.loc[df.index[::97], "Empresa"] = None
+    df.loc[df.index[::101], "Horário_agendado"] = pd.NaT
+    return df
+
+
+@pytest.mark.parametrize("montar", [base_bordas, base_sintetica])
+def test_enriquecer_igual_ao_calculo_por_linha(montar):
+    df = montar()
+    df["Data_Agendada"] = df["Horário_agendado"].dt.normalize()
+    esperado = referencia(df)
+    obtido = tratamento.enriquecer(df.copy())
+
+    for coluna in ["Tipo_Dia", "Sistema", "Faixa_Horaria"]:
+        assert obtido[coluna].astype(object).tolist() == esperado[coluna].tolist(), coluna
+    assert obtido["Hora_Agendada"].astype("Float64").tolist() == esperado["Hora_Agendada"].astype("Float64").tolist()
+    pd.testing.assert_series_equal(obtido["Adiantamento_min"], esperado["Adiantamento_min"])
+    for coluna in ["Adianta_3", "Adianta_5", "Adianta_10"]:
+        pd.testing.assert_series_equal(obtido[coluna], esperado[coluna])
+
+
+def test_tipo_dia_e_faixa_horaria_nas_bordas():
+    datas = pd.Series(pd.to_datetime(["2024-01-05", "2024-01-06", "2024-01-07", None]))
+    assert tratamento.tipo_dia(datas).tolist() == ["Dia útil", "Sábado", "Domingo", "Desconhecido"]
+
+    horas = pd.Series([0, 23, None, 12], dtype="Int8")
+    assert tratamento.faixa_horaria(horas).tolist() == [
+        "00:00–00:59", "23:00–23:59", "Sem horário", "12:00–12:59",
+    ]
+
+
+def test_tipos_e_faixas_cobrem_os_rotulos_originais():
+    assert set(tratamento.TIPOS_DIA) == {"Dia útil", "Sábado", "Domingo", "Desconhecido"}
+    assert len(tratamento.FAIXAS_HORARIAS) == 25
+
+
+def horarios(inicio, n, formato):
+    """n horários distintos a cada 7 minutos a partir de inicio, como texto."""
+    return pd.Series(pd.date_range(inicio, periods=n, freq="7min").strftime(formato), dtype=object)
+
+
+def test_detectar_formato_dia_primeiro_quando_ha_dia_maior_que_12():
+    ambiguos = ["01/02/2024 10:00:00", "03/04/2024 11:30:00", "12/11/2024 23:59:59"]
+    # só dias até 12: as duas leituras convertem tudo e fica o mês primeiro
+    assert tratamento.detectar_formato(ambiguos) == "%m/%d/%Y %H:%M:%S"
+    # um dia 13 no fim da amostra basta para o dia primeiro converter mais
+    assert tratamento.detectar_formato(ambiguos + ["13/04/2024 08:00:00"]) == "%d/%m/%Y %H:%M:%S"
+    assert tratamento.detectar_formato(["04/13/2024 08:00:00"] + ambiguos) == "%m/%d/%Y %H:%M:%S"
+    assert tratamento.detectar_formato([None, float("nan"), 5]) is None
+
+
+def test_converter_horarios_dia_primeiro_em_base_grande():
+    # 29 dias de março em horários distintos: mais textos que TAMANHO_AMOSTRA
+    textos = horarios("2024-03-01", 6_000, "%d/%m/%Y %H:%M:%S")
+    assert textos.nunique() > tratamento.TAMANHO_AMOSTRA
+    convertidos, formato, falhas = tratamento.converter_horarios(textos)
+
+    assert formato == "%d/%m/%Y %H:%M:%S"
+    assert falhas == 0
+    esperado = pd.to_datetime(textos, format="%d/%m/%Y %H:%M:%S")
+    pd.testing.assert_series_equal(convertidos, esperado, check_dtype=False)
+    # sem o formato, o pd.to_datetime leria 01/03 a 12/03 como janeiro a dezembro
+    assert convertidos.dt.month.unique().tolist() == [3]
+
+
+def test_converter_horarios_mistura_datetime_e_texto():
+    # planilha (datetime) e CSV (texto) juntos na mesma coluna object
+    serie = pd.Series([
+        datetime.datetime(2024, 1, 5, 10, 0),
+        "20/01/2024 11:00:00",
+        None,
+        pd.Timestamp("2024-01-07 09:00"),
+        "06/01/2024 08:30:00",
+        datetime.datetime(2024, 1, 5, 10, 0),
+    ], dtype=object, name="Horário_agendado")
+    convertidos, formato, falhas = tratamento.converter_horarios(serie)
+
+    assert formato == "%d/%m/%Y %H:%M:%S"
+    assert falhas == 0
+    assert convertidos.name == "Horário_agendado"
+    assert convertidos.tolist()[:2] == [pd.Timestamp("2024-01-05 10:00"), pd.Timestamp("2024-01-20 11:00")]
+    assert pd.isna(convertidos.iloc[2])
+    assert convertidos.tolist()[3:] == [
+        pd.Timestamp("2024-01-07 09:00"), pd.Timestamp("2024-01-06 08:30"), pd.Timestamp("2024-01-05 10:00"),
+    ]
+
+
+def test_converter_horarios_conta_cada_ocorrencia_que_falhou():
+    serie = pd.Series(
+        ["05/01/2024 10:00:00", "lixo", None, "lixo", "", "31/02/2024 10:00:00", "13/01/2024 07:00:00", np.nan],
+        dtype=object,
+    )
+    convertidos, formato, falhas = tratamento.converter_horarios(serie)
+
+    assert formato == "%d/%m/%Y %H:%M:%S"
+    # "lixo" duas vezes, o texto vazio e 31/02 inexistente; None e NaN são nulos, não falhas
+    assert falhas == 4
+    assert convertidos.notna().tolist() == [True, False, False, False, False, False, True, False]
+    assert convertidos.isna().sum() == falhas + 2
+
+
+def test_converter_horarios_ja_datetime_passa_direto():
+    serie = pd.Series(pd.to_datetime(["2024-01-05 10:00", None]))
+    convertidos, formato, falhas = tratamento.converter_horarios(serie)
+    assert convertidos is serie and formato is None and falhas == 0